@@ -0,0 +1,114 @@
+--[[
+Benchmark of the memory allocated per point when reading the values of a
+BaseAttribute point by point, using the Katana stub from katana.lua.
+
+Doesn't need Katana, run from the repository root with LuaJIT :
+
+  luajit dev/benchmarks/allocations.lua [points=100000] [samples=3]
+
+The garbage collector is stopped during each measure so "kb_per_point" is
+everything allocated per point. "attributes_per_point" is the number of
+DataAttribute created per point, the only allocation expected for
+<get_data_at(pid)> as Katana needs it to receive the values.
+
+Print one JSON line. Run it on two commits to compare them.
+]]
+package.path = "./?.lua;./dev/benchmarks/?.lua;" .. package.path
+
+local katana = require("katana")
+
+local POINTCLOUD = "/root/world/geo/pointcloud"
+local SOURCE = "/root/world/geo/assets/source0"
+
+local count = tonumber(arg[1]) or 100000
+local sample_count = tonumber(arg[2]) or 3
+
+local function get_scene()
+  --[[
+  Returns:
+    table: {location: GroupAttribute}
+  ]]
+  local samples = {}
+  for i = 1, sample_count do
+    local time = sample_count == 1 and 0.0 or -0.25 + 0.5 * (i - 1) / (sample_count - 1)
+    local values = {}
+    for v = 1, count * 3 do
+      values[v] = v + time
+    end
+    samples[time] = values
+  end
+
+  local pointcloud = GroupAttribute()
+  katana.group_set(
+      pointcloud,
+      "geometry.point.P",
+      katana.new_data_attribute("float", samples, 3)
+  )
+  katana.group_set(pointcloud, "instancing.data.sources", StringAttribute({ SOURCE, "0" }, 2))
+  katana.group_set(pointcloud, "instancing.data.common", StringAttribute({
+    "geometry.point.P", "$translation", "3",
+  }, 3))
+  katana.group_set(pointcloud, "instancing.data.points.attr", StringAttribute({ "geometry.point.P", "3" }, 2))
+  katana.group_set(pointcloud, "instancing.data.points.count", IntAttribute({ 0 }, 1))
+  katana.group_set(pointcloud, "instancing.settings.enable_motion_blur", IntAttribute({ 1 }, 1))
+
+  local source = GroupAttribute()
+  katana.group_set(source, "type", StringAttribute({ "subdmesh" }))
+
+  return { [POINTCLOUD] = pointcloud, [SOURCE] = source }
+end
+
+local Interface = katana.install()
+Interface.scene = get_scene()
+local PointCloudData = require("kui.PointCloudData")
+
+local point_data = PointCloudData:new(POINTCLOUD)
+point_data:build()
+local attribute = point_data:get_common_by_name("translation")
+-- decode the values before measuring
+attribute:get_value_at(0)
+
+local results = {}
+
+local function measure(name, func)
+  --[[
+  Call <func> for every point with the garbage collector stopped and store
+  the memory and DataAttribute allocated per point in <results>.
+  ]]
+  collectgarbage("collect")
+  local memory = collectgarbage("count")
+  local attributes = katana.counters.attributes
+  collectgarbage("stop")
+
+  local stime = os.clock()
+  for pid = 0, count - 1 do
+    func(pid)
+  end
+  stime = os.clock() - stime
+
+  local allocated = collectgarbage("count") - memory
+  collectgarbage("restart")
+
+  results[#results + 1] = string.format(
+      '"%s": {"time": %.4f, "kb_per_point": %.6f, "attributes_per_point": %.2f}',
+      name,
+      stime,
+      allocated / count,
+      (katana.counters.attributes - attributes) / count
+  )
+end
+
+measure("get_value_at", function(pid)
+  return attribute:get_value_at(pid)
+end)
+measure("get_value_at_nearest", function(pid)
+  return attribute:get_value_at(pid, 0.0)
+end)
+measure("get_data_at", function(pid)
+  return attribute:get_data_at(pid)
+end)
+
+print(string.format(
+    '{"points": %d, "samples": %d, %s}',
+    count, sample_count, table.concat(results, ", ")
+))
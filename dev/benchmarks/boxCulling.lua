@@ -0,0 +1,93 @@
+--[[
+Benchmark of kui.boxCulling's CullingGrid against the naive version that
+tests every point against every box.
+
+Doesn't need Katana, run from the repository root with LuaJIT :
+
+  luajit dev/benchmarks/boxCulling.lua [points=1000000] [boxes=200]
+
+Print one JSON line with the timings in seconds.
+]]
+package.path = "./?.lua;" .. package.path
+
+-- only the logger is needed from Katana to load the module
+package.preload["lllogger"] = function()
+  local logger = {}
+  function logger:debug() end
+  function logger:info() end
+  function logger:warning() end
+  function logger:error() end
+  logger.formatter = { set_tbl_display_indexes = function() end }
+  return { getLogger = function() return logger end, LEVELS = {} }
+end
+
+local boxCulling = require("kui.boxCulling")
+
+local point_count = tonumber(arg[1]) or 1000000
+local box_count = tonumber(arg[2]) or 200
+
+-- deterministic pseudo-random generator (same results on every run)
+local seed = 12345
+local function random()
+  seed = (seed * 1103515245 + 12345) % 2147483648
+  return seed / 2147483648
+end
+
+local positions = {}
+for i = 1, point_count * 3 do
+  positions[i] = random() * 1000
+end
+
+local bounds = {}
+local center
+local size
+for _ = 1, box_count do
+  for _ = 1, 3 do
+    center = random() * 1000
+    size = 5 + random() * 40
+    bounds[#bounds + 1] = center - size
+    bounds[#bounds + 1] = center + size
+  end
+end
+
+local function naive()
+  local out = {}
+  local x, y, z
+  for pid = 0, point_count - 1 do
+    x = positions[pid * 3 + 1]
+    y = positions[pid * 3 + 2]
+    z = positions[pid * 3 + 3]
+    for bi = 1, #bounds, 6 do
+      if x > bounds[bi] and x < bounds[bi + 1] and
+          y > bounds[bi + 2] and y < bounds[bi + 3] and
+          z > bounds[bi + 4] and z < bounds[bi + 5] then
+        out[#out + 1] = pid
+        break
+      end
+    end
+  end
+  return out
+end
+
+local stime = os.clock()
+local expected = naive()
+local naive_time = os.clock() - stime
+
+stime = os.clock()
+local grid = boxCulling.CullingGrid:new(bounds)
+grid:build()
+local build_time = os.clock() - stime
+local culled = grid:get_culled_points(positions, 3, 0, point_count)
+local grid_time = os.clock() - stime
+
+assert(#culled == #expected, "grid and naive results are different")
+for i = 1, #expected do
+  assert(culled[i] == expected[i], "grid and naive results are different")
+end
+
+print(string.format(
+    '{"points": %d, "boxes": %d, "culled": %d, "naive": %.4f, \z
+    "grid_build": %.4f, "grid": %.4f, "speedup": %.1f}',
+    point_count, box_count, #culled, naive_time, build_time, grid_time,
+    naive_time / grid_time
+))
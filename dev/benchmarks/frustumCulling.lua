@@ -0,0 +1,74 @@
+--[[
+Benchmark of kui.frustumCulling's FrustumCuller.
+
+Doesn't need Katana, run from the repository root with LuaJIT :
+
+  luajit dev/benchmarks/frustumCulling.lua [points=1000000]
+  luajit dev/benchmarks/frustumCulling.lua 10000000
+
+Print one JSON line with the timings in seconds.
+]]
+package.path = "./?.lua;" .. package.path
+
+-- only the logger is needed from Katana to load the module
+package.preload["lllogger"] = function()
+  local logger = {}
+  function logger:debug() end
+  function logger:info() end
+  function logger:warning() end
+  function logger:error() end
+  logger.formatter = { set_tbl_display_indexes = function() end }
+  return { getLogger = function() return logger end, LEVELS = {} }
+end
+
+local frustumCulling = require("kui.frustumCulling")
+
+local point_count = tonumber(arg[1]) or 1000000
+
+-- deterministic pseudo-random generator (same results on every run)
+local seed = 12345
+local function random()
+  seed = (seed * 1103515245 + 12345) % 2147483648
+  return seed / 2147483648
+end
+
+-- points scattered on a 2000x2000 ground
+local positions = {}
+for pid = 0, point_count - 1 do
+  positions[pid * 3 + 1] = random() * 2000 - 1000
+  positions[pid * 3 + 2] = 0
+  positions[pid * 3 + 3] = random() * 2000 - 1000
+end
+
+-- camera 2 units above the ground, looking toward -Z (world to camera space)
+local matrix = {
+  1, 0, 0, 0,
+  0, 1, 0, 0,
+  0, 0, 1, 0,
+  0, -2, 0, 1
+}
+-- 16:9, 60 degree vertical field of view
+local tangent = math.tan(math.rad(30))
+local screen = { -tangent * 16 / 9, tangent * 16 / 9, -tangent, tangent }
+
+local results = {}
+local function bench(name, padding, max_distance)
+  local culler = frustumCulling.FrustumCuller:new(
+      matrix, "perspective", screen, 0.1, 100000
+  )
+  culler:set_padding(padding)
+  culler:set_max_distance(max_distance)
+  local stime = os.clock()
+  local culled = culler:get_culled_points(positions, 3, 0, point_count)
+  results[#results + 1] = string.format(
+      '"%s": {"time": %.4f, "culled": %d}', name, os.clock() - stime, #culled
+  )
+end
+
+bench("frustum", 0, 0)
+bench("frustum_padding", 5, 0)
+bench("frustum_distance", 5, 500)
+
+print(string.format(
+    '{"points": %d, %s}', point_count, table.concat(results, ", ")
+))
@@ -0,0 +1,283 @@
+--[[
+Benchmark of kui.array and kui.hierarchical on a synthetic point-cloud, using
+the Katana stub from katana.lua.
+
+Doesn't need Katana, run from the repository root with LuaJIT :
+
+  luajit dev/benchmarks/instancing.lua [points=100000] [method=array] [samples=1]
+  luajit dev/benchmarks/instancing.lua 1000000 hierarchical 3
+  luajit dev/benchmarks/instancing.lua suite [max_points=1000000]
+
+- method: "array" or "hierarchical"
+- samples: number of motion time samples on the animated attributes.
+- suite: run both methods, with and without motion, for 1k points to
+  <max_points> (x10 each time), each in a new process.
+
+The location is cooked a second time to measure the cache, those results are
+prefixed with "warm_".
+
+Print one JSON line per run with, for each stage, the time in seconds (CPU
+time from os.clock()) and the memory allocated in KB. The garbage collector is
+stopped during a PointCloudData stage so "alloc_kb" is everything it
+allocated. "peak_kb" is the biggest Lua memory used seen at the end of a
+stage. As a full garbage collection is done before each stage, "pointcloud"
+(the whole PointCloudData build) is bigger than the sum of its stages.
+
+For hierarchical, the time to set the children attributes is measured on the
+first 1000 children only ("children" stage).
+]]
+package.path = "./?.lua;./dev/benchmarks/?.lua;" .. package.path
+
+local katana = require("katana")
+
+-- PointCloudData methods measured, in execution order
+local STAGES = {
+  "_build_settings",
+  "_build_points",
+  "_build_common",
+  "_build_arbitrary",
+  "_validate",
+  "_convert_index_to_lod",
+  "_convert_rotation_to_axis",
+  "_convert_skip_n_hide",
+  "_convert_degree_radian",
+  "_convert_trs_to_matrix"
+}
+local POINTCLOUD = "/root/world/geo/pointcloud"
+local INSTANCES = "/root/world/geo/instances"
+local CHILDREN_SAMPLED = 1000
+
+local results
+local peak
+-- prefix of the results names
+local phase
+
+local function measure(name, func, ...)
+  --[[
+  Call <func> with the garbage collector stopped and store its time and
+  allocated memory in <results> under <name>.
+  ]]
+  collectgarbage("collect")
+  local memory = collectgarbage("count")
+  collectgarbage("stop")
+
+  local stime = os.clock()
+  local out = func(...)
+  stime = os.clock() - stime
+
+  local allocated = collectgarbage("count") - memory
+  peak = math.max(peak, collectgarbage("count"))
+  collectgarbage("restart")
+
+  results[#results + 1] = string.format(
+      '"%s%s": {"time": %.4f, "alloc_kb": %d}', phase, name, stime, allocated
+  )
+  return out
+end
+
+local function time(name, func, ...)
+  --[[
+  Same as <measure()> but without stopping the garbage collector.
+  ]]
+  local stime = os.clock()
+  local out = func(...)
+  stime = os.clock() - stime
+  peak = math.max(peak, collectgarbage("count"))
+  results[#results + 1] = string.format(
+      '"%s%s": {"time": %.4f}', phase, name, stime
+  )
+  return out
+end
+
+local function get_scene(count, samples)
+  --[[
+  Args:
+    count(number): number of points
+    samples(number): number of time samples for the animated attributes
+  Returns:
+    table: {location: GroupAttribute}
+  ]]
+
+  -- deterministic pseudo-random generator (same results on every run)
+  local seed = 12345
+  local function random()
+    seed = (seed * 1103515245 + 12345) % 2147483648
+    return seed / 2147483648
+  end
+
+  local times = {}
+  for i = 1, samples do
+    times[i] = samples == 1 and 0.0 or -0.25 + 0.5 * (i - 1) / (samples - 1)
+  end
+
+  local function attribute(kind, tuple, animated, generate)
+    local values = {}
+    for _, t in ipairs(animated and times or { 0.0 }) do
+      local buf = {}
+      for pid = 0, count - 1 do
+        for k = 1, tuple do
+          buf[pid * tuple + k] = generate(pid, k, t)
+        end
+      end
+      values[t] = buf
+    end
+    return katana.new_data_attribute(kind, values, tuple)
+  end
+
+  local pointcloud = GroupAttribute()
+  local function set(path, attr)
+    katana.group_set(pointcloud, path, attr)
+  end
+
+  local sources = {}
+  local scene = { [POINTCLOUD] = pointcloud }
+  for i = 0, 2 do
+    local location = "/root/world/geo/assets/source" .. i
+    sources[#sources + 1] = location
+    sources[#sources + 1] = tostring(i)
+    scene[location] = GroupAttribute()
+    katana.group_set(scene[location], "type", StringAttribute({ "subdmesh" }))
+  end
+
+  set("geometry.point.P", attribute("float", 3, true, function(_, _, t)
+    return random() * 1000 + t
+  end))
+  set("geometry.arbitrary.rotation.value", attribute("float", 3, true, function(_, _, t)
+    return random() * 360 + t * 10
+  end))
+  set("geometry.arbitrary.scale.value", attribute("float", 3, false, function()
+    return 0.5 + random()
+  end))
+  set("geometry.arbitrary.index.value", attribute("int", 1, false, function()
+    return math.floor(random() * 3)
+  end))
+  set("geometry.arbitrary.color.value", attribute("float", 3, false, function()
+    return random()
+  end))
+
+  set("instancing.data.sources", StringAttribute(sources, 2))
+  set("instancing.data.common", StringAttribute({
+    "geometry.point.P", "$translation", "3",
+    "geometry.arbitrary.rotation.value", "$rotation", "3",
+    "geometry.arbitrary.scale.value", "$scale", "3",
+    "geometry.arbitrary.index.value", "$index", "1",
+  }, 3))
+  set("instancing.data.arbitrary", StringAttribute({
+    "geometry.arbitrary.color.value", "instance.arbitrary.color.value", "3", "",
+  }, 4))
+  set("instancing.data.points.attr", StringAttribute({ "geometry.point.P", "3" }, 2))
+  set("instancing.data.points.count", IntAttribute({ 0 }, 1))
+  set("instancing.settings.convert_degree_to_radian", IntAttribute({ 1 }, 1))
+  set("instancing.settings.convert_trs_to_matrix", IntAttribute({ 1 }, 1))
+  set("instancing.settings.enable_motion_blur", IntAttribute({ 1 }, 1))
+
+  return scene
+
+end
+
+local function run(count, method, samples)
+  --[[
+  Cook the instancing location twice (cold, then warm with the cache) and
+  print the results as a JSON line.
+  ]]
+
+  local Interface = katana.install()
+  Interface.scene = get_scene(count, samples)
+  -- make sure the kui modules use the new globals
+  for name, _ in pairs(package.loaded) do
+    if name:match("^kui") then
+      package.loaded[name] = nil
+    end
+  end
+
+  local PointCloudData = require("kui.PointCloudData")
+  local new = PointCloudData.new
+  PointCloudData.new = function(cls, location)
+    local pointdata = new(cls, location)
+    for _, name in ipairs(STAGES) do
+      local method_func = pointdata[name]
+      pointdata[name] = function(...)
+        return measure(name, method_func, ...)
+      end
+    end
+    return pointdata
+  end
+
+  local cache = require("kui.cache")
+  local get_point_data = cache.get_point_data
+  cache.get_point_data = function(...)
+    return time("pointcloud", get_point_data, ...)
+  end
+
+  results = {}
+  peak = collectgarbage("count")
+  phase = ""
+
+  Interface.location = INSTANCES
+  Interface.atroot = true
+  Interface.opargs = GroupAttribute()
+  katana.group_set(Interface.opargs, "user.pointcloud_sg", StringAttribute({ POINTCLOUD }))
+  katana.group_set(Interface.opargs, "user.instance_name", StringAttribute({ "instance_$id" }))
+  local opargs = Interface.opargs
+
+  local module = require("kui." .. method)
+  local function cook()
+    Interface.output = {}
+    Interface.children = {}
+    -- kui print empty lines, keep the output as JSON lines only
+    local _print = print
+    print = function() end
+    if method == "array" then
+      module.run()
+    else
+      module.atroot()
+    end
+    print = _print
+  end
+  time("total", cook)
+  phase = "warm_"
+  time("total", cook)
+  phase = ""
+
+  if method == "hierarchical" then
+    local children = Interface.children
+    local sampled = math.min(CHILDREN_SAMPLED, #children)
+    Interface.atroot = false
+    time("children", function()
+      for i = 1, sampled do
+        Interface.children = {}
+        Interface.location = INSTANCES .. "/" .. children[i][1]
+        Interface.opargs = children[i][3]
+        module.run_not_root()
+      end
+    end)
+    Interface.opargs = opargs
+  end
+
+  print(string.format(
+      '{"points": %d, "method": "%s", "samples": %d, "peak_kb": %d, \z
+      "decoded": %d, %s}',
+      count, method, samples, peak, katana.counters.decoded,
+      table.concat(results, ", ")
+  ))
+
+end
+
+if arg[1] == "suite" then
+  -- each run in its own process so they don't affect each other memory
+  local interpreter = arg[-1] or "luajit"
+  local max_points = tonumber(arg[2]) or 1000000
+  local count = 1000
+  while count <= max_points do
+    for _, method in ipairs({ "array", "hierarchical" }) do
+      for _, samples in ipairs({ 1, 3 }) do
+        os.execute(string.format(
+            "%s %s %d %s %d", interpreter, arg[0], count, method, samples
+        ))
+      end
+    end
+    count = count * 10
+  end
+else
+  run(tonumber(arg[1]) or 100000, arg[2] or "array", tonumber(arg[3]) or 1)
+end
@@ -0,0 +1,548 @@
+--[[
+Stub of the Katana Lua environment used by KUI so the kui modules can run
+under a plain LuaJIT/Lua 5.1 interpreter for benchmarking.
+
+Implemented : lllogger, IntAttribute, FloatAttribute, DoubleAttribute,
+StringAttribute, GroupAttribute, GroupBuilder, Attribute, Imath (M44d, V3d),
+XFormUtils, Config and Interface (single input, no real xform
+evaluation).
+
+As in Katana, attributes are immutable : the values given to a DataAttribute
+constructor are copied and getNearestSample() returns a new table.
+
+Usage:
+
+  local katana = require("katana")
+  local Interface = katana.install({["/root/world/pc"] = GroupAttribute})
+]]
+local _M_ = {}
+
+_M_.counters = {
+  ["attributes"] = 0,  -- number of DataAttribute created
+  ["decoded"] = 0  -- number of getNearestSample() calls
+}
+
+
+-- lllogger -------------------------------------------------------------------
+
+
+local function make_lllogger()
+  --[[
+  Returns:
+    table: lllogger module, messages are discarded.
+  ]]
+  local LEVELS = { DEBUG = 10, INFO = 20, WARNING = 30, ERROR = 40 }
+  local loggers = {}
+  local lllogger = { ["LEVELS"] = LEVELS }
+
+  local function noop() end
+
+  function lllogger.getLogger(name)
+    name = name or "root"
+    if not loggers[name] then
+      loggers[name] = {
+        ["name"] = name,
+        ["formatter"] = { ["set_tbl_display_indexes"] = noop },
+        ["setLevel"] = noop,
+        ["debug"] = noop,
+        ["info"] = noop,
+        ["warning"] = noop,
+        ["error"] = noop
+      }
+    end
+    return loggers[name]
+  end
+
+  return lllogger
+end
+
+
+-- Attributes -----------------------------------------------------------------
+
+
+local DataAttributeMT = {}
+DataAttributeMT.__index = DataAttributeMT
+
+local function new_data_attribute(kind, samples, times, tuple)
+  --[[
+  Create a DataAttribute without copying the values.
+
+  Args:
+    kind(str): "int", "float", "double", "string"
+    samples(table): {time: flat table of values}
+    times(table): ascending list of the times in <samples>
+    tuple(number): tuple size
+  ]]
+  _M_.counters.attributes = _M_.counters.attributes + 1
+  return setmetatable(
+      {
+        ["kind"] = kind,
+        ["samples"] = samples,
+        ["times"] = times,
+        ["tuple"] = tuple or 1
+      },
+      DataAttributeMT
+  )
+end
+
+local function is_flat(values)
+  if values[1] ~= nil then
+    return true
+  end
+  for _, v in pairs(values) do
+    return type(v) ~= "table"
+  end
+  return true  -- empty table
+end
+
+local function make_data_class(kind)
+  --[[
+  Returns:
+    table: callable like <class(values, tupleSize)>, values being a flat
+      table or a table of {time: flat table}.
+  ]]
+  local class = { ["kind"] = kind }
+  local convert = tonumber
+  if kind == "int" then
+    convert = function(v)
+      return math.floor(tonumber(v) + 0.0)
+    end
+  elseif kind == "string" then
+    convert = tostring
+  end
+
+  setmetatable(class, {
+    __call = function(_, values, tuple)
+      local samples = {}
+      local times = {}
+      if type(values) ~= "table" then
+        values = { values }
+      end
+      if is_flat(values) then
+        values = { [0.0] = values }
+      end
+      for time, src in pairs(values) do
+        local dst = {}
+        for i = 1, #src do
+          dst[i] = convert(src[i])
+        end
+        samples[time] = dst
+        times[#times + 1] = time
+      end
+      table.sort(times)
+      return new_data_attribute(kind, samples, times, tuple)
+    end
+  })
+  return class
+end
+
+function DataAttributeMT:getNumberOfTimeSamples()
+  return #self.times
+end
+function DataAttributeMT:getSampleTime(index)
+  return self.times[index + 1]
+end
+function DataAttributeMT:getTupleSize()
+  return self.tuple
+end
+function DataAttributeMT:getNumberOfValues()
+  return #self.samples[self.times[1]]
+end
+function DataAttributeMT:getNumberOfTuples()
+  return #self.samples[self.times[1]] / self.tuple
+end
+function DataAttributeMT:getNearestSample(time)
+  _M_.counters.decoded = _M_.counters.decoded + 1
+  local nearest
+  for _, t in ipairs(self.times) do
+    if not nearest or math.abs(t - time) < math.abs(nearest - time) then
+      nearest = t
+    end
+  end
+  local src = self.samples[nearest]
+  local out = {}
+  for i = 1, #src do
+    out[i] = src[i]
+  end
+  return out
+end
+function DataAttributeMT:getValue(default)
+  local values = self.samples[self.times[1]]
+  if values[1] == nil then
+    return default
+  end
+  return values[1]
+end
+function DataAttributeMT:getHash()
+  -- computed once from the content, like Katana
+  if self.__hash then
+    return self.__hash
+  end
+  local hash = 0
+  local function mix(value)
+    if type(value) == "number" then
+      hash = (hash * 31 + math.floor(value * 1000003) % 4294967296) % 4294967296
+    else
+      value = tostring(value)
+      for i = 1, #value do
+        hash = (hash * 31 + value:byte(i)) % 4294967296
+      end
+    end
+  end
+  mix(self.kind)
+  mix(self.tuple)
+  for _, time in ipairs(self.times) do
+    local values = self.samples[time]
+    mix(time)
+    mix(#values)
+    for i = 1, #values do
+      mix(values[i])
+    end
+  end
+  self.__hash = self.kind .. hash
+  return self.__hash
+end
+
+local GroupAttributeMT = {}
+GroupAttributeMT.__index = GroupAttributeMT
+
+local function GroupAttribute(children)
+  --[[
+  Args:
+    children(table or nil): list of {name, attribute}
+  ]]
+  local group = setmetatable(
+      { ["kind"] = "group", ["names"] = {}, ["children"] = {} },
+      GroupAttributeMT
+  )
+  for _, child in ipairs(children or {}) do
+    group.names[#group.names + 1] = child[1]
+    group.children[child[1]] = child[2]
+  end
+  return group
+end
+
+function GroupAttributeMT:getNumberOfChildren()
+  return #self.names
+end
+function GroupAttributeMT:getChildName(index)
+  return self.names[index + 1]
+end
+function GroupAttributeMT:getChildByIndex(index)
+  return self.children[self.names[index + 1]]
+end
+function GroupAttributeMT:getChildByName(name)
+  local current = self
+  for part in name:gmatch("[^%.]+") do
+    if not current or current.kind ~= "group" then
+      return nil
+    end
+    current = current.children[part]
+  end
+  return current
+end
+function GroupAttributeMT:getHash()
+  if self.__hash then
+    return self.__hash
+  end
+  local buf = {}
+  for _, name in ipairs(self.names) do
+    buf[#buf + 1] = name .. "=" .. self.children[name]:getHash()
+  end
+  self.__hash = "{" .. table.concat(buf, ";") .. "}"
+  return self.__hash
+end
+
+local function group_set(group, path, attribute)
+  --[[
+  Set <attribute> at the dot separated <path> in <group>, creating the
+  intermediate groups. Groups along the path are copied so attributes
+  previously returned stay unchanged.
+  ]]
+  group.__hash = nil
+  local first, rest = path:match("^([^%.]+)%.(.+)$")
+  if not first then
+    if not group.children[path] then
+      group.names[#group.names + 1] = path
+    end
+    group.children[path] = attribute
+    return
+  end
+
+  local child = group.children[first]
+  local copy = GroupAttribute()
+  if not child then
+    group.names[#group.names + 1] = first
+  elseif child.kind == "group" then
+    for _, name in ipairs(child.names) do
+      copy.names[#copy.names + 1] = name
+      copy.children[name] = child.children[name]
+    end
+  end
+  group.children[first] = copy
+  group_set(copy, rest, attribute)
+end
+
+local function GroupBuilder()
+  local builder = { ["root"] = GroupAttribute() }
+  function builder:update(group)
+    if not group then
+      return
+    end
+    for _, name in ipairs(group.names) do
+      group_set(self.root, name, group.children[name])
+    end
+  end
+  function builder:set(path, attribute)
+    group_set(self.root, path, attribute)
+  end
+  function builder:build()
+    local out = self.root
+    self.root = GroupAttribute()
+    return out
+  end
+  return builder
+end
+
+local Attribute = {}
+function Attribute.IsAttribute(a)
+  return type(a) == "table" and a.kind ~= nil
+end
+function Attribute.IsInt(a)
+  return type(a) == "table" and a.kind == "int"
+end
+function Attribute.IsFloat(a)
+  return type(a) == "table" and a.kind == "float"
+end
+function Attribute.IsDouble(a)
+  return type(a) == "table" and a.kind == "double"
+end
+function Attribute.IsString(a)
+  return type(a) == "table" and a.kind == "string"
+end
+function Attribute.IsGroup(a)
+  return type(a) == "table" and a.kind == "group"
+end
+
+
+-- Imath ----------------------------------------------------------------------
+
+
+local M44dMT = {}
+M44dMT.__index = M44dMT
+
+local function M44d()
+  return setmetatable(
+      { ["x"] = { { 1, 0, 0, 0 }, { 0, 1, 0, 0 }, { 0, 0, 1, 0 }, { 0, 0, 0, 1 } } },
+      M44dMT
+  )
+end
+
+local function V3d(x, y, z)
+  if type(x) == "table" then
+    return { x[1], x[2], x[3] }
+  end
+  return { x, y, z }
+end
+
+function M44dMT:translate(t)
+  local x = self.x
+  for j = 1, 4 do
+    x[4][j] = x[4][j] + t[1] * x[1][j] + t[2] * x[2][j] + t[3] * x[3][j]
+  end
+end
+function M44dMT:scale(s)
+  local x = self.x
+  for j = 1, 4 do
+    x[1][j] = x[1][j] * s[1]
+    x[2][j] = x[2][j] * s[2]
+    x[3][j] = x[3][j] * s[3]
+  end
+end
+function M44dMT:rotate(r)
+  -- euler angles in radians, XYZ order like Imath
+  local cos_rx, sin_rx = math.cos(r[1]), math.sin(r[1])
+  local cos_ry, sin_ry = math.cos(r[2]), math.sin(r[2])
+  local cos_rz, sin_rz = math.cos(r[3]), math.sin(r[3])
+  local m = {
+    { cos_rz * cos_ry, sin_rz * cos_ry, -sin_ry },
+    { -sin_rz * cos_rx + cos_rz * sin_ry * sin_rx,
+      cos_rz * cos_rx + sin_rz * sin_ry * sin_rx,
+      cos_ry * sin_rx },
+    { sin_rz * sin_rx + cos_rz * sin_ry * cos_rx,
+      -cos_rz * sin_rx + sin_rz * sin_ry * cos_rx,
+      cos_ry * cos_rx }
+  }
+  local p = {}
+  for i = 1, 4 do
+    p[i] = { self.x[i][1], self.x[i][2], self.x[i][3], self.x[i][4] }
+  end
+  for i = 1, 3 do
+    for j = 1, 4 do
+      self.x[i][j] = p[1][j] * m[i][1] + p[2][j] * m[i][2] + p[3][j] * m[i][3]
+    end
+  end
+end
+function M44dMT:toTable()
+  local out = {}
+  for i = 1, 4 do
+    for j = 1, 4 do
+      out[#out + 1] = self.x[i][j]
+    end
+  end
+  return out
+end
+
+
+-- Interface ------------------------------------------------------------------
+
+
+local function make_interface(scene)
+  --[[
+  Args:
+    scene(table): {location: GroupAttribute of all its attributes}
+
+  Attributes:
+    location(str): location being cooked
+    opargs(GroupAttribute): op arguments of the location being cooked
+    atroot(bool): value returned by AtRoot()
+    output(table): {location: GroupAttribute set with SetAttr()}
+    children(table): list of {name, optype, opargs} created with CreateChild()
+  ]]
+  local interface = {
+    ["scene"] = scene,
+    ["location"] = "/root",
+    ["opargs"] = GroupAttribute(),
+    ["atroot"] = true,
+    ["time"] = 0,
+    ["output"] = {},
+    ["children"] = {}
+  }
+
+  function interface.GetAttr(name, location)
+    local group = interface.scene[location or interface.location]
+    if not group then
+      return nil
+    end
+    if name == "" then
+      return group
+    end
+    return group:getChildByName(name)
+  end
+  function interface.GetOpArg(name)
+    if not name or name == "" then
+      return interface.opargs
+    end
+    return interface.opargs:getChildByName(name)
+  end
+  function interface.SetAttr(name, attribute)
+    local out = interface.output[interface.location] or GroupAttribute()
+    interface.output[interface.location] = out
+    if name == "" then
+      for _, child in ipairs(attribute.names) do
+        group_set(out, child, attribute.children[child])
+      end
+    else
+      group_set(out, name, attribute)
+    end
+  end
+  function interface.CreateChild(name, optype, opargs)
+    interface.children[#interface.children + 1] = { name, optype, opargs }
+  end
+  function interface.GetOpType()
+    return "OpScript.Lua"
+  end
+  function interface.GetCurrentTime()
+    return interface.time
+  end
+  function interface.AtRoot()
+    return interface.atroot
+  end
+  function interface.GetInputLocationPath()
+    return interface.location
+  end
+  function interface.GetOutputLocationPath()
+    return interface.location
+  end
+  function interface.GetGlobalXFormGroup(location)
+    return interface.GetAttr("xform", location) or GroupAttribute()
+  end
+  function interface.GetBoundAttr(location)
+    return interface.GetAttr("bound", location)
+  end
+
+  return interface
+end
+
+
+--[[ __________________________________________________________________________
+  API
+]]
+
+
+function _M_.install(scene)
+  --[[
+  Create the Katana globals and register the lllogger module.
+
+  Args:
+    scene(table): {location: GroupAttribute of all its attributes}
+  Returns:
+    table: the Interface global
+  ]]
+  package.loaded["lllogger"] = make_lllogger()
+
+  IntAttribute = make_data_class("int")
+  FloatAttribute = make_data_class("float")
+  DoubleAttribute = make_data_class("double")
+  StringAttribute = make_data_class("string")
+  _G.GroupAttribute = GroupAttribute
+  _G.GroupBuilder = GroupBuilder
+  _G.Attribute = Attribute
+  Imath = { ["M44d"] = M44d, ["V3d"] = V3d }
+  Config = {
+    ["Get"] = function()
+      return "4.5.1.000008"
+    end
+  }
+  XFormUtils = {
+    ["CalcTransformedBoundsAtExistingTimes"] = function(_, bound)
+      return bound
+    end,
+    ["CalcTransformMatrixAtTime"] = function(xform)
+      -- only support a xform group with a <matrix> child
+      local matrix = xform:getChildByName("matrix")
+      if matrix then
+        return matrix
+      end
+      return DoubleAttribute(
+          { 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1 },
+          16
+      )
+    end
+  }
+
+  Interface = make_interface(scene or {})
+  return Interface
+end
+
+--[[
+Create a DataAttribute using the given tables without copying them, to build
+big scenes without doubling their memory.
+
+Args:
+  kind(str): "int", "float", "double", "string"
+  samples(table): {time: flat table of values}
+  tuple(number): tuple size
+]]
+function _M_.new_data_attribute(kind, samples, tuple)
+  local times = {}
+  for time, _ in pairs(samples) do
+    times[#times + 1] = time
+  end
+  table.sort(times)
+  return new_data_attribute(kind, samples, times, tuple)
+end
+
+_M_.group_set = group_set
+
+return _M_
@@ -0,0 +1,267 @@
+--[[
+Compare the matrices computed by PointCloudData's <convert_trs_to_matrix>
+(the closed-form trs_to_matrices()) to the Imath path they replace :
+
+  m44 = Imath.M44d(); m44:translate(t); m44:rotate(r); m44:scale(s)
+
+using the Imath.M44d of the Katana stub. Every value must be identical,
+signed zeros included.
+
+Doesn't need Katana, run from the repository root with LuaJIT :
+
+  luajit dev/benchmarks/matrices.lua [points=1000]
+
+Print one line per case and exit with an error code if one of them failed.
+]]
+package.path = "./?.lua;./dev/benchmarks/?.lua;" .. package.path
+
+local katana = require("katana")
+
+local POINTCLOUD = "/root/world/geo/pointcloud"
+local SOURCE = "/root/world/geo/assets/source0"
+local SAMPLES = { -0.25, 0.0, 0.25 }
+
+local count = tonumber(arg[1]) or 1000
+
+-- deterministic pseudo-random generator (same results on every run)
+local seed = 12345
+local function random()
+  seed = (seed * 1103515245 + 12345) % 2147483648
+  return seed / 2147483648
+end
+
+-- values producing signed zeros in the matrices, used for the first points
+local SPECIAL_ROTATIONS = { 0.0, -0.0, 90.0, -90.0, 180.0, -180.0, 270.0, 360.0 }
+local SPECIAL_VALUES = { 0.0, -0.0, 1.0, -1.0 }
+
+local function generate(tuple, animated, special, scale)
+  --[[
+  Args:
+    tuple(number): tuple size
+    animated(bool): true to have the <SAMPLES> time samples, else only 0.0
+    special(table): values used in turn for the first points
+    scale(number): range of the random values
+  Returns:
+    table: {time: flat table of values}
+  ]]
+  local samples = {}
+  for _, time in ipairs(animated and SAMPLES or { 0.0 }) do
+    local values = {}
+    for i = 1, count * tuple do
+      if i <= #special * tuple then
+        values[i] = special[(i - 1) % #special + 1]
+      else
+        values[i] = (random() - 0.5) * scale + time
+      end
+    end
+    samples[time] = values
+  end
+  return samples
+end
+
+local function get_scene(common)
+  --[[
+  Args:
+    common(table): {token: {"tuple": number, "samples": table}}
+  Returns:
+    table: {location: GroupAttribute}
+  ]]
+  local pointcloud = GroupAttribute()
+  local declared = {}
+  for token, data in pairs(common) do
+    local path = "geometry.arbitrary." .. token .. ".value"
+    katana.group_set(
+        pointcloud,
+        path,
+        katana.new_data_attribute("double", data.samples, data.tuple)
+    )
+    declared[#declared + 1] = path
+    declared[#declared + 1] = "$" .. token
+    declared[#declared + 1] = tostring(data.tuple)
+  end
+  katana.group_set(pointcloud, "instancing.data.sources", StringAttribute({ SOURCE, "0" }, 2))
+  katana.group_set(pointcloud, "instancing.data.common", StringAttribute(declared, 3))
+  katana.group_set(pointcloud, "instancing.data.points.attr", StringAttribute({ "", "1" }, 2))
+  katana.group_set(pointcloud, "instancing.data.points.count", IntAttribute({ count }, 1))
+  katana.group_set(pointcloud, "instancing.settings.convert_trs_to_matrix", IntAttribute({ 1 }, 1))
+  katana.group_set(pointcloud, "instancing.settings.enable_motion_blur", IntAttribute({ 1 }, 1))
+
+  local source = GroupAttribute()
+  katana.group_set(source, "type", StringAttribute({ "subdmesh" }))
+
+  return { [POINTCLOUD] = pointcloud, [SOURCE] = source }
+end
+
+local function get_sample(data, sample)
+  --[[
+  Returns:
+    table: values of <data> at <sample>, or at 0.0 if it is not animated.
+  ]]
+  return data.samples[sample] or data.samples[0.0]
+end
+
+local function imath_matrices(common, sample)
+  --[[
+  Returns:
+    table: flat table of the 16 values of each point, computed with Imath.
+  ]]
+  local out = {}
+  local d2r = math.pi / 180.0
+  local translation = common.translation
+  local rotation = common.rotation
+  local rotations = common.rotationX and {
+    common.rotationX, common.rotationY, common.rotationZ
+  }
+  local scale = common.scale
+  local m44
+  local offset
+
+  for i = 0, count - 1 do
+    m44 = Imath.M44d()
+    if translation then
+      offset = i * translation.tuple
+      local v = get_sample(translation, sample)
+      m44:translate(Imath.V3d(v[offset + 1], v[offset + 2], v[offset + 3]))
+    end
+    if rotation then
+      offset = i * rotation.tuple
+      local v = get_sample(rotation, sample)
+      m44:rotate(Imath.V3d(
+          v[offset + 1] * d2r, v[offset + 2] * d2r, v[offset + 3] * d2r
+      ))
+    end
+    if rotations then
+      -- each axis is the first item of its own tuple
+      local r = {}
+      for axis, data in ipairs(rotations) do
+        r[axis] = get_sample(data, sample)[i * data.tuple + 1] * d2r
+      end
+      m44:rotate(Imath.V3d(r[1], r[2], r[3]))
+    end
+    if scale then
+      offset = i * scale.tuple
+      local v = get_sample(scale, sample)
+      m44:scale(Imath.V3d(v[offset + 1], v[offset + 2], v[offset + 3]))
+    end
+    for _, value in ipairs(m44:toTable()) do
+      out[#out + 1] = value
+    end
+  end
+
+  return out
+end
+
+local function same(a, b)
+  --[[
+  Returns:
+    bool: true if <a> and <b> are the same number, sign of zero included.
+  ]]
+  return a == b and (a ~= 0 or 1 / a == 1 / b)
+end
+
+local function check(name, common, samples)
+  --[[
+  Args:
+    name(str): case name
+    common(table): see <get_scene()>
+    samples(table): time samples expected on the matrices
+  Returns:
+    bool: true if the case passed
+  ]]
+  local Interface = katana.install()
+  Interface.scene = get_scene(common)
+  for module, _ in pairs(package.loaded) do
+    if module:match("^kui") then
+      package.loaded[module] = nil
+    end
+  end
+  local PointCloudData = require("kui.PointCloudData")
+
+  local point_data = PointCloudData:new(POINTCLOUD)
+  point_data:build()
+  local matrices = point_data:get_common_by_name("matrix"):get_value_at()
+
+  local found = 0
+  for _, _ in pairs(matrices) do
+    found = found + 1
+  end
+  if found ~= #samples then
+    print(string.format(
+        "FAIL %s: %d time samples instead of %d", name, found, #samples
+    ))
+    return false
+  end
+
+  for _, sample in ipairs(samples) do
+    local expected = imath_matrices(common, sample)
+    local values = matrices[sample]
+    if not values or #values ~= #expected then
+      print(string.format("FAIL %s: missing values at sample %s", name, sample))
+      return false
+    end
+    for i = 1, #expected do
+      if not same(values[i], expected[i]) then
+        print(string.format(
+            "FAIL %s: point %d value %d at sample %s: %.17g instead of %.17g",
+            name, math.floor((i - 1) / 16), (i - 1) % 16, sample, values[i], expected[i]
+        ))
+        return false
+      end
+    end
+  end
+
+  print("ok   " .. name)
+  return true
+end
+
+local translation = { ["tuple"] = 3, ["samples"] = generate(3, true, SPECIAL_VALUES, 1000) }
+local rotation = { ["tuple"] = 3, ["samples"] = generate(3, true, SPECIAL_ROTATIONS, 720) }
+local scale = { ["tuple"] = 3, ["samples"] = generate(3, false, SPECIAL_VALUES, 4) }
+local static_rotation = { ["tuple"] = 3, ["samples"] = generate(3, false, SPECIAL_ROTATIONS, 720) }
+local rotation_x = { ["tuple"] = 1, ["samples"] = generate(1, true, SPECIAL_ROTATIONS, 720) }
+local rotation_y = { ["tuple"] = 3, ["samples"] = generate(3, true, SPECIAL_ROTATIONS, 720) }
+local rotation_z = { ["tuple"] = 2, ["samples"] = generate(2, false, SPECIAL_ROTATIONS, 720) }
+
+local passed = true
+
+passed = check(
+    "translation, rotation, scale with motion",
+    { ["translation"] = translation, ["rotation"] = rotation, ["scale"] = scale },
+    SAMPLES
+) and passed
+
+passed = check(
+    "static",
+    { ["translation"] = { ["tuple"] = 3, ["samples"] = { [0.0] = translation.samples[0.0] } },
+      ["rotation"] = static_rotation,
+      ["scale"] = scale },
+    { 0.0 }
+) and passed
+
+passed = check(
+    "translation only",
+    { ["translation"] = translation },
+    SAMPLES
+) and passed
+
+passed = check(
+    "rotation only",
+    { ["rotation"] = rotation },
+    SAMPLES
+) and passed
+
+passed = check(
+    "rotation and scale",
+    { ["rotation"] = static_rotation, ["scale"] = scale },
+    { 0.0 }
+) and passed
+
+passed = check(
+    "rotationX/Y/Z with different tuple sizes",
+    { ["rotationX"] = rotation_x, ["rotationY"] = rotation_y, ["rotationZ"] = rotation_z },
+    SAMPLES
+) and passed
+
+if not passed then
+  os.exit(1)
+end
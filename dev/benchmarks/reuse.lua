@@ -0,0 +1,176 @@
+--[[
+Regression check of the incremental rebuild of PointCloudData : a location
+cooked a second time after a modification must give the same values as a
+build from scratch, whatever the derived stages reused from the first cook.
+
+Doesn't need Katana, run from the repository root with LuaJIT :
+
+  luajit dev/benchmarks/reuse.lua
+
+Print one line per case and exit with an error code if one of them failed.
+]]
+package.path = "./?.lua;./dev/benchmarks/?.lua;" .. package.path
+
+local katana = require("katana")
+
+local POINTCLOUD = "/root/world/geo/pointcloud"
+local SOURCE = "/root/world/geo/assets/source0"
+local COUNT = 4
+
+local function constant(kind, tuple, value)
+  --[[
+  Returns:
+    DataAttribute: COUNT points all with <value> for each of their values.
+  ]]
+  local values = {}
+  for i = 1, COUNT * tuple do
+    values[i] = value
+  end
+  return katana.new_data_attribute(kind, { [0.0] = values }, tuple)
+end
+
+local function get_scene(common, settings)
+  --[[
+  Args:
+    common(table): list of {token, DataAttribute}
+    settings(table): {setting name: number}
+  Returns:
+    table: {location: GroupAttribute}
+  ]]
+  local pointcloud = GroupAttribute()
+  local declared = {}
+  for _, entry in ipairs(common) do
+    local path = "geometry.arbitrary." .. entry[1] .. ".value"
+    katana.group_set(pointcloud, path, entry[2])
+    declared[#declared + 1] = path
+    declared[#declared + 1] = "$" .. entry[1]
+    declared[#declared + 1] = tostring(entry[2]:getTupleSize())
+  end
+  katana.group_set(pointcloud, "geometry.point.P", constant("float", 3, 0))
+  katana.group_set(pointcloud, "instancing.data.sources", StringAttribute({ SOURCE, "0" }, 2))
+  katana.group_set(pointcloud, "instancing.data.common", StringAttribute(declared, 3))
+  katana.group_set(pointcloud, "instancing.data.points.attr", StringAttribute({ "geometry.point.P", "3" }, 2))
+  katana.group_set(pointcloud, "instancing.data.points.count", IntAttribute({ 0 }, 1))
+  for name, value in pairs(settings) do
+    katana.group_set(pointcloud, "instancing.settings." .. name, IntAttribute({ value }, 1))
+  end
+
+  local source = GroupAttribute()
+  katana.group_set(source, "type", StringAttribute({ "subdmesh" }))
+
+  return { [POINTCLOUD] = pointcloud, [SOURCE] = source }
+end
+
+local function dump(point_data)
+  --[[
+  Returns:
+    str: all the common attributes values, sorted by token.
+  ]]
+  local tokens = {}
+  for token, attr in pairs(point_data:get_commons()) do
+    if attr and token ~= "sources" then
+      tokens[#tokens + 1] = token
+    end
+  end
+  table.sort(tokens)
+
+  local out = {}
+  for _, token in ipairs(tokens) do
+    local values = point_data:get_common_by_name(token):get_value_at(nil, 0.0)
+    local buf = {}
+    for i = 1, #values do
+      buf[i] = string.format("%.9g", values[i])
+    end
+    out[#out + 1] = token .. "=" .. table.concat(buf, ",")
+  end
+  return table.concat(out, " ")
+end
+
+local function check(name, before, after, settings)
+  --[[
+  Cook the scene built from <before> then from <after> through the cache, and
+  compare the second cook to a build from scratch of <after>.
+
+  Args:
+    name(str): case name
+    before(table): common tokens of the first cook, see <get_scene()>
+    after(table): common tokens of the second cook
+    settings(table): settings used by both cooks
+  Returns:
+    bool: true if the case passed
+  ]]
+  local Interface = katana.install()
+  for module, _ in pairs(package.loaded) do
+    if module:match("^kui") then
+      package.loaded[module] = nil
+    end
+  end
+  local cache = require("kui.cache")
+  local PointCloudData = require("kui.PointCloudData")
+
+  Interface.scene = get_scene(before, settings)
+  cache.get_point_data(POINTCLOUD, 512)
+  Interface.scene = get_scene(after, settings)
+  local reused = dump(cache.get_point_data(POINTCLOUD, 512))
+
+  local fresh = PointCloudData:new(POINTCLOUD)
+  fresh:build()
+  fresh = dump(fresh)
+
+  if reused == fresh then
+    print("ok   " .. name)
+    return true
+  end
+  print("FAIL " .. name)
+  print("  reused: " .. reused)
+  print("  fresh:  " .. fresh)
+  return false
+end
+
+local passed = true
+
+passed = check(
+    "declared $matrix changed",
+    { { "matrix", constant("double", 16, 1) } },
+    { { "matrix", constant("double", 16, 5) } },
+    { ["convert_trs_to_matrix"] = 0 }
+) and passed
+
+passed = check(
+    "declared $rotationX/Y/Z changed",
+    {
+      { "rotationX", constant("float", 1, 10) },
+      { "rotationY", constant("float", 1, 10) },
+      { "rotationZ", constant("float", 1, 10) },
+    },
+    {
+      { "rotationX", constant("float", 1, 20) },
+      { "rotationY", constant("float", 1, 20) },
+      { "rotationZ", constant("float", 1, 20) },
+    },
+    { ["convert_trs_to_matrix"] = 1 }
+) and passed
+
+passed = check(
+    "$rotation changed",
+    { { "rotation", constant("float", 3, 10) } },
+    { { "rotation", constant("float", 3, 20) } },
+    { ["convert_trs_to_matrix"] = 1 }
+) and passed
+
+passed = check(
+    "$scale changed, $rotation reused",
+    {
+      { "rotation", constant("float", 3, 10) },
+      { "scale", constant("float", 3, 1) },
+    },
+    {
+      { "rotation", constant("float", 3, 10) },
+      { "scale", constant("float", 3, 2) },
+    },
+    { ["convert_trs_to_matrix"] = 1 }
+) and passed
+
+if not passed then
+  os.exit(1)
+end
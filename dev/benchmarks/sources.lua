@@ -0,0 +1,116 @@
+--[[
+Benchmark of SourcesAttribute:get_instance_source_data_at() called for every
+point, with a lot of instance sources, using the Katana stub from katana.lua.
+
+Doesn't need Katana, run from the repository root with LuaJIT :
+
+  luajit dev/benchmarks/sources.lua [points=1000000] [sources=500]
+
+The last instance sources declared reuse the indexes of the first ones : the
+results are checked to still resolve to the first declared source.
+
+Print one JSON line with the timings in seconds and exit with an error code
+if a point resolved to the wrong instance source.
+]]
+package.path = "./?.lua;./dev/benchmarks/?.lua;" .. package.path
+
+local katana = require("katana")
+
+local POINTCLOUD = "/root/world/geo/pointcloud"
+-- number of instance sources declared again with an existing index
+local DUPLICATES = 10
+
+local count = tonumber(arg[1]) or 1000000
+local source_count = tonumber(arg[2]) or 500
+
+-- deterministic pseudo-random generator (same results on every run)
+local seed = 12345
+local function random()
+  seed = (seed * 1103515245 + 12345) % 2147483648
+  return seed / 2147483648
+end
+
+local function get_location(index)
+  return "/root/world/geo/assets/source" .. index
+end
+
+local function get_scene()
+  --[[
+  Returns:
+    table: {location: GroupAttribute}
+  ]]
+  local pointcloud = GroupAttribute()
+  local scene = { [POINTCLOUD] = pointcloud }
+
+  local sources = {}
+  local function declare(location, index)
+    sources[#sources + 1] = location
+    sources[#sources + 1] = tostring(index)
+    scene[location] = GroupAttribute()
+    katana.group_set(scene[location], "type", StringAttribute({ "subdmesh" }))
+  end
+  for i = 0, source_count - 1 do
+    declare(get_location(i), i)
+  end
+  for i = 0, DUPLICATES - 1 do
+    declare("/root/world/geo/assets/duplicate" .. i, i)
+  end
+
+  local indexes = {}
+  for pid = 1, count do
+    indexes[pid] = math.floor(random() * source_count)
+  end
+
+  katana.group_set(
+      pointcloud,
+      "geometry.arbitrary.index.value",
+      katana.new_data_attribute("int", { [0.0] = indexes }, 1)
+  )
+  katana.group_set(pointcloud, "instancing.data.sources", StringAttribute(sources, 2))
+  katana.group_set(pointcloud, "instancing.data.common", StringAttribute({
+    "geometry.arbitrary.index.value", "$index", "1",
+  }, 3))
+  katana.group_set(pointcloud, "instancing.data.points.attr", StringAttribute({ "", "1" }, 2))
+  katana.group_set(pointcloud, "instancing.data.points.count", IntAttribute({ count }, 1))
+
+  return scene
+end
+
+local Interface = katana.install()
+Interface.scene = get_scene()
+local PointCloudData = require("kui.PointCloudData")
+
+local stime = os.clock()
+local point_data = PointCloudData:new(POINTCLOUD)
+point_data:build()
+local build_time = os.clock() - stime
+
+local sources = point_data:get_common_by_name("sources")
+local indexes = point_data:get_common_by_name("index"):get_value_at(nil, 0.0)
+
+-- lookup alone, as done per point by the instancing methods
+stime = os.clock()
+for pid = 0, count - 1 do
+  sources:get_instance_source_data_at(pid)
+end
+local lookup_time = os.clock() - stime
+
+local errors = 0
+local data
+for pid = 0, count - 1 do
+  data = sources:get_instance_source_data_at(pid)
+  if data[1] ~= get_location(indexes[pid + 1]) or
+      tonumber(data[2]) ~= tonumber(indexes[pid + 1]) then
+    errors = errors + 1
+  end
+end
+
+print(string.format(
+    '{"points": %d, "sources": %d, "duplicates": %d, "build": %.4f, \z
+    "lookup": %.4f, "errors": %d}',
+    count, source_count, DUPLICATES, build_time, lookup_time, errors
+))
+
+if errors > 0 then
+  os.exit(1)
+end
@@ -1,5 +1,5 @@
 --[[
-version=13
+version=28
 
 [LICENSE]
 
@@ -29,6 +29,9 @@ logger.formatter:set_tbl_display_indexes(true)
 -- heavy loops. Note: this is not that useful for PointCloudData
 local tostring = tostring
 local mathfloor = math.floor
+local mathcos = math.cos
+local mathsin = math.sin
+local mathpi = math.pi
 
 
 --[[ __________________________________________________________________________
@@ -36,6 +39,131 @@ local mathfloor = math.floor
 ]]
 
 
+local function trs_to_matrices(
+    count,
+    tvalues, tsize,
+    rxvalues, rxsize,
+    ryvalues, rysize,
+    rzvalues, rzsize,
+    svalues, ssize
+)
+  --[[
+  Compute the 4x4 matrix of each point from flat tables of translation,
+  rotation and scale values (all for the same time sample).
+
+  This is the closed-form of the Imath path :
+    m44 = Imath.M44d(); m44:translate(t); m44:rotate(r); m44:scale(s)
+  The operations (including the multiplications by the identity's 0 and 1)
+  are written in the same order as Imath does, so the result is identical,
+  signed zeros included.
+
+  /!\ perfs
+
+  Args:
+    count(number): number of points
+    tvalues(table or nil): translation values, nil to skip translation
+    tsize(number or nil): translation tupleSize
+    rxvalues(table or nil): rotationX values in degree, value is the first
+      item of the tuple. nil to skip rotation.
+    rxsize(number or nil): rotationX tupleSize
+    ryvalues(table or nil): same as rxvalues for Y
+    rysize(number or nil): rotationY tupleSize
+    rzvalues(table or nil): same as rxvalues for Z
+    rzsize(number or nil): rotationZ tupleSize
+    svalues(table or nil): scale values, nil to skip scale
+    ssize(number or nil): scale tupleSize
+  Returns:
+    table: flat table of 16 * count values
+  ]]
+
+  local out = {}
+  -- same value as utils.degree_to_radian()
+  local d2r = mathpi / 180.0
+
+  -- matrix rows, row 3 is the translation
+  local m00, m01, m02, m03
+  local m10, m11, m12, m13
+  local m20, m21, m22, m23
+  local m30, m31, m32, m33
+  -- rotation matrix
+  local r00, r01, r02, r10, r11, r12, r20, r21, r22
+  local x, y, z
+  local cos_rx, cos_ry, cos_rz, sin_rx, sin_ry, sin_rz
+  local offset
+  local oi = 0
+
+  for i = 0, count - 1 do
+
+    -- translation, applied on an identity matrix
+    if tvalues then
+      offset = i * tsize
+      x, y, z = tvalues[offset + 1], tvalues[offset + 2], tvalues[offset + 3]
+      m30 = 0.0 + (x * 1.0 + y * 0.0 + z * 0.0)
+      m31 = 0.0 + (x * 0.0 + y * 1.0 + z * 0.0)
+      m32 = 0.0 + (x * 0.0 + y * 0.0 + z * 1.0)
+      m33 = 1.0 + (x * 0.0 + y * 0.0 + z * 0.0)
+    else
+      m30, m31, m32, m33 = 0.0, 0.0, 0.0, 1.0
+    end
+
+    -- rotation, applied on rows 0-2 that are still the identity ones
+    if rxvalues then
+      x = rxvalues[i * rxsize + 1] * d2r
+      y = ryvalues[i * rysize + 1] * d2r
+      z = rzvalues[i * rzsize + 1] * d2r
+      cos_rz, cos_ry, cos_rx = mathcos(z), mathcos(y), mathcos(x)
+      sin_rz, sin_ry, sin_rx = mathsin(z), mathsin(y), mathsin(x)
+
+      r00 = cos_rz * cos_ry
+      r01 = sin_rz * cos_ry
+      r02 = -sin_ry
+      r10 = -sin_rz * cos_rx + cos_rz * sin_ry * sin_rx
+      r11 = cos_rz * cos_rx + sin_rz * sin_ry * sin_rx
+      r12 = cos_ry * sin_rx
+      r20 = -sin_rz * -sin_rx + cos_rz * sin_ry * cos_rx
+      r21 = cos_rz * -sin_rx + sin_rz * sin_ry * cos_rx
+      r22 = cos_ry * cos_rx
+
+      m00 = 1.0 * r00 + 0.0 * r01 + 0.0 * r02
+      m01 = 0.0 * r00 + 1.0 * r01 + 0.0 * r02
+      m02 = 0.0 * r00 + 0.0 * r01 + 1.0 * r02
+      m03 = 0.0 * r00 + 0.0 * r01 + 0.0 * r02
+      m10 = 1.0 * r10 + 0.0 * r11 + 0.0 * r12
+      m11 = 0.0 * r10 + 1.0 * r11 + 0.0 * r12
+      m12 = 0.0 * r10 + 0.0 * r11 + 1.0 * r12
+      m13 = 0.0 * r10 + 0.0 * r11 + 0.0 * r12
+      m20 = 1.0 * r20 + 0.0 * r21 + 0.0 * r22
+      m21 = 0.0 * r20 + 1.0 * r21 + 0.0 * r22
+      m22 = 0.0 * r20 + 0.0 * r21 + 1.0 * r22
+      m23 = 0.0 * r20 + 0.0 * r21 + 0.0 * r22
+    else
+      m00, m01, m02, m03 = 1.0, 0.0, 0.0, 0.0
+      m10, m11, m12, m13 = 0.0, 1.0, 0.0, 0.0
+      m20, m21, m22, m23 = 0.0, 0.0, 1.0, 0.0
+    end
+
+    -- scale, multiply rows 0-2
+    if svalues then
+      offset = i * ssize
+      x, y, z = svalues[offset + 1], svalues[offset + 2], svalues[offset + 3]
+      m00, m01, m02, m03 = m00 * x, m01 * x, m02 * x, m03 * x
+      m10, m11, m12, m13 = m10 * y, m11 * y, m12 * y, m13 * y
+      m20, m21, m22, m23 = m20 * z, m21 * z, m22 * z, m23 * z
+    end
+
+    out[oi + 1], out[oi + 2], out[oi + 3], out[oi + 4] = m00, m01, m02, m03
+    out[oi + 5], out[oi + 6], out[oi + 7], out[oi + 8] = m10, m11, m12, m13
+    out[oi + 9], out[oi + 10], out[oi + 11], out[oi + 12] = m20, m21, m22, m23
+    out[oi + 13], out[oi + 14], out[oi + 15], out[oi + 16] = m30, m31, m32, m33
+    oi = oi + 16
+
+  end
+
+  return out
+
+end
+
+
 --[[
 list of supported tokens with useful info used internally
 <force_type==false or DataAttribute>
@@ -90,9 +218,68 @@ local AttrGrp = {
   ["common"] = 3,
   ["arbitrary"] = 4,
   ["sources"] = 2,
+  ["lod"] = 3,
   ["points"] = 2  -- not actually used
 }
 
+--[[
+derived stages of <PointCloudData:build()>, in execution order, that can be
+reused from a previous build when their inputs didn't change.
+<reads>: common tokens used by the stage
+<settings>: keys of <PointCloudData.settings> used by the stage
+<writes>: common tokens created, modified or removed by the stage
+
+The signature of a stage also covers its <writes> : a written token can be
+declared by the user and must not be replaced by the previous build's one
+when it changed.
+]]
+local Stages = {
+  {
+    ["name"] = "_convert_rotation_to_axis",
+    ["reads"] = { "rotation" },
+    ["settings"] = {},
+    ["writes"] = { "rotationX", "rotationY", "rotationZ" }
+  },
+  {
+    ["name"] = "_convert_skip_n_hide",
+    ["reads"] = { "skip", "hide" },
+    ["settings"] = {},
+    ["writes"] = { "skip", "hide" }
+  },
+  {
+    ["name"] = "_convert_degree_radian",
+    ["reads"] = { "rotation", "rotationX", "rotationY", "rotationZ" },
+    ["settings"] = { "convert_degree_to_radian" },
+    ["writes"] = { "rotation", "rotationX", "rotationY", "rotationZ" }
+  },
+  {
+    ["name"] = "_convert_trs_to_matrix",
+    ["reads"] = { "translation", "rotationX", "rotationY", "rotationZ", "scale" },
+    ["settings"] = { "convert_trs_to_matrix" },
+    ["writes"] = {
+      "matrix", "translation", "rotation", "rotationX", "rotationY",
+      "rotationZ", "scale"
+    }
+  }
+}
+
+local function get_source_signature(attribute)
+  --[[
+  Args:
+    attribute(BaseAttribute): just built, values not modified yet.
+  Returns:
+    str: different as soon as the values read by the attribute can be.
+  ]]
+  local source = attribute.__source
+  return utils.conkat(
+      attribute.path, ",",
+      attribute.tupleSize, ",",
+      attribute.length, ",",
+      attribute.static, ",",
+      source and source:getHash() or ""
+  )
+end
+
 local BaseAttribute = {}
 function BaseAttribute:new(parent, source_path, is_static)
   --[[
@@ -112,8 +299,28 @@ function BaseAttribute:new(parent, source_path, is_static)
       simply get the number of values. Thta's why this attribute exists.
     static(bool or nil):
       If true return the default time sample 0.0 instead of a table of time samples.
-    values(table):
-      unordered table of time samples with their corresponding table of values
+    values(table or false):
+      unordered table of time samples with their corresponding table of values.
+      Values are stored "columnar": one flat table of values per time sample,
+      a point being <tupleSize> successive values.
+      After <build()> the values are only decoded when first needed.
+    __slices(table):
+      reusable buffers for per-point reads, see <__get_slice()>.
+      unordered table of time samples with the buffer for each.
+    __point_samples(table):
+      reusable table of time samples returned for per-point reads
+    __samples(table):
+      ascending list of the time samples in <values>, built once per
+      <set_values()> call.
+    __nearest_query(number or false):
+      last time sample asked to <_get_nearest_sample()>.
+    __nearest_result(number or false):
+      time sample resolved for <__nearest_query>.
+    __source(DataAttribute or false):
+      Katana attribute the values are read from. Kept as long as the values
+      were not modified by <set_values()>.
+    __source_info(table or false):
+      description of <__source> as returned by <utils.get_attr_info()>
   ]]
 
   local attrs = {
@@ -124,27 +331,142 @@ function BaseAttribute:new(parent, source_path, is_static)
     ["tupleSize"] = false,
     ["length"] = false,
     ["values"] = false,
-    ["static"] = is_static or false
+    ["static"] = is_static or false,
+    ["__slices"] = {},
+    ["__point_samples"] = {},
+    ["__samples"] = {},
+    ["__nearest_query"] = false,
+    ["__nearest_result"] = false,
+    ["__source"] = false,
+    ["__source_info"] = false
   }
 
-  function attrs:build()
+  function attrs:build(pcount)
     --[[
     Build self attributes.
     Require <parent> and <path> to be set.
 
     Only override <values> and <length> if it's already set. (not false)
+
+    If the tupleSize or perPoint need to be changed, it is recommended to do it
+    before calling build() so <pcount> can be correctly applied.
+
+    The values are not decoded here but on their first access (see
+    <__load()>) so an attribute that is never modified can be given back
+    as it is by <get_data_at()>.
+
+    Args:
+      pcount(number or nil):
+        number of point to read, the remaining points are never stored.
+        Ignored if the attribute is not perPoint. Read all of them if nil.
     ]]
 
-    local data = utils.get_attr_data(
+    if not self.perPoint then
+      pcount = nil
+    end
+
+    local info = utils.get_attr_info(
         self.parent.location,
         self.path,
-        error,
-        self.static
+        error
     )  -- table
 
-    self.class = self.class or data.class
-    self.tupleSize = self.tupleSize or data.tuple
-    self:set_values(data.values)
+    self.class = self.class or info.class
+    self.tupleSize = self.tupleSize or info.tuple
+
+    local length = info.length
+    if pcount and pcount * self.tupleSize < length then
+      length = pcount * self.tupleSize
+    end
+
+    self.values = false
+    self.length = length
+    self.__slices = {}
+    self.__point_samples = {}
+    self.__source = info.attr
+    self.__source_info = info
+    -- the tupleSize might have been set before build() so check it now
+    self:set_tuple_size(self.tupleSize)
+
+  end
+
+  function attrs:__load()
+    --[[
+    Decode the values from <__source> if not already done.
+
+    Time samples that all hold the same values are collapsed to a single one
+    so the following conversions and the output only process one sample.
+    ]]
+    if self.values or not self.__source then
+      return
+    end
+
+    local source = self.__source
+    local info = self.__source_info
+    local length = self.length
+    if length == info.length then
+      length = nil
+    end
+
+    local values = utils.get_attr_values(source, self.static, length)
+    local collapsed
+    values, collapsed = utils.collapse_samples(values)
+    self:set_values(values)
+
+    if collapsed then
+      -- the values don't have the source time samples anymore
+      logger:info(
+          "[BaseAttribute][__load] <", self.path, "> time samples are all \z
+          identical, collapsed to a single sample."
+      )
+      return
+    end
+
+    -- the values still correspond to the source so keep it
+    self.__source = source
+    self.__source_info = info
+
+  end
+
+  function attrs:_get_unmodified_source(data_class)
+    --[[
+    Args:
+      data_class(DataAttribute table or nil): class wanted, default to <class>
+    Returns:
+      DataAttribute or nil:
+        the source Katana attribute if it can be used as it is instead of
+        the values (same values, time samples, tuple size and class).
+
+    A source with multiple time samples is decoded once to check them : if
+    they are all identical it is not given back so the output only has the
+    collapsed sample.
+    ]]
+    local source = self.__source
+    if not source then
+      return nil
+    end
+
+    local info = self.__source_info
+    if (data_class or self.class) ~= info.class or
+        self.tupleSize ~= info.tuple or
+        self.length ~= info.length then
+      return nil
+    end
+
+    -- static only keeps the 0.0 sample
+    if self.static and (
+        source:getNumberOfTimeSamples() ~= 1 or source:getSampleTime(0) ~= 0.0
+    ) then
+      return nil
+    end
+
+    if source:getNumberOfTimeSamples() > 1 then
+      -- remove <__source> if the samples are collapsed
+      self:__load()
+      return self.__source or nil
+    end
+
+    return source
 
   end
 
@@ -164,25 +486,26 @@ function BaseAttribute:new(parent, source_path, is_static)
       return
     end
 
-    local values_all = self:__value_get(nil, true, nil)
-
-    -- iterate through samples
-    for _, sv in pairs(values_all) do
-
-      for i = #sv, 1, -1 do
-
-        if i == pcount * self.tupleSize then
-          break
-        end
+    local length = pcount * self.tupleSize
+    if length > self.length then
+      return
+    end
 
-        sv[i] = nil
+    self:__load()
 
+    -- copy to new tables so the memory of the removed values is released
+    local samples = {}
+    local newvalues
+    for smpl, oldvalues in pairs(self.values) do
+      newvalues = {}
+      for i = 1, length do
+        newvalues[i] = oldvalues[i]
       end
-
-      self.length = #sv
-
+      samples[smpl] = newvalues
     end
 
+    self:set_values(samples)
+
   end
 
   function attrs:set_static(static)
@@ -220,14 +543,53 @@ function BaseAttribute:new(parent, source_path, is_static)
 
   function attrs:set_values(values)
     --[[
+    The values are then considered modified: the source attribute is
+    not used anymore.
+
     Args:
       values(table): unordered tables of time samples of values
     ]]
     self.values = values
+    self.__source = false
+    self.__source_info = false
     for _, v in pairs(values) do
       self.length = #v
       break -- we only need to do that on the first sample found
     end
+    -- buffers might point to samples that doesn't exist anymore
+    self.__slices = {}
+    self.__point_samples = {}
+    self:_build_samples()
+  end
+
+  function attrs:_build_samples()
+    --[[
+    Build the sorted list of time samples from <values> and reset the
+    nearest sample memo. To call everytime <values> is replaced.
+    ]]
+    self.__samples = utils.get_samples_list_from(self.values)
+    self.__nearest_query = false
+    self.__nearest_result = false
+  end
+
+  function attrs:_get_nearest_sample(nearest_sample)
+    --[[
+    Binary search the time sample closest to the given one. The last result
+    is memoized as the same time is usually asked for every point.
+
+    Args:
+      nearest_sample(number): time sample to find the closest sample from
+    Returns:
+      number: time sample existing on <values>
+    ]]
+    if nearest_sample ~= self.__nearest_query then
+      self.__nearest_query = nearest_sample
+      self.__nearest_result = utils.get_nearest_from_sorted(
+          self.__samples,
+          nearest_sample
+      )
+    end
+    return self.__nearest_result
   end
 
   function attrs:set_data_class(data_class)
@@ -238,7 +600,38 @@ function BaseAttribute:new(parent, source_path, is_static)
     self.class = data_class
   end
 
-  function attrs:__value_get(pid, raw, nearest_sample)
+  function attrs:__get_slice(pid, sample)
+    --[[
+    Copy the values of the given point at the given time sample in a buffer
+    that is reused between calls so no table is allocated per point.
+
+    /!\ perfs
+
+    Args:
+      pid(int): point index: which point to use. !! starts at 0 !!
+      sample(number): time sample that must exist on <values>
+    Returns:
+      table: values for the point. The same table is returned on the next call
+        for this sample so copy it if it needs to be kept.
+    ]]
+    local buf = self.__slices[sample]
+    if not buf then
+      buf = {}
+      self.__slices[sample] = buf
+    end
+
+    local values = self.values[sample]
+    local tuple_size = self.tupleSize
+    local offset = tuple_size * pid
+    -- grouping usually vary between 1 and 16(matrices), so small loop.
+    for grpi = 1, tuple_size do
+      buf[grpi] = values[offset + grpi]
+    end
+
+    return buf
+  end
+
+  function attrs:__value_get(pid, raw, nearest_sample, data_class)
     --[[
     Return the values for this attribute.
     It can be a slice for the given pid, or the entire range of values.
@@ -246,6 +639,9 @@ function BaseAttribute:new(parent, source_path, is_static)
     If self.static=true only the time samples 0.0 will be returned.
 
     !! Must be loop safe. !!
+    When a <pid> is given with raw=true, the returned tables are buffers
+    reused by the next call (see <__get_slice()>), copy them if you need to
+    keep them.
 
     Args:
 
@@ -260,6 +656,9 @@ function BaseAttribute:new(parent, source_path, is_static)
       nearest_sample(number or nil): instead of returning a table of samples,
         return just the time sample values closest to this.
 
+      data_class(DataAttribute table or nil):
+        class of the DataAttribute returned if <raw>=false, default to <class>.
+
     Returns:
       DataAttribute: if <raw>=false
       table: of time samples with at least 0.0 if not <nearest_sample>
@@ -267,97 +666,66 @@ function BaseAttribute:new(parent, source_path, is_static)
       nil: if <attr_name> is empty (=false).
     ]]
 
-    local buf
     local smplbuf
 
-    if not self.values then
-      return nil
-    end
-
     -- we can't get a slice at the given point if the attribute is not perPoint !
     if not self.perPoint then
       pid = nil
     end
 
+    -- unmodified attribute: give back the source without decoding it
+    if pid == nil and not raw and not nearest_sample then
+      smplbuf = self:_get_unmodified_source(data_class)
+      if smplbuf then
+        return smplbuf
+      end
+    end
+
+    self:__load()
+
+    if not self.values then
+      return nil
+    end
+
     -- no point specified, return all the values
     if pid == nil then
 
       smplbuf = self.values  -- table of time samples
-      if self.static == true then
-        smplbuf[0.0] = self.values[0.0]
-      end
 
       if nearest_sample then
-        smplbuf = smplbuf[utils.get_nearest_from_samples(smplbuf, nearest_sample)]
+        smplbuf = smplbuf[self:_get_nearest_sample(nearest_sample)]
       end
 
       -- else return a slice of the table
-    else
-
-      -- first check if we need to process multiple time samples
-      -- we can't filter the time samples AFTER as we would loss the performance
-      -- improvement. So yeah a bit of duplicated code.
-      if self.static == true then
-
-        buf = {}
-        -- grouping usually vary between 1 and 16(matrices), so small loop.
-        for grpi = 1, self.tupleSize do
-          buf[#buf + 1] = self.values[0.0][self.tupleSize * pid + grpi]
-        end
-
-        if nearest_sample then
-          smplbuf = buf
-        else
-          smplbuf = {}
-          smplbuf[0.0] = buf
-        end
+    elseif self.static == true then
 
-        -- process time sample(s) for the given pid
-      else
-
-
-        -- process only sample nearest to given one
-        if nearest_sample then
-
-          local closest_smpl
-          closest_smpl = utils.get_nearest_from_samples(self.values, nearest_sample)
-
-          smplbuf = {}
-
-          buf = self.values[closest_smpl]
-          for grpi = 1, self.tupleSize do
-            smplbuf[#smplbuf + 1] = buf[self.tupleSize * pid + grpi]
-          end
-
-          -- process all time samples :
-        else
-
-          smplbuf = {}
-
-          for smpl, processedvalue in pairs(self.values) do
-
-            buf = {}
-            -- grouping usually vary between 1 and 16(matrices), so small loop.
-            for grpi = 1, self.tupleSize do
-              buf[#buf + 1] = processedvalue[self.tupleSize * pid + grpi]
-            end
+      smplbuf = self:__get_slice(pid, 0.0)
+      if not nearest_sample then
+        self.__point_samples[0.0] = smplbuf
+        smplbuf = self.__point_samples
+      end
 
-            smplbuf[smpl] = buf
+      -- process only sample nearest to given one
+    elseif nearest_sample then
 
-          end
+      smplbuf = self:__get_slice(pid, self:_get_nearest_sample(nearest_sample))
 
-        end
+      -- process all time samples :
+    else
 
-        -- end if static
+      smplbuf = self.__point_samples
+      local samples = self.__samples
+      for i = 1, #samples do
+        smplbuf[samples[i]] = self:__get_slice(pid, samples[i])
       end
-      -- end if pid
+
     end
 
     if raw == true then
       return smplbuf
     else
       -- return as Katana DataAttribute, with the tuple size specified from grouping
-      return self.class(smplbuf, self.tupleSize)
+      return (data_class or self.class)(smplbuf, self.tupleSize)
     end
 
   end
@@ -377,19 +745,70 @@ function BaseAttribute:new(parent, source_path, is_static)
     return self:__value_get(pid, true, nearest_sample)
   end
 
-  function attrs:get_data_at(pid, nearest_sample)
+  function attrs:get_data_at(pid, nearest_sample, data_class)
     --[[
     Returns a DataAttribute instance at the given optional point index
     Time sample 0.0 is at least present or the time sample nearest to the given
     <nearest_sample> is returned.
 
+    Args:
+      pid(int or nil): point index, starts at 0. All the points if nil.
+      nearest_sample(number or nil):
+      data_class(DataAttribute table or nil):
+        to return a different class than <class>, ex: FloatAttribute to
+        store doubles in single precision.
+
     Returns:
       DataAttribute: of time samples with at least 0.0 if not <nearest_sample>
       DataAttribute: of values if <nearest_sample>
       nil: if <attr_name> is empty (=false).
 
     ]]
-    return self:__value_get(pid, false, nearest_sample)
+    return self:__value_get(pid, false, nearest_sample, data_class)
+  end
+
+  function attrs:get_data_for(pids, data_class)
+    --[[
+    Returns a DataAttribute with only the values of the given points, for all
+    the time samples. Not perPoint attributes are returned whole.
+
+    /!\ perfs
+
+    Args:
+      pids(table): ascending list of point index to keep. !! starts at 0 !!
+      data_class(DataAttribute table or nil): same as <get_data_at()>
+    Returns:
+      DataAttribute or nil: nil if <attr_name> is empty (=false).
+    ]]
+    if not self.perPoint then
+      return self:get_data_at(nil, nil, data_class)
+    end
+
+    self:__load()
+    if not self.values then
+      return nil
+    end
+
+    local tuple_size = self.tupleSize
+    local samples = {}
+    local out
+    local n
+    local offset
+
+    for sample, values in pairs(self.values) do
+      out = {}
+      n = 0
+      for i = 1, #pids do
+        offset = pids[i] * tuple_size
+        for grpi = 1, tuple_size do
+          out[n + grpi] = values[offset + grpi]
+        end
+        n = n + tuple_size
+      end
+      samples[sample] = out
+    end
+
+    return (data_class or self.class)(samples, tuple_size)
   end
 
   return attrs
@@ -479,7 +898,13 @@ local function CommonAttribute(parent, source_path, is_static)
       new_size(number): number of index per tuple to keep, cannot be bigger than
         the current tupleSize.
     ]]
-    if not self.values or new_size == self.tupleSize then
+    if new_size == self.tupleSize then
+      return
+    end
+
+    self:__load()
+
+    if not self.values then
       return
     end
 
@@ -513,6 +938,28 @@ local function CommonAttribute(parent, source_path, is_static)
 
 end
 
+local function register_source_index(index_map, index, tuple_index)
+  --[[
+  Add the given instance source index to the map if not already in.
+  The first declared tuple take over duplicated indexes.
+
+  Args:
+    index_map(table): {"source index": tuple index}
+    index(string): instance source index
+    tuple_index(number): starts at 0
+  ]]
+  if index_map[index] ~= nil then
+    return
+  end
+  index_map[index] = tuple_index
+  -- also register the number version so <index> token values can be
+  -- used without tostring(). Only if it gives back the same string.
+  local numindex = tonumber(index)
+  if numindex and tostring(numindex) == index then
+    index_map[numindex] = tuple_index
+  end
+end
+
 local function SourcesAttribute(parent, source_path)
   --[[
   List of instances sources locations with their associated index.
@@ -530,6 +977,14 @@ local function SourcesAttribute(parent, source_path)
     values:
       ordered table of sucessing instance source location, corresponding index
       like {"/root/A", 0, "/root/B", 1, ...}
+    __index_map(table):
+      hashed index of {"source index": tuple index} built in <set_values()>
+      so a source can be found in constant time.
+    __tuples(table):
+      {tuple index: {"instance source location", "index", source attributes}}
+      cache of the tables returned by <get_instance_source_data_at()>
+    __locations(table or false):
+      cache of the table returned by <get_value_at()>
 
   Note: Don't use <pid> with <__value_get()> as the values are not per-point.
   ]]
@@ -537,11 +992,16 @@ local function SourcesAttribute(parent, source_path)
   local inner = CommonAttribute(parent, source_path, true)
 
   inner.perPoint = false
+  inner.__index_map = {}
+  inner.__tuples = {}
+  inner.__locations = false
 
   function inner:_get_tuple_index_at_index(index)
     --[[
     Return the value table's tuple index for the given instance source index
 
+    /!\ perfs
+
     Args:
       index(number or string): instance source index
     Returns:
@@ -549,19 +1009,11 @@ local function SourcesAttribute(parent, source_path)
         nil if bad index given, else values table's tuple index starting at 0
     ]]
 
-    index = tostring(index)
-
-    local sources = self:__value_get(nil, true, 0.0)  -- table of values
-
-    for i = 0, self.length / self.tupleSize - 1 do
-      -- index is the second item of the tuple
-      if index == sources[i * self.tupleSize + 2] then
-        return i
-      end
-
+    local ti = self.__index_map[index]
+    if ti == nil then
+      ti = self.__index_map[tostring(index)]
     end
-
-    return nil
+    return ti
 
   end
 
@@ -588,6 +1040,8 @@ local function SourcesAttribute(parent, source_path)
     Return the instance source location + index + source attributes
      to use at given point index.
 
+    /!\ perfs
+
     Args:
       pid(number): starts at 0
 
@@ -598,12 +1052,13 @@ local function SourcesAttribute(parent, source_path)
         DataAttribute("source attributes"),
         [...]
       }
+      The table is shared between all the points using the same source so
+      it must not be modified.
     ]]
-    local v = self:__value_get(nil, true, 0.0)  -- table of values
 
     -- return a list of instance sources locations with indexes
     if not pid then
-      return v
+      return self:__value_get(nil, true, 0.0)  -- table of values
     end
 
     -- else if pid return the instance source + index for the given point
@@ -613,7 +1068,7 @@ local function SourcesAttribute(parent, source_path)
 
     local ti = self:_get_tuple_index_at_index(index)
     if ti then
-      return { v[ti * self.tupleSize + 1], index, v[ti * self.tupleSize + 3] }
+      return self.__tuples[ti]
     end
 
     -- if the function didn't return yet mean we didn't find an instance source
@@ -631,14 +1086,21 @@ local function SourcesAttribute(parent, source_path)
     Returns:
       table: {"instance source location", [...]}
     ]]
+
+    if self.__locations then
+      return self.__locations
+    end
+
     local out = {}
-    local sources = self:get_instance_source_data_at(pid)
+    local sources = self:get_instance_source_data_at()
     -- filter to only keep locations
     -- convert the associated instance index to the table index
     for i = 0, #sources / self.tupleSize - 1 do
       -- storred index start counting at 0 so offset
       out[tonumber(sources[i * self.tupleSize + 2]) + 1] = sources[i * self.tupleSize + 1]
     end
+
+    self.__locations = out
     return out
 
   end
@@ -654,6 +1116,19 @@ local function SourcesAttribute(parent, source_path)
 
   end
 
+  local base_build = inner.build
+
+  function inner:build()
+    --[[
+    Build and decode the values right away as they are always needed.
+    The values are then different from the source attribute.
+    ]]
+    base_build(self)
+    self:__load()
+    self.__source = false
+    self.__source_info = false
+  end
+
   function inner:set_values(values)
     --[[
     Args:
@@ -661,15 +1136,26 @@ local function SourcesAttribute(parent, source_path)
     ]]
     values = values[0.0]
 
+    local index_map = {}
+    local tuples = {}
+    local tuple
+
     -- we will add a third index to each tuple which correspond to the local
     -- attribute stored on the source location
     local new = {}
     for i = 0, #values / 2 - 1 do
 
-      new[#new + 1] = values[i * 2 + 1]  -- instance source location
-      new[#new + 1] = values[i * 2 + 2]  -- index
-      -- add the third index
-      new[#new + 1] = Interface.GetAttr("", values[i * 2 + 1])
+      tuple = {
+        values[i * 2 + 1], -- instance source location
+        values[i * 2 + 2], -- index
+        Interface.GetAttr("", values[i * 2 + 1]) -- the third index
+      }
+      new[#new + 1] = tuple[1]
+      new[#new + 1] = tuple[2]
+      new[#new + 1] = tuple[3]
+      tuples[i] = tuple
+
+      register_source_index(index_map, tostring(tuple[2]), i)
 
     end
 
@@ -678,9 +1164,47 @@ local function SourcesAttribute(parent, source_path)
     values[0.0] = new
     self.values = values
     self.tupleSize = 3
+    self.__index_map = index_map
+    self.__tuples = tuples
+    self.__locations = false
+    self:_build_samples()
 
   end
 
+  function inner:add_source(location, index)
+    --[[
+    Add a new instance source after the ones already built.
+
+    Args:
+      location(string): instance source location
+      index(string): instance source index, must not be already used.
+    ]]
+    local values = self.values[0.0]
+    local ti = #values / self.tupleSize
+    local tuple = { location, index, Interface.GetAttr("", location) }
+
+    values[#values + 1] = tuple[1]
+    values[#values + 1] = tuple[2]
+    values[#values + 1] = tuple[3]
+    self.__tuples[ti] = tuple
+    register_source_index(self.__index_map, index, ti)
+    self.length = #values
+    self.__locations = false
+
+  end
+
+  function inner:get_max_index()
+    --[[
+    Returns:
+      number: biggest instance source index declared.
+    ]]
+    local out = -1
+    for _, tuple in pairs(self.__tuples) do
+      out = math.max(out, tonumber(tuple[2]) or -1)
+    end
+    return out
+  end
+
   return inner
 
 end
@@ -694,7 +1218,10 @@ function PointCloudData:new(location)
     ["common"] = {},
     ["arbitrary"] = {},
     ["points"] = false,
-    ["settings"] = {}
+    ["settings"] = {},
+    ["stats"] = false,
+    ["__signatures"] = {},
+    ["__stages"] = {}
   }
 
   function attrs:_build_settings()
@@ -731,11 +1258,34 @@ function PointCloudData:new(location)
       self.settings.disable_motion_blur = false
     end
 
+    setting = utils.get_attr_value(
+        self.location,
+        "instancing.settings.lod_camera",
+        { "" }
+    ) -- type: table
+    self.settings.lod_camera = setting[1]
+
+    setting = utils.get_attr_value(
+        self.location,
+        "instancing.settings.single_precision",
+        { 0 }
+    ) -- type: table
+    self.settings.single_precision = setting[1]
+
+    setting = utils.get_attr_value(
+        self.location,
+        "instancing.settings.precision_report",
+        { 0 }
+    ) -- type: table
+    self.settings.precision_report = setting[1]
+
   end
 
   function attrs:_build_points()
     --[[
     Set the self.points.count attribute based on the point token submitted.
+
+    The point attribute is only described, not decoded, to count the points.
     ]]
 
     local data_points = utils.get_attr_value(
@@ -752,14 +1302,14 @@ function PointCloudData:new(location)
           error
       ) -- table of 2 values, first is attribute location, second is tupleSize
 
-      local points = utils.get_attr_value(
+      local points = utils.get_attr_info(
           self.location,
           data_points[1],
           error
       )
 
       self.points = {}
-      self.points.count = #points / data_points[2]
+      self.points.count = points.length / tonumber(data_points[2])
 
     else
 
@@ -819,8 +1369,6 @@ function PointCloudData:new(location)
           path,
           self.settings.disable_motion_blur or Tokens.list[token].static
       )
-      attribute:build()
-
       if token == "skip" then
         attribute.perPoint = false
       end
@@ -830,6 +1378,10 @@ function PointCloudData:new(location)
         attribute:set_tuple_size(tuplesize)
       end
 
+      -- only the values for <points.count> points are read
+      attribute:build(self.points.count)
+      self.__signatures[token] = get_source_signature(attribute)
+
       -- for <index> and <skip> token, make sure to convert tuple to 1
       -- the last index from the group is used ({2,2,<2>})
       if token == "index" or token == "skip" then
@@ -898,13 +1450,14 @@ function PointCloudData:new(location)
       -- to execute before build() (set static)!
       attribute:set_additional_from_string(additional, target)
 
-      attribute:build()
-
       -- -1 mean the tupleSize was not specified so let the one found by build
       if tuplesize ~= -1 then
         attribute:set_tuple_size(tuplesize)
       end
 
+      -- only the values for <points.count> points are read
+      attribute:build(self.points.count)
+
       attribute:rescale_points(self.points.count)
 
       self["arbitrary"][target] = attribute
@@ -938,36 +1491,44 @@ function PointCloudData:new(location)
       return
     end
 
-    local sv
     local attr
+    local step
+    local converted
+    local buf
 
-    -- convert the rotationX/Y/Z tokens
-    for _, token in ipairs({ "rotationX", "rotationY", "rotationZ" }) do
+    -- only the angle (first value) of the rotationX/Y/Z tokens is converted,
+    -- all the values of the rotation token are.
+    -- New attributes are created so the previous ones stay valid for a later
+    -- incremental build.
+    for _, token in ipairs({ "rotationX", "rotationY", "rotationZ", "rotation" }) do
 
       attr = self:get_common_by_name(token)
-      sv = attr:get_value_at()
-
-      for sample, values in pairs(sv) do
-        for i = 0, #values / attr.tupleSize - 1 do
-          -- make sure the axis are not processed !
-          values[i * attr.tupleSize + 1] = convert_func(
-              values[i * attr.tupleSize + 1]
-          )
-        end
-      end
 
-    end
+      if attr then
 
-    logger:debug(
-        "[PointCloudData][_convert_degree_radian] Converted rotation axis"
-    )
+        step = token == "rotation" and 1 or attr.tupleSize
+        converted = {}
 
-    -- convert the rotation token
-    sv = self.common.rotation:get_value_at()
-    for _, values in pairs(sv) do
+        for sample, values in pairs(attr:get_value_at()) do
+          buf = {}
+          for i = 1, #values do
+            buf[i] = values[i]
+          end
+          for i = 1, #values, step do
+            buf[i] = convert_func(values[i])
+          end
+          converted[sample] = buf
+        end
+
+        self["common"][token] = CommonAttribute(
+            self,
+            "function _convert_degree_radian",
+            attr.static
+        )
+        self["common"][token]:set_tuple_size(attr.tupleSize)
+        self["common"][token]:set_data_class(attr.class)
+        self["common"][token]:set_values(converted)
 
-      for i = 1, #values do
-        values[i] = convert_func(values[i])
       end
 
     end
@@ -1115,6 +1676,152 @@ function PointCloudData:new(location)
 
   end
 
+  function attrs:_convert_index_to_lod()
+    --[[
+    Level of details: switch the <index> of each point to the variant of its
+    instance source declared in <instancing.data.lod> depending on the
+    distance between the point and <settings.lod_camera>. The variants are
+    added as new instance sources on <common.sources>.
+
+    Execute after the <self:_validate> method and before the matrix conversion.
+    ! heavy ! Process through all the points.
+    ]]
+
+    if self.settings.lod_camera == "" then
+      return
+    end
+
+    -- table of {source index, variant location, distance, ...}
+    local lod = utils.get_attr_value(
+        self.location,
+        "instancing.data.lod",
+        false
+    )
+    if not lod then
+      logger:warning(
+          "[PointCloudData][_convert_index_to_lod] <instancing.settings.lod_camera> \z
+          is set but <instancing.data.lod> doesn't exist on <", self.location, ">."
+      )
+      return
+    end
+
+    local index = self:get_common_by_name("index")
+    if not index then
+      utils.logerror(
+          "[PointCloudData][_convert_index_to_lod] The $index token is \z
+          required to use level of details on <", self.location, ">."
+      )
+    end
+
+    -- 1. register the variants as new instance sources
+    -- {source index: flat table of {squared distance, variant index, ...}}
+    local sources = self.common.sources
+    local variants = {}
+    local new_index = sources:get_max_index() + 1
+    local source_index
+    local distance
+    local vlist
+
+    for i = 1, #lod, AttrGrp.lod do
+
+      source_index = tonumber(lod[i])
+      distance = tonumber(lod[i + 2])
+      if not source_index or not sources:get_source_at(lod[i]) or not distance then
+        utils.logerror(
+            "[PointCloudData][_convert_index_to_lod] Invalid row <", lod[i],
+            ",", lod[i + 1], ",", lod[i + 2], ">. Index must be a declared \z
+            instance source index and distance a number."
+        )
+      end
+
+      sources:add_source(lod[i + 1], tostring(new_index))
+
+      -- insert sorted by distance
+      vlist = variants[source_index] or {}
+      variants[source_index] = vlist
+      local vi = #vlist + 1
+      while vi > 1 and vlist[vi - 2] > distance * distance do
+        vlist[vi] = vlist[vi - 2]
+        vlist[vi + 1] = vlist[vi - 1]
+        vi = vi - 2
+      end
+      vlist[vi] = distance * distance
+      vlist[vi + 1] = new_index
+
+      new_index = new_index + 1
+
+    end
+
+    -- 2. camera position in world space
+    -- a nil world matrix is also returned for an identity transform
+    if not Interface.GetAttr("", self.settings.lod_camera) then
+      utils.logerror(
+          "[PointCloudData][_convert_index_to_lod] <instancing.settings.lod_camera> \z
+          location <", self.settings.lod_camera, "> doesn't exist."
+      )
+    end
+    local camera = utils.get_world_matrix(self.settings.lod_camera)
+    local camx, camy, camz = 0, 0, 0
+    if camera then
+      camx, camy, camz = camera[13], camera[14], camera[15]
+    end
+
+    -- 3. pick the variant for every point in one pass
+    local positions, stride, offset = self:get_positions()
+    local m = utils.get_world_matrix(self.location)
+    local ivalues = index:get_value_at(nil, 0.0)
+    local out = {}
+    local idx
+    local x, y, z
+    local dx, dy, dz
+    local d2
+    local pi
+
+    -- /!\ perfs
+    for pid = 0, self.points.count - 1 do
+
+      idx = ivalues[pid + 1]
+      vlist = variants[idx]
+
+      if vlist then
+
+        pi = pid * stride + offset
+        x = positions[pi + 1]
+        y = positions[pi + 2]
+        z = positions[pi + 3]
+        if m then
+          x, y, z = x * m[1] + y * m[5] + z * m[9] + m[13],
+          x * m[2] + y * m[6] + z * m[10] + m[14],
+          x * m[3] + y * m[7] + z * m[11] + m[15]
+        end
+        dx = x - camx
+        dy = y - camy
+        dz = z - camz
+        d2 = dx * dx + dy * dy + dz * dz
+
+        -- variants are sorted by ascending distance
+        for vi = 1, #vlist, 2 do
+          if d2 < vlist[vi] then
+            break
+          end
+          idx = vlist[vi + 1]
+        end
+
+      end
+
+      out[pid + 1] = idx
+
+    end
+
+    index:set_values({ [0.0] = out })
+
+    logger:debug(
+        "[PointCloudData][_convert_index_to_lod] Finished with camera <",
+        self.settings.lod_camera, ">."
+    )
+
+  end
+
   function attrs:_convert_trs_to_matrix()
     --[[
     Convert the translation, rotationX/Y/Z, and scale attributes to the matrix
@@ -1153,60 +1860,34 @@ function PointCloudData:new(location)
         samples_list
     )
 
-    local v
     local matrices_smpls = {}
-    local matrices
     local sample
-    local m44
-    local im44d = Imath.M44d
-    local iv3d = Imath.V3d
+    local translation = self:get_common_by_name("translation")
+    local rotationX = self:get_common_by_name("rotationX")
+    local rotationY = self:get_common_by_name("rotationY")
+    local rotationZ = self:get_common_by_name("rotationZ")
+    local scale = self:get_common_by_name("scale")
 
     -- create samples based on the ones found above
     for smplindex = 1, #samples_list do
 
-      -- build a new 4x4 matrix for each point
-      matrices = {}
       sample = samples_list[smplindex]
 
-      for i = 0, self.points.count - 1 do
-
-        -- translation
-        m44 = im44d()
-        v = self:get_common_by_name("translation")
-        if v then
-          v = v:get_value_at(i, sample)
-          m44:translate(iv3d(v))
-        end
-
-        -- rotations
-        v = self:get_common_by_name("rotationX")
-        if v then
-          v = v:get_value_at(i, sample)
-          v = { utils.degree_to_radian(v[1]) }
-          v[2] = utils.degree_to_radian(
-              self:get_common_by_name("rotationY"):get_value_at(i, sample)[1]
-          )
-          v[3] = utils.degree_to_radian(
-              self:get_common_by_name("rotationZ"):get_value_at(i, sample)[1]
-          )
-          m44:rotate(iv3d(v))
-        end
-
-        -- scale
-        v = self:get_common_by_name("scale")
-        if v then
-          v = v:get_value_at(i, sample)
-          m44:scale(iv3d(v))
-        end
-
-        -- combine the created matrix to the matrices table
-        for _, mv in ipairs(m44:toTable()) do
-          matrices[#matrices + 1] = mv
-        end
-
-      end
-
-      matrices_smpls[sample] = matrices
+      -- build a new 4x4 matrix for each point, from the flat table of values
+      -- nearest to the sample, for each attribute.
+      matrices_smpls[sample] = trs_to_matrices(
+          self.points.count,
+          translation and translation:get_value_at(nil, sample),
+          translation and translation.tupleSize,
+          rotationX and rotationX:get_value_at(nil, sample),
+          rotationX and rotationX.tupleSize,
+          rotationX and rotationY:get_value_at(nil, sample),
+          rotationX and rotationY.tupleSize,
+          rotationX and rotationZ:get_value_at(nil, sample),
+          rotationX and rotationZ.tupleSize,
+          scale and scale:get_value_at(nil, sample),
+          scale and scale.tupleSize
+      )
 
     end
 
@@ -1355,6 +2036,24 @@ function PointCloudData:new(location)
       )
     end
 
+    -- every per-point attribute must have a value for each point, checked
+    -- on the length so nothing is decoded.
+    local count
+    for _, group in ipairs({ self.common, self.arbitrary }) do
+      for _, attr in pairs(group) do
+        if attr and attr.perPoint and attr.length then
+          count = attr.length / attr.tupleSize
+          if count < self.points.count then
+            utils.logerror(
+                "[PointCloudData][_validate] Source <", self.location,
+                "> attribute <", attr.path, "> only has ", count,
+                " points while ", self.points.count, " are expected."
+            )
+          end
+        end
+      end
+    end
+
     -- verify grouping values
     if self.common.rotation then
       if self.common.rotation.tupleSize ~= 3 then
@@ -1389,23 +2088,134 @@ function PointCloudData:new(location)
     -- end for _validate()
   end
 
-  function attrs:build()
+  function attrs:set_stats(stats)
+    --[[
+    Args:
+      stats(Stats or false): kui.stats.Stats instance to record the build
+        stages in, false to disable.
+    ]]
+    self.stats = stats
+  end
+
+  function attrs:_run(name)
+    --[[
+    Execute the given build method, measured if <stats> is set.
+
+    Args:
+      name(str): name of the method on self.
+    ]]
+    if not self.stats then
+      return self[name](self)
+    end
+
+    -- step names without the leading underscore
+    local step = name:sub(2)
+    self.stats:measure(step, self[name], self)
+
+    -- number of values decoded and stored after the stage
+    local count = 0
+    for _, group in ipairs({ self.common, self.arbitrary }) do
+      for _, attr in pairs(group) do
+        if attr and attr.values then
+          for _, values in pairs(attr.values) do
+            count = count + #values
+          end
+        end
+      end
+    end
+    self.stats:set(step, "values", IntAttribute(count))
+
+  end
+
+  function attrs:_get_stage_signature(stage)
+    --[[
+    Args:
+      stage(table): one of the <Stages>
+    Returns:
+      str: different as soon as the result of the stage can be.
+    ]]
+    local parts = { self.points.count }
+    for _, tokens in ipairs({ stage.reads, stage.writes }) do
+      for _, token in ipairs(tokens) do
+        parts[#parts + 1] = self.common[token] and self.__signatures[token] or "-"
+      end
+    end
+    for _, key in ipairs(stage.settings) do
+      parts[#parts + 1] = tostring(self.settings[key])
+    end
+    return table.concat(parts, "|")
+  end
+
+  function attrs:_run_stage(stage, previous)
+    --[[
+    Execute the given stage, or take its result from <previous> if its inputs
+    didn't change.
+
+    Args:
+      stage(table): one of the <Stages>
+      previous(PointCloudData or nil): previous build of the same location
+    ]]
+
+    local signature = self:_get_stage_signature(stage)
+    local done = previous and previous.__stages[stage.name]
+    local attr
+
+    if done and done.signature == signature then
+
+      for _, token in ipairs(stage.writes) do
+        attr = done.outputs[token]
+        if attr then
+          attr.parent = self
+          self.common[token] = attr
+        elseif self.common[token] then
+          self.common[token] = false
+        end
+      end
+      logger:debug(
+          "[PointCloudData][_run_stage] Reused <", stage.name, "> from the \z
+          previous build."
+      )
+      if self.stats then
+        self.stats:set(stage.name:sub(2), "reused", IntAttribute(1))
+      end
+
+    else
+      self:_run(stage.name)
+    end
+
+    done = { ["signature"] = signature, ["outputs"] = {} }
+    for _, token in ipairs(stage.writes) do
+      done.outputs[token] = self.common[token] or false
+      self.__signatures[token] = utils.conkat(stage.name, "(", signature, ")")
+    end
+    self.__stages[stage.name] = done
+
+  end
+
+  function attrs:build(previous)
+    --[[
+    Args:
+      previous(PointCloudData or nil):
+        a previous build of the same location. The derived stages (see
+        <Stages>) whose inputs didn't change are not computed again but taken
+        from it. <previous> must not be used anymore after.
+    ]]
 
     -- query data on source to build self
-    self:_build_settings()
-    self:_build_points()
+    self:_run("_build_settings")
+    self:_run("_build_points")
 
-    self:_build_common()
-    self:_build_arbitrary()
+    self:_run("_build_common")
+    self:_run("_build_arbitrary")
 
     -- check that the data queried above is valid
-    self:_validate()
+    self:_run("_validate")
 
     -- order matters
-    self:_convert_rotation_to_axis()
-    self:_convert_skip_n_hide()
-    self:_convert_degree_radian()
-    self:_convert_trs_to_matrix()
+    self:_run("_convert_index_to_lod")
+    for _, stage in ipairs(Stages) do
+      self:_run_stage(stage, previous)
+    end
 
   end
 
@@ -1437,6 +2247,59 @@ function PointCloudData:new(location)
 
   end
 
+  function attrs:get_visible_points()
+    --[[
+    /!\ perfs
+
+    Returns:
+      table or nil:
+        ascending list of the index of the points not hidden (see <hide>
+        token), starting at 0. nil if no point is hidden.
+    ]]
+    local hide = self:get_common_by_name("hide")
+    if not hide then
+      return nil
+    end
+    hide = hide:get_value_at(nil, 0.0)  -- table of 0|1
+
+    local out = {}
+    for pid = 0, self.points.count - 1 do
+      if hide[pid + 1] ~= 1 then
+        out[#out + 1] = pid
+      end
+    end
+
+    if #out == self.points.count then
+      return nil
+    end
+    return out
+
+  end
+
+  function attrs:get_positions()
+    --[[
+    Returns:
+      table, number, number:
+        flat table of values at time 0.0 (in the point-cloud local space),
+        number of values per point, offset of the translation in the values
+        of a point.
+    ]]
+    local attr = self:get_common_by_name("translation")
+    if attr then
+      return attr:get_value_at(nil, 0.0), attr.tupleSize, 0
+    end
+
+    attr = self:get_common_by_name("matrix")
+    if attr then
+      return attr:get_value_at(nil, 0.0), attr.tupleSize, 12
+    end
+
+    utils.logerror(
+        "[PointCloudData][get_positions] No $translation or $matrix token \z
+        declared on <", self.location, ">."
+    )
+  end
+
   function attrs:get_common_by_name(name)
     --[[
     Returns:
@@ -1445,6 +2308,30 @@ function PointCloudData:new(location)
     return self.common[name]
   end
 
+  function attrs:get_attributes()
+    --[[
+    Returns:
+      table of BaseAttribute:
+        all the attributes kept by this instance, including the results of
+        the derived stages kept for a later incremental build.
+    ]]
+    local out = {}
+    local seen = {}
+    local groups = { self.common, self.arbitrary }
+    for _, done in pairs(self.__stages) do
+      groups[#groups + 1] = done.outputs
+    end
+    for _, group in ipairs(groups) do
+      for _, attr in pairs(group) do
+        if attr and not seen[attr] then
+          seen[attr] = true
+          out[#out + 1] = attr
+        end
+      end
+    end
+    return out
+  end
+
   function attrs:get_commons()
     return self.common
   end
@@ -1,5 +1,5 @@
 --[[
-version=9
+version=13
 
 [LICENSE]
 
@@ -20,7 +20,8 @@ limitations under the License.
 ]]
 local _M_ = {}
 local logging = require("lllogger")
-local PointCloudData = require("kui.PointCloudData")
+local cache = require("kui.cache")
+local Stats = require("kui.stats").Stats
 local utils = require("kui.utils")
 
 local logger = logging.getLogger(...)
@@ -32,17 +33,19 @@ local logger = logging.getLogger(...)
 -- // Used by InstancingArray
 -- key is the token to query and value is the target attribute path
 -- if the token doesnt have any value on point_data it will not be added.
+-- <transform> tokens are written as FloatAttribute with the single_precision
+-- setting.
 -- ! order is important !
 local token_target = {
   { ["token"] = "sources", ["target"] = "geometry.instanceSource" },
   { ["token"] = "index", ["target"] = "geometry.instanceIndex" },
   { ["token"] = "skip", ["target"] = "geometry.instanceSkipIndex" },
-  { ["token"] = "matrix", ["target"] = "geometry.instanceMatrix" },
-  { ["token"] = "translation", ["target"] = "geometry.instanceTranslate" },
-  { ["token"] = "rotationZ", ["target"] = "geometry.instanceRotateZ" },
-  { ["token"] = "rotationY", ["target"] = "geometry.instanceRotateY" },
-  { ["token"] = "rotationX", ["target"] = "geometry.instanceRotateX" },
-  { ["token"] = "scale", ["target"] = "geometry.instanceScale" },
+  { ["token"] = "matrix", ["target"] = "geometry.instanceMatrix", ["transform"] = true },
+  { ["token"] = "translation", ["target"] = "geometry.instanceTranslate", ["transform"] = true },
+  { ["token"] = "rotationZ", ["target"] = "geometry.instanceRotateZ", ["transform"] = true },
+  { ["token"] = "rotationY", ["target"] = "geometry.instanceRotateY", ["transform"] = true },
+  { ["token"] = "rotationX", ["target"] = "geometry.instanceRotateX", ["transform"] = true },
+  { ["token"] = "scale", ["target"] = "geometry.instanceScale", ["transform"] = true },
 }
 
 local InstancingArray = {}
@@ -56,11 +59,15 @@ function InstancingArray:new(point_data)
 
   Attributes:
     pdata(PointCloudData): PointCloudData instance
+    stats(Stats or false): to record the precision report in.
+    compact(bool): true to only write the points that are not hidden.
 
   ]]
 
   local attrs = {
     pdata = point_data,
+    stats = false,
+    compact = false,
   }
 
   function attrs:add(target, value)
@@ -77,20 +84,109 @@ function InstancingArray:new(point_data)
 
   end
 
+  function attrs:set_stats(stats)
+    --[[
+    Args:
+      stats(Stats or false):
+    ]]
+    self.stats = stats
+  end
+
+  function attrs:set_compact(compact)
+    --[[
+    Args:
+      compact(bool):
+        true to remove the hidden points from all the per-point attributes
+        instead of listing them in <geometry.instanceSkipIndex>.
+    ]]
+    self.compact = compact
+  end
+
+  function attrs:get_data(attr, visible, data_class)
+    --[[
+    Args:
+      attr(BaseAttribute):
+      visible(table or nil): points to keep, see <PointCloudData:get_visible_points()>
+      data_class(DataAttribute table or nil):
+    Returns:
+      DataAttribute or nil:
+    ]]
+    if visible then
+      return attr:get_data_for(visible, data_class)
+    end
+    return attr:get_data_at(nil, nil, data_class)
+  end
+
+  function attrs:report_precision(token, attr)
+    --[[
+    Log the biggest error made by writing the attribute in single precision.
+
+    Args:
+      token(str): common token name of <attr>
+      attr(BaseAttribute):
+    ]]
+    local error_max = utils.get_float32_error(attr:get_value_at())
+    logger:info(
+        "[InstancingArray][report_precision] <", token, "> single precision \z
+        max error = ", error_max
+    )
+    if self.stats then
+      self.stats:set("precision", token, DoubleAttribute(error_max))
+    end
+  end
+
   function attrs:build()
     --[[
     Build the array instance from PointCloudData
+
+    Attributes that were not modified by PointCloudData are given back by
+    <get_data_at()> as the original Katana attribute, so they are never
+    converted to Lua tables.
+
+    With <compact>, the per-point attributes only contain the points not
+    hidden and no skip attribute is written.
     ]]
     local buf
+    local data_class
+
+    local visible
+    if self.compact then
+      visible = self.pdata:get_visible_points()
+      logger:debug(
+          "[InstancingArray][build] Compacted to ",
+          visible and #visible or self.pdata.points.count, " points."
+      )
+      if self.stats then
+        self.stats:set(
+            "instancing",
+            "points",
+            IntAttribute(visible and #visible or self.pdata.points.count)
+        )
+      end
+    end
+
+    local settings = self.pdata.settings
+    local transform_class
+    if settings.single_precision == 1 then
+      transform_class = FloatAttribute
+    end
 
     -- 1. PROCESS COMMON & SOURCES ATTRIBUTES
     for _, tt in ipairs(token_target) do
       buf = self.pdata:get_common_by_name(tt["token"])
+      -- compacted points are all visible
+      if buf and visible and tt["token"] == "skip" then
+        buf = nil
+      end
       if buf then
+        data_class = tt["transform"] and transform_class or nil
         self:add(
             tt["target"],
-            buf:get_data_at()
+            self:get_data(buf, visible, data_class)
         )
+        if data_class and settings.precision_report == 1 then
+          self:report_precision(tt["token"], buf)
+        end
       end
     end
 
@@ -116,7 +212,7 @@ function InstancingArray:new(point_data)
         end
       end
       -- 2. Add the arbitrary attribute value
-      self:add(target, attr:get_data_at())
+      self:add(target, self:get_data(attr, visible))
     end
 
     self:add("type", StringAttribute("instance array"))
@@ -140,12 +236,34 @@ function _M_.run()
   local time = Interface.GetCurrentTime() -- int
 
   local u_pointcloud_sg = utils.get_user_attr("pointcloud_sg", error)[1]
+  local u_cache_size = utils.get_user_attr("cache_size", { 512 })[1]
+  local u_stats = utils.get_user_attr("stats", { 0 })[1]
+  local u_compact = utils.get_user_attr("compact", { 0 })[1]
 
   -- process the source pointcloud
   logger:info("[run] Started processing source <", u_pointcloud_sg, ">.")
+  local stats = false
+  if u_stats ~= 0 then
+    stats = Stats:new()
+  end
   local pointdata
-  pointdata = PointCloudData:new(u_pointcloud_sg, time)
-  pointdata:build()
+  if stats then
+    pointdata = stats:measure(
+        "pointcloud",
+        cache.get_point_data,
+        u_pointcloud_sg,
+        u_cache_size,
+        stats
+    )
+    stats:set("pointcloud", "points", IntAttribute(pointdata.points.count))
+  else
+    pointdata = cache.get_point_data(u_pointcloud_sg, u_cache_size)
+  end
+  local cstats = cache.get_stats()
+  logger:info(
+      "[run] Cache: ", cstats.hits, " hits, ", cstats.misses, " misses, ",
+      cstats.entries, " entries for ", cstats.size / 1048576, "MB."
+  )
   logger:info("[run] Finished processing source <", u_pointcloud_sg, ">.",
       pointdata.points.count, " points found.")
 
@@ -153,9 +271,19 @@ function _M_.run()
   -- start instancing
   local instance
   instance = InstancingArray:new(pointdata)
-  instance:build()
+  instance:set_stats(stats)
+  instance:set_compact(u_compact ~= 0)
+  if stats then
+    stats:measure("instancing", instance.build, instance)
+  else
+    instance:build()
+  end
 
   stime = os.clock() - stime
+  if stats then
+    stats:set("total", "time", DoubleAttribute(stime))
+    stats:write()
+  end
   logger:info(
       "[run] Finished in ", stime, "s for pointcloud <", u_pointcloud_sg, ">."
   )
@@ -1,5 +1,5 @@
 --[[
-version=0.0.2
+version=0.1.1
 
 [LICENSE]
 
@@ -18,95 +18,299 @@ See the License for the specific language governing permissions and
 limitations under the License.
 
 ]]
-
+local _M_ = {}
 local logging = require("lllogger")
 local PointCloudData = require("kui.PointCloudData")
+local culling = require("kui.culling")
 local utils = require("kui.utils")
 
 local logger = logging.getLogger(...)
 
+-- we make some global functions local as this will improve performances in
+-- heavy loops.
+local mathfloor = math.floor
+local mathceil = math.ceil
+local mathmax = math.max
+local mathmin = math.min
+
+-- maximum number of cells of the grid on each axis
+local GRID_MAX_RESOLUTION = 64
+
 
 --[[ __________________________________________________________________________
   API
 ]]
 
 
-local function is_point_in_boundingbox(bounding_box, point)
-  --
-  --
-  -- Parameters:
-  --  bounding_box:  DoubleAttribute({{xMin, xMax}, {yMin, yMax}, {zMin, zMax}})
-  --  point: a 3d point stored in a table. with {x,y,z}
-  --
-  -- Returns:
-  --  bool: true if inside the bounding box else false
-  local bb = bounding_box:getNearestSample(Interface.GetCurrentTime())
+local CullingGrid = {}
+function CullingGrid:new(bounds)
+  --[[
+  Uniform grid over a list of axis-aligned bounding boxes so a point is only
+  tested against the boxes overlapping its cell.
+
+  A point is considered inside a box if it is strictly inside it (a point on
+  the box faces is outside).
+
+  Args:
+    bounds(table):
+      flat table of bounding boxes with 6 values per box like
+      {xMin, xMax, yMin, yMax, zMin, zMax, ...}
+
+  Attributes:
+    bounds(table): flat table of bounding boxes
+    min(table): {x, y, z} minimum corner of all the boxes
+    max(table): {x, y, z} maximum corner of all the boxes
+    resolution(table): {x, y, z} number of cells on each axis
+    cell_size(table): {x, y, z} size of a cell on each axis
+    cells(table):
+      {cell index: {box index, ...}}, only for cells with at least one box.
+      box index is the index of the xMin value in <bounds>.
+  ]]
+
+  local attrs = {
+    ["bounds"] = bounds,
+    ["min"] = false,
+    ["max"] = false,
+    ["resolution"] = false,
+    ["cell_size"] = false,
+    ["cells"] = {}
+  }
+
+  function attrs:build()
+    --[[
+    Build the grid cells from <bounds>.
+    ]]
+
+    local bounds = self.bounds
+    local bmin = { math.huge, math.huge, math.huge }
+    local bmax = { -math.huge, -math.huge, -math.huge }
+    local valid = {}
+
+    for bi = 1, #bounds, 6 do
+      -- an empty bound (min>max) can't contain any point
+      if bounds[bi] <= bounds[bi + 1] and
+          bounds[bi + 2] <= bounds[bi + 3] and
+          bounds[bi + 4] <= bounds[bi + 5] then
+        valid[#valid + 1] = bi
+        for axis = 1, 3 do
+          bmin[axis] = mathmin(bmin[axis], bounds[bi + axis * 2 - 2])
+          bmax[axis] = mathmax(bmax[axis], bounds[bi + axis * 2 - 1])
+        end
+      end
+    end
+
+    self.cells = {}
+    if #valid == 0 then
+      return
+    end
+
+    -- aim for a few boxes per cell
+    local resolution = mathmin(
+        GRID_MAX_RESOLUTION,
+        mathmax(1, mathceil((#valid) ^ (1 / 3) * 2))
+    )
+    local res = {}
+    local cell_size = {}
+    for axis = 1, 3 do
+      if bmax[axis] > bmin[axis] then
+        res[axis] = resolution
+        cell_size[axis] = (bmax[axis] - bmin[axis]) / resolution
+      else
+        res[axis] = 1
+        cell_size[axis] = 1
+      end
+    end
+
+    self.min = bmin
+    self.max = bmax
+    self.resolution = res
+    self.cell_size = cell_size
+
+    local cells = self.cells
+    local cmin = {}
+    local cmax = {}
+    local ci
+    local cell
+
+    for _, bi in ipairs(valid) do
+
+      for axis = 1, 3 do
+        cmin[axis] = self:_get_cell_coordinate(axis, bounds[bi + axis * 2 - 2])
+        cmax[axis] = self:_get_cell_coordinate(axis, bounds[bi + axis * 2 - 1])
+      end
 
-  -- X values
-  if not (point[1] > bb[1]) or not (point[1] < bb[2]) then
-    return false
+      for z = cmin[3], cmax[3] do
+        for y = cmin[2], cmax[2] do
+          for x = cmin[1], cmax[1] do
+            ci = x + (y + z * res[2]) * res[1]
+            cell = cells[ci]
+            if not cell then
+              cell = {}
+              cells[ci] = cell
+            end
+            cell[#cell + 1] = bi
+          end
+        end
+      end
 
-    -- Y values
-  elseif not (point[2] > bb[3]) or not (point[2] < bb[4]) then
-    return false
+    end
 
-    -- Z values
-  elseif not (point[3] > bb[5]) or not (point[3] < bb[6]) then
-    return false
+    logger:debug(
+        "[CullingGrid][build] Finished with", #valid, "boxes and resolution",
+        res
+    )
 
   end
 
-  return true
+  function attrs:_get_cell_coordinate(axis, value)
+    --[[
+    Args:
+      axis(number): 1=x, 2=y, 3=z
+      value(number): position on the axis, must be inside <min>/<max>
+    Returns:
+      number: cell coordinate on the axis, starting at 0
+    ]]
+    local c = mathfloor((value - self.min[axis]) / self.cell_size[axis])
+    if c >= self.resolution[axis] then
+      c = self.resolution[axis] - 1
+    end
+    return c
+  end
+
+  function attrs:get_culled_points(positions, stride, offset, count)
+    --[[
+    Test all the points against the boxes in one pass over the positions.
+
+    /!\ perfs
+
+    Args:
+      positions(table): flat table of values with the point positions
+      stride(number): number of values per point in <positions>
+        (3 for a translation, 16 for a matrix)
+      offset(number): offset of the x value in a point's values
+        (0 for a translation, 12 for a matrix)
+      count(number): number of points to test
+    Returns:
+      table: ascending list of the points index inside a box, starting at 0.
+    ]]
+
+    local out = {}
+    local cells = self.cells
+    if not self.min then
+      return out
+    end
+
+    local bounds = self.bounds
+    local minx, miny, minz = self.min[1], self.min[2], self.min[3]
+    local maxx, maxy, maxz = self.max[1], self.max[2], self.max[3]
+    local csx, csy, csz = self.cell_size[1], self.cell_size[2], self.cell_size[3]
+    local resx, resy, resz = self.resolution[1], self.resolution[2], self.resolution[3]
+
+    local x, y, z
+    local cx, cy, cz
+    local cell
+    local bi
+    local i
+
+    for pid = 0, count - 1 do
+
+      i = pid * stride + offset
+      x = positions[i + 1]
+      y = positions[i + 2]
+      z = positions[i + 3]
+
+      -- quick rejection of everything outside all the boxes
+      if x > minx and x < maxx and y > miny and y < maxy and z > minz and z < maxz then
+
+        cx = mathfloor((x - minx) / csx)
+        if cx >= resx then cx = resx - 1 end
+        cy = mathfloor((y - miny) / csy)
+        if cy >= resy then cy = resy - 1 end
+        cz = mathfloor((z - minz) / csz)
+        if cz >= resz then cz = resz - 1 end
+
+        cell = cells[cx + (cy + cz * resy) * resx]
+        if cell then
+          for ci = 1, #cell do
+            bi = cell[ci]
+            if x > bounds[bi] and x < bounds[bi + 1] and
+                y > bounds[bi + 2] and y < bounds[bi + 3] and
+                z > bounds[bi + 4] and z < bounds[bi + 5] then
+              out[#out + 1] = pid
+              break
+            end
+          end
+        end
+
+      end
+
+    end
+
+    return out
+
+  end
+
+  return attrs
 
 end
 
 local function locations_to_bounds(meshs_locations)
   --[[
-  Iterate through all the meshs_locations to return their bounding boxes
+  Iterate through all the meshs_locations to return their world-space
+  bounding boxes. The bounds are queried once at the time sample 0.
 
-  Parameters:
+  Args:
     meshs_locations(table): {"CEL","CEL",...}
 
   Returns:
     table:
-      {{mesh bb},...}
+      flat table of bounding boxes {xMin, xMax, yMin, yMax, zMin, zMax, ...}
   ]]
 
-  local cullingMeshsBounds = {}
+  local bounds = {}
   --  Loop variables
-  local cullingMeshXformAttr
-  local cullingMeshBound
-  local cullingMesh_transformedBounds
-
-  for i = 0, #meshs_locations - 1 do
-    -- Get the bounding_box of the culling mesh.
-    --    cullingMeshXform: GroupAttribute
-    cullingMeshXformAttr = Interface.GetGlobalXFormGroup(meshs_locations[i + 1])
-    cullingMeshBound = Interface.GetBoundAttr(meshs_locations[i + 1], 0)
-    cullingMesh_transformedBounds = XFormUtils.CalcTransformedBoundsAtExistingTimes(
-        cullingMeshXformAttr, cullingMeshBound)
-    -- add the bb to the table
-    cullingMeshsBounds[i + 1] = cullingMesh_transformedBounds
-  end
+  local xform
+  local bound
+  local values
+
+  for i = 1, #meshs_locations do
+
+    xform = Interface.GetGlobalXFormGroup(meshs_locations[i])
+    bound = Interface.GetBoundAttr(meshs_locations[i], 0)
+
+    if not bound then
+      logger:warning(
+          "[locations_to_bounds] Location <", meshs_locations[i],
+          "> doesn't have a bound attribute, skipped."
+      )
+    else
+      bound = XFormUtils.CalcTransformedBoundsAtExistingTimes(xform, bound)
+      values = bound:getNearestSample(0.0)
+      for vi = 1, 6 do
+        bounds[#bounds + 1] = values[vi]
+      end
+    end
 
-  return cullingMeshsBounds
-end
+  end
 
+  return bounds
 
+end
 
--- Script ---------------------------------------------------------------------
+-- processes ------------------------------------------------------------------
 
 
-local function run()
+function _M_.run()
   --[[
-  First function executed
+  Cull the points of the current point-cloud location that are inside the
+  bounding boxes of the <user.culling_locations>.
   ]]
 
-  local time = Interface.GetCurrentTime()
+  local stime = os.clock()
 
   local u_pointcloud_sg = utils.get_user_attr(
       "pointcloud_sg",
-      error
+      { Interface.GetInputLocationPath() }
   )[1]  -- type: str
   -- culling_locations(table): {"CEL","CEL",...}
   local culling_locations = utils.get_user_attr(
@@ -115,58 +319,52 @@ local function run()
   )
 
   -- process the source pointcloud
-  logger:info("Started processing source <", u_pointcloud_sg, ">.")
+  logger:info("[run] Started processing source <", u_pointcloud_sg, ">.")
   local pointdata
-  pointdata = PointCloudData:new(u_pointcloud_sg, time)
+  pointdata = PointCloudData:new(u_pointcloud_sg)
   pointdata:build()
   logger:info(
-      "Finished processing source <", u_pointcloud_sg, ">.",
+      "[run] Finished processing source <", u_pointcloud_sg, ">.",
       pointdata.points.count, " points found."
   )
-  logger:debug("pointdata = \n", pointdata, "\n")
-
-  -- Iterate through all the culling mesh locations to get their bounding boxes
-  -- cullingMeshsBounds(table): {{mesh bb},...}
-  local cullingMeshsBounds = locations_to_bounds(culling_locations)
-
-
-  -- Loop trough all the points of the pointcloud
-  --  loop variables:
-  local current_point = {}
-  local point_visibility
-
-  for i = 0, pointdata.points.count - 1 do
 
-    point_visibility = 1  -- the point is visible by default
-
-    current_point[1] = points[i * 3 + 1]
-    current_point[2] = points[i * 3 + 2]
-    current_point[3] = points[i * 3 + 3]
-
-    -- If the point is in one of the culling mesh set its visibility to 0
-    for cmi = 0, #cullingMeshsBounds - 1 do
-      if is_point_in_boundingbox(cullingMeshsBounds[cmi + 1], current_point) then
-        point_visibility = 0
-      end
-    end
+  -- query the bounds only once and build the grid over them
+  local grid = CullingGrid:new(locations_to_bounds(culling_locations))
+  grid:build()
+
+  -- the bounds are in world space so the points also need to be
+  local positions, stride, offset = pointdata:get_positions()
+  local matrix = utils.get_world_matrix(u_pointcloud_sg)
+  if matrix then
+    positions = culling.transform_positions(
+        positions,
+        stride,
+        offset,
+        pointdata.points.count,
+        matrix
+    )
+    stride = 3
+    offset = 0
+  end
 
-    -- Iterate trough each pointcloud attribute to only copy the current value
-    -- if the point is visible.
-    for attr_name, attrClass in pairs(pointcloud_attributes) do
-      if point_visibility == 1 then
-        attrClass:setValue_toCopy(i)
-      else
-        --
-      end
-    end
+  local culled = grid:get_culled_points(
+      positions,
+      stride,
+      offset,
+      pointdata.points.count
+  )
 
-  end
+  culling.set_culled_points(pointdata, culled)
 
-  -- set all the pointcloud attributes to their new value with removed indexes
-  for attr_name, attrClass in pairs(pointcloud_attributes) do
-    Interface.SetAttr(attrClass.path, attrClass:getCopyAttr())
-  end
+  stime = os.clock() - stime
+  logger:info(
+      "[run] Finished in ", stime, "s. Culled ", #culled, " points on ",
+      pointdata.points.count, "."
+  )
 
 end
 
-error("Module boxCulling not implemented yet")
\ No newline at end of file
+_M_.CullingGrid = CullingGrid
+_M_.locations_to_bounds = locations_to_bounds
+
+return _M_
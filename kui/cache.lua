@@ -0,0 +1,285 @@
+--[[
+version=0.4.0
+
+[LICENSE]
+
+Copyright 2022 Liam Collod
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+   http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Keep the built PointCloudData between cooks so an unchanged point-cloud is
+not processed again. The cache lives as long as the Lua state that required
+this module.
+]]
+local _M_ = {}
+local logging = require("lllogger")
+local PointCloudData = require("kui.PointCloudData")
+local utils = require("kui.utils")
+
+local logger = logging.getLogger(...)
+
+-- estimated size of a value stored in a Lua table
+local VALUE_SIZE = 8
+local MEGABYTE = 1024 * 1024
+
+-- {key: {["pointdata"]=PointCloudData, ["size"]=number, ["used"]=number,
+--  ["pinned"]=bool}}
+local entries = {}
+local counters = {
+  ["hits"] = 0,
+  ["misses"] = 0,
+  ["evictions"] = 0,
+  ["size"] = 0,  -- estimated bytes of all the entries
+  ["entries"] = 0
+}
+-- incremented on every access, used to find the least recently used entry
+local clock = 0
+
+
+--[[ __________________________________________________________________________
+  API
+]]
+
+
+local function get_attr_hash(location)
+  --[[
+  Args:
+    location(str): scene graph location
+  Returns:
+    str: hash of all the attributes of the location, "" if it doesn't exist.
+  ]]
+  local attr = Interface.GetAttr("", location)
+  if not attr then
+    return ""
+  end
+  return attr:getHash()
+end
+
+local function get_key(location)
+  --[[
+  Build a key that change as soon as anything PointCloudData reads changes.
+
+  The hash of the whole location covers the source attributes and the
+  instancing.* config. Katana keep the hash on the attribute, so it is only
+  computed again when the attributes are modified upstream.
+
+  Args:
+    location(str): point-cloud scene graph location
+  Returns:
+    str:
+  ]]
+
+  local parts = { location, get_attr_hash(location) }
+
+  -- the source attributes of the instance sources are also stored
+  local sources = utils.get_attr_value(location, "instancing.data.sources", {})
+  for i = 1, #sources, 2 do
+    parts[#parts + 1] = get_attr_hash(sources[i])
+  end
+  local lod = utils.get_attr_value(location, "instancing.data.lod", {})
+  for i = 2, #lod, 3 do
+    parts[#parts + 1] = get_attr_hash(lod[i])
+  end
+
+  -- level of details depends on where the point-cloud and camera are
+  local camera = utils.get_attr_value(
+      location,
+      "instancing.settings.lod_camera",
+      { "" }
+  )[1]
+  if camera ~= "" then
+    parts[#parts + 1] = Interface.GetGlobalXFormGroup(location):getHash()
+    parts[#parts + 1] = Interface.GetGlobalXFormGroup(camera):getHash()
+  end
+
+  return table.concat(parts, "|")
+
+end
+
+local function get_size(point_data)
+  --[[
+  Args:
+    point_data(PointCloudData): built instance
+  Returns:
+    number: estimated memory used by the attributes values in bytes.
+  ]]
+  local count = 0
+  for _, attr in ipairs(point_data:get_attributes()) do
+    -- values are false if not decoded yet (still using the source attribute)
+    if attr.values then
+      for _, values in pairs(attr.values) do
+        count = count + #values
+      end
+    end
+  end
+  return count * VALUE_SIZE
+end
+
+local function evict(budget)
+  --[[
+  Remove the least recently used entries until the cache fit in <budget>.
+  Pinned entries are never removed.
+
+  Args:
+    budget(number): maximum size in bytes
+  ]]
+  local oldest_key
+  local oldest_used
+
+  while counters.size > budget do
+
+    oldest_key = nil
+    oldest_used = math.huge
+    for key, entry in pairs(entries) do
+      if not entry.pinned and entry.used < oldest_used then
+        oldest_key = key
+        oldest_used = entry.used
+      end
+    end
+
+    if not oldest_key then
+      return
+    end
+
+    logger:debug(
+        "[evict] Removed <", entries[oldest_key].pointdata.location, "> (",
+        entries[oldest_key].size / MEGABYTE, "MB)."
+    )
+    counters.size = counters.size - entries[oldest_key].size
+    counters.entries = counters.entries - 1
+    counters.evictions = counters.evictions + 1
+    entries[oldest_key] = nil
+
+  end
+end
+
+function _M_.get_point_data(location, budget, stats, pin)
+  --[[
+  Return the built PointCloudData for the given location, reusing the one
+  from a previous cook if the location didn't change.
+
+  The returned instance is shared between cooks and must not be modified.
+
+  Args:
+    location(str): point-cloud scene graph location
+    budget(number):
+      maximum memory used by the cache in megabytes. 0 disable the cache
+      (and empty it).
+    stats(Stats or nil): to record the build stages and cache result in.
+    pin(bool or nil):
+      true to keep the entry even if bigger than <budget> and never evict it,
+      for locations whose children cook the same point-cloud again
+      (partitions, buckets). It is only removed once the location changes
+      or the cache is disabled. Ignored if <budget> is 0.
+  Returns:
+    PointCloudData: built instance
+    bool: true if it was taken from the cache
+  ]]
+
+  clock = clock + 1
+  budget = budget * MEGABYTE
+
+  if budget <= 0 then
+    _M_.clear()
+    local point_data = PointCloudData:new(location)
+    point_data:set_stats(stats or false)
+    point_data:build()
+    point_data:set_stats(false)
+    return point_data, false
+  end
+
+  local key = get_key(location)
+  local entry = entries[key]
+
+  if entry then
+    counters.hits = counters.hits + 1
+    entry.used = clock
+    entry.pinned = entry.pinned or pin or false
+    -- attributes are decoded lazily so the entry can have grown
+    local size = get_size(entry.pointdata)
+    counters.size = counters.size + size - entry.size
+    entry.size = size
+    logger:debug("[get_point_data] Hit for <", location, ">.")
+    if stats then
+      stats:set("cache", "hit", IntAttribute(1))
+    end
+    return entry.pointdata, true
+  end
+
+  counters.misses = counters.misses + 1
+  logger:debug("[get_point_data] Miss for <", location, ">.")
+
+  -- a previous version of this location will never be hit again but the
+  -- stages whose inputs didn't change can be reused from it.
+  local previous
+  for k, e in pairs(entries) do
+    if e.pointdata.location == location then
+      previous = e.pointdata
+      counters.size = counters.size - e.size
+      counters.entries = counters.entries - 1
+      entries[k] = nil
+    end
+  end
+
+  if stats then
+    stats:set("cache", "hit", IntAttribute(0))
+  end
+
+  local point_data = PointCloudData:new(location)
+  -- the stats are only kept for this build, not in the cache
+  point_data:set_stats(stats or false)
+  point_data:build(previous)
+  point_data:set_stats(false)
+
+  entry = {
+    ["pointdata"] = point_data,
+    ["size"] = get_size(point_data),
+    ["used"] = clock,
+    ["pinned"] = pin or false
+  }
+  if entry.size > budget and not pin then
+    logger:debug(
+        "[get_point_data] <", location, "> is bigger than the budget, not cached."
+    )
+    return point_data, false
+  end
+
+  entries[key] = entry
+  counters.size = counters.size + entry.size
+  counters.entries = counters.entries + 1
+  evict(budget)
+
+  return point_data, false
+
+end
+
+function _M_.get_stats()
+  --[[
+  Returns:
+    table:
+      {["hits"]=number, ["misses"]=number, ["evictions"]=number,
+       ["size"]=number (estimated bytes), ["entries"]=number}
+  ]]
+  return counters
+end
+
+function _M_.clear()
+  --[[
+  Remove all the entries. Counters are kept.
+  ]]
+  entries = {}
+  counters.size = 0
+  counters.entries = 0
+end
+
+return _M_
@@ -0,0 +1,225 @@
+--[[
+version=0.1.1
+
+[LICENSE]
+
+Copyright 2022 Liam Collod
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+   http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Functions shared by the culling modules (boxCulling, frustumCulling).
+]]
+local _M_ = {}
+local logging = require("lllogger")
+local utils = require("kui.utils")
+
+local logger = logging.getLogger(...)
+
+local tablesort = table.sort
+
+-- attribute paths created on the point-cloud location
+local CULLING_SKIP_ATTR = "instancing.culling.skip"
+local CULLING_HIDE_ATTR = "instancing.culling.hide"
+
+
+--[[ __________________________________________________________________________
+  API
+]]
+
+
+function _M_.multiply_matrix(ma, mb)
+  --[[
+  Args:
+    ma(table): 4x4 matrix as flat table of 16 values
+    mb(table): 4x4 matrix as flat table of 16 values
+  Returns:
+    table: ma * mb. (transform by <ma> then by <mb>, row-vector convention)
+  ]]
+  local out = {}
+  for row = 0, 3 do
+    for col = 1, 4 do
+      out[row * 4 + col] = ma[row * 4 + 1] * mb[col] +
+          ma[row * 4 + 2] * mb[4 + col] +
+          ma[row * 4 + 3] * mb[8 + col] +
+          ma[row * 4 + 4] * mb[12 + col]
+    end
+  end
+  return out
+end
+
+function _M_.invert_matrix(m)
+  --[[
+  Invert an affine transform matrix (last column is 0,0,0,1).
+
+  Args:
+    m(table): 4x4 matrix as flat table of 16 values
+  Returns:
+    table: inverse 4x4 matrix as flat table of 16 values
+  ]]
+  local a, b, c = m[1], m[2], m[3]
+  local d, e, f = m[5], m[6], m[7]
+  local g, h, i = m[9], m[10], m[11]
+
+  local det = a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+  if det == 0 then
+    utils.logerror("[culling][invert_matrix] Matrix is not invertible:", m)
+  end
+  det = 1 / det
+
+  local out = {
+    (e * i - f * h) * det, (c * h - b * i) * det, (b * f - c * e) * det, 0,
+    (f * g - d * i) * det, (a * i - c * g) * det, (c * d - a * f) * det, 0,
+    (d * h - e * g) * det, (b * g - a * h) * det, (a * e - b * d) * det, 0,
+    0, 0, 0, 1
+  }
+  local tx, ty, tz = m[13], m[14], m[15]
+  for col = 1, 3 do
+    out[12 + col] = -(tx * out[col] + ty * out[4 + col] + tz * out[8 + col])
+  end
+  return out
+end
+
+function _M_.transform_positions(positions, stride, offset, count, matrix)
+  --[[
+  Args:
+    positions(table): flat table of values with the point positions
+    stride(number): number of values per point in <positions>
+    offset(number): offset of the x value in a point's values
+    count(number): number of points
+    matrix(table): 4x4 matrix as flat table of 16 values
+  Returns:
+    table: new flat table of transformed positions, 3 values per point.
+  ]]
+  local out = {}
+  local m1, m2, m3 = matrix[1], matrix[2], matrix[3]
+  local m5, m6, m7 = matrix[5], matrix[6], matrix[7]
+  local m9, m10, m11 = matrix[9], matrix[10], matrix[11]
+  local m13, m14, m15 = matrix[13], matrix[14], matrix[15]
+  local x, y, z
+  local i
+
+  for pid = 0, count - 1 do
+    i = pid * stride + offset
+    x = positions[i + 1]
+    y = positions[i + 2]
+    z = positions[i + 3]
+    out[pid * 3 + 1] = x * m1 + y * m5 + z * m9 + m13
+    out[pid * 3 + 2] = x * m2 + y * m6 + z * m10 + m14
+    out[pid * 3 + 3] = x * m3 + y * m7 + z * m11 + m15
+  end
+
+  return out
+end
+
+local function merge_sorted(list_a, list_b)
+  --[[
+  Args:
+    list_a(table): ascending list of numbers
+    list_b(table): ascending list of numbers
+  Returns:
+    table: ascending list of the unique numbers from both lists
+  ]]
+  local out = {}
+  local ia = 1
+  local ib = 1
+  local value
+
+  while list_a[ia] ~= nil or list_b[ib] ~= nil do
+    if list_b[ib] == nil or (list_a[ia] ~= nil and list_a[ia] <= list_b[ib]) then
+      value = list_a[ia]
+      ia = ia + 1
+    else
+      value = list_b[ib]
+      ib = ib + 1
+    end
+    if out[#out] ~= value then
+      out[#out + 1] = value
+    end
+  end
+
+  return out
+end
+
+function _M_.set_culled_points(point_data, culled)
+  --[[
+  Write the culled points on the current location as a $skip attribute (or
+  $hide if it is the one declared) merged with the points already skipped,
+  and declare it in <instancing.data.common> in place of the previous one.
+
+  Args:
+    point_data(PointCloudData): built instance for the current location
+    culled(table): ascending list of point index to cull, starting at 0.
+  ]]
+
+  local common = utils.get_attr_value(
+      point_data.location,
+      "instancing.data.common",
+      error
+  ) -- flat table of {path, token, tupleSize, ...}
+
+  local hide_index
+  local skip_index
+  for i = 1, #common, 3 do
+    if common[i + 1] == "$hide" then
+      hide_index = i
+    elseif common[i + 1] == "$skip" then
+      skip_index = i
+    end
+  end
+
+  -- $hide takes the priority over $skip in PointCloudData, keep it that way.
+  if hide_index then
+
+    local hide = {}
+    local previous = point_data.common.hide:get_value_at(nil, 0.0)
+    for i = 1, point_data.points.count do
+      hide[i] = previous[i]
+    end
+    for i = 1, #culled do
+      hide[culled[i] + 1] = 1
+    end
+
+    Interface.SetAttr(CULLING_HIDE_ATTR, IntAttribute(hide, 1))
+    common[hide_index] = CULLING_HIDE_ATTR
+    common[hide_index + 2] = "1"
+
+  else
+
+    if skip_index then
+      local previous = {}
+      for i, v in ipairs(point_data.common.skip:get_value_at(nil, 0.0)) do
+        previous[i] = v
+      end
+      tablesort(previous)
+      culled = merge_sorted(previous, culled)
+      common[skip_index] = CULLING_SKIP_ATTR
+      common[skip_index + 2] = "1"
+    else
+      common[#common + 1] = CULLING_SKIP_ATTR
+      common[#common + 1] = "$skip"
+      common[#common + 1] = "1"
+    end
+
+    Interface.SetAttr(CULLING_SKIP_ATTR, IntAttribute(culled, 1))
+
+  end
+
+  Interface.SetAttr("instancing.data.common", StringAttribute(common, 3))
+
+  logger:debug(
+      "[culling][set_culled_points] Finished for <", point_data.location, ">."
+  )
+
+end
+
+return _M_
@@ -0,0 +1,341 @@
+--[[
+version=0.2.0
+
+[LICENSE]
+
+Copyright 2022 Liam Collod
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+   http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+]]
+local _M_ = {}
+local logging = require("lllogger")
+local PointCloudData = require("kui.PointCloudData")
+local culling = require("kui.culling")
+local utils = require("kui.utils")
+
+local logger = logging.getLogger(...)
+
+-- we make some global functions local as this will improve performances in
+-- heavy loops.
+local mathsqrt = math.sqrt
+local mathtan = math.tan
+local mathpi = math.pi
+
+local IDENTITY = { 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1 }
+
+
+--[[ __________________________________________________________________________
+  API
+]]
+
+
+local FrustumCuller = {}
+function FrustumCuller:new(matrix, projection, screen, near, far)
+  --[[
+  Test points against a camera frustum. The camera look down its -Z axis.
+
+  Points are considered as spheres of radius <padding> : a point is culled
+  only if its whole sphere is outside the frustum.
+
+  Args:
+    matrix(table):
+      4x4 matrix as a flat table of 16 values, transforming the points to the
+      camera space.
+    projection(str): "perspective" or "orthographic"
+    screen(table):
+      {left, right, bottom, top} bounds of the screen window. For a
+      perspective projection, this is at a distance of 1 from the camera
+      (so tangents of the half angles).
+    near(number): near clipping plane distance
+    far(number): far clipping plane distance
+
+  Attributes:
+    padding(number): margin in scene units to keep points near the frustum.
+    max_distance(number): points further from the camera are culled, 0 to
+      disable.
+  ]]
+
+  local attrs = {
+    ["matrix"] = matrix,
+    ["projection"] = projection,
+    ["screen"] = screen,
+    ["near"] = near,
+    ["far"] = far,
+    ["padding"] = 0,
+    ["max_distance"] = 0
+  }
+
+  function attrs:set_padding(padding)
+    --[[
+    Args:
+      padding(number): margin in scene units, >= 0
+    ]]
+    self.padding = padding
+  end
+
+  function attrs:set_max_distance(max_distance)
+    --[[
+    Args:
+      max_distance(number): distance in scene units, 0 to disable.
+    ]]
+    self.max_distance = max_distance
+  end
+
+  function attrs:get_culled_points(positions, stride, offset, count)
+    --[[
+    Test all the points against the frustum in one pass over the positions.
+
+    /!\ perfs
+
+    Args:
+      positions(table): flat table of values with the point positions
+      stride(number): number of values per point in <positions>
+        (3 for a translation, 16 for a matrix)
+      offset(number): offset of the x value in a point's values
+        (0 for a translation, 12 for a matrix)
+      count(number): number of points to test
+    Returns:
+      table: ascending list of the points index to cull, starting at 0.
+    ]]
+
+    local out = {}
+    local m = self.matrix
+    local m1, m2, m3 = m[1], m[2], m[3]
+    local m5, m6, m7 = m[5], m[6], m[7]
+    local m9, m10, m11 = m[9], m[10], m[11]
+    local m13, m14, m15 = m[13], m[14], m[15]
+
+    local pad = self.padding
+    local left, right = self.screen[1], self.screen[2]
+    local bottom, top = self.screen[3], self.screen[4]
+    local near = self.near - pad
+    local far = self.far + pad
+    local max_distance = self.max_distance * self.max_distance
+    local perspective = self.projection ~= "orthographic"
+
+    -- distance to the side planes are compared to padding*plane_scale so
+    -- the planes normal doesn't need to be normalized.
+    local pad_left, pad_right, pad_bottom, pad_top
+    if perspective then
+      pad_left = pad * mathsqrt(1 + left * left)
+      pad_right = pad * mathsqrt(1 + right * right)
+      pad_bottom = pad * mathsqrt(1 + bottom * bottom)
+      pad_top = pad * mathsqrt(1 + top * top)
+    else
+      left = left - pad
+      right = right + pad
+      bottom = bottom - pad
+      top = top + pad
+    end
+
+    local x, y, z
+    local cx, cy, depth
+    local i
+    local visible
+
+    for pid = 0, count - 1 do
+
+      i = pid * stride + offset
+      x = positions[i + 1]
+      y = positions[i + 2]
+      z = positions[i + 3]
+
+      cx = x * m1 + y * m5 + z * m9 + m13
+      cy = x * m2 + y * m6 + z * m10 + m14
+      depth = -(x * m3 + y * m7 + z * m11 + m15)
+
+      visible = depth >= near and depth <= far
+      if visible then
+        if perspective then
+          visible = cx - right * depth <= pad_right and
+              left * depth - cx <= pad_left and
+              cy - top * depth <= pad_top and
+              bottom * depth - cy <= pad_bottom
+        else
+          visible = cx <= right and cx >= left and cy <= top and cy >= bottom
+        end
+      end
+      if visible and max_distance > 0 then
+        visible = cx * cx + cy * cy + depth * depth <= max_distance
+      end
+
+      if not visible then
+        out[#out + 1] = pid
+      end
+
+    end
+
+    return out
+
+  end
+
+  return attrs
+
+end
+
+local function get_aspect_ratio()
+  --[[
+  Returns:
+    number: width/height of the render resolution set on /root, 1 if it
+      can't be found.
+  ]]
+  local resolution = Interface.GetAttr("renderSettings.resolution", "/root")
+  if resolution then
+    resolution = resolution:getValue("")
+    local width, height = resolution:match("^(%d+)x(%d+)")
+    if width then
+      return tonumber(width) / tonumber(height)
+    end
+  end
+
+  logger:warning(
+      "[get_aspect_ratio] Can't find the render resolution on /root, using \z
+      an aspect ratio of 1. Use <user.aspect_ratio> to specify it."
+  )
+  return 1
+
+end
+
+local function get_camera_culler(camera, pointcloud, aspect_ratio)
+  --[[
+  Args:
+    camera(str): camera scene graph location
+    pointcloud(str): point-cloud scene graph location
+    aspect_ratio(number): render width/height
+  Returns:
+    FrustumCuller:
+  ]]
+
+  if not Interface.GetAttr("geometry", camera) then
+    utils.logerror(
+        "[get_camera_culler] camera <", camera, "> doesn't exist or has no \z
+        <geometry> attribute."
+    )
+  end
+
+  local projection = utils.get_attr_value(camera, "geometry.projection", false)
+  if projection then
+    projection = projection[1]
+  else
+    projection = "perspective"
+    logger:warning(
+        "[get_camera_culler] camera <", camera, "> has no \z
+        <geometry.projection>, using perspective."
+    )
+  end
+  local near = utils.get_attr_value(camera, "geometry.near", { 0.1 })[1]
+  local far = utils.get_attr_value(camera, "geometry.far", { 100000 })[1]
+  local screen = {
+    utils.get_attr_value(camera, "geometry.left", { -1 })[1],
+    utils.get_attr_value(camera, "geometry.right", { 1 })[1],
+    utils.get_attr_value(camera, "geometry.bottom", { -1 })[1],
+    utils.get_attr_value(camera, "geometry.top", { 1 })[1]
+  }
+
+  -- size of the screen window along its smallest side
+  local size
+  if projection == "orthographic" then
+    size = utils.get_attr_value(
+        camera, "geometry.orthographicWidth", error
+    )[1] / 2
+  else
+    size = mathtan(
+        utils.get_attr_value(camera, "geometry.fov", error)[1] * mathpi / 360
+    )
+  end
+
+  local sx, sy = size, size
+  if aspect_ratio >= 1 then
+    sx = size * aspect_ratio
+  else
+    sy = size / aspect_ratio
+  end
+  screen[1] = screen[1] * sx
+  screen[2] = screen[2] * sx
+  screen[3] = screen[3] * sy
+  screen[4] = screen[4] * sy
+
+  -- points are in the point-cloud space : point-cloud -> world -> camera
+  local camera_matrix = utils.get_world_matrix(camera) or IDENTITY
+  local matrix = utils.get_world_matrix(pointcloud) or IDENTITY
+  matrix = culling.multiply_matrix(matrix, culling.invert_matrix(camera_matrix))
+
+  logger:debug(
+      "[get_camera_culler] camera <", camera, "> projection=", projection,
+      "screen=", screen, "near=", near, "far=", far
+  )
+
+  return FrustumCuller:new(matrix, projection, screen, near, far)
+
+end
+
+
+-- processes ------------------------------------------------------------------
+
+
+function _M_.run()
+  --[[
+  Cull the points of the current point-cloud location that are outside the
+  frustum of <user.camera_location> or too far from it.
+  ]]
+
+  local stime = os.clock()
+
+  local u_pointcloud_sg = utils.get_user_attr(
+      "pointcloud_sg",
+      { Interface.GetInputLocationPath() }
+  )[1]  -- type: str
+  local u_camera = utils.get_user_attr("camera_location", error)[1]
+  local u_padding = utils.get_user_attr("padding", { 0 })[1]
+  local u_max_distance = utils.get_user_attr("max_distance", { 0 })[1]
+  local u_aspect_ratio = utils.get_user_attr("aspect_ratio", { 0 })[1]
+  if u_aspect_ratio <= 0 then
+    u_aspect_ratio = get_aspect_ratio()
+  end
+
+  -- process the source pointcloud
+  logger:info("[run] Started processing source <", u_pointcloud_sg, ">.")
+  local pointdata
+  pointdata = PointCloudData:new(u_pointcloud_sg)
+  pointdata:build()
+  logger:info(
+      "[run] Finished processing source <", u_pointcloud_sg, ">.",
+      pointdata.points.count, " points found."
+  )
+
+  local culler = get_camera_culler(u_camera, u_pointcloud_sg, u_aspect_ratio)
+  culler:set_padding(u_padding)
+  culler:set_max_distance(u_max_distance)
+
+  local positions, stride, offset = pointdata:get_positions()
+  local culled = culler:get_culled_points(
+      positions,
+      stride,
+      offset,
+      pointdata.points.count
+  )
+
+  culling.set_culled_points(pointdata, culled)
+
+  stime = os.clock() - stime
+  logger:info(
+      "[run] Finished in ", stime, "s. Culled ", #culled, " points on ",
+      pointdata.points.count, "."
+  )
+
+end
+
+_M_.FrustumCuller = FrustumCuller
+
+return _M_
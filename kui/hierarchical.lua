@@ -1,5 +1,5 @@
 --[[
-version=20
+version=27
 
 [LICENSE]
 
@@ -20,25 +20,53 @@ limitations under the License.
 ]]
 local _M_ = {}
 local logging = require("lllogger")
-local PointCloudData = require("kui.PointCloudData")
+local cache = require("kui.cache")
+local Stats = require("kui.stats").Stats
 local utils = require("kui.utils")
 
 local logger = logging.getLogger(...)
 
-local function atroot()
+-- with automatic partitions, number of points per partition
+local PARTITION_SIZE = 10000
+local PARTITION_MAX = 64
+
+local function atroot(partition, bucket)
   --[[
   95% of the code is wrapped in this function as it's absolutely not
   needed when not at "AtRoot", dirty but works.
   run-time won is negligable (~7%), memory not measured.
+
+  Args:
+    partition(GroupAttribute or nil):
+      the <partition> op-arg when called on a partition location created at
+      root, only the instances of its point range are created.
+    bucket(GroupAttribute or nil):
+      the <bucket> op-arg when called on a bucket location created by
+      InstanceBuckets, only the instances of its points are created.
   ]]
 
 
   local OPARG = Interface.GetOpArg()
+  if partition or bucket then
+    -- the instances created must not be seen as partitions or buckets
+    local gb = GroupBuilder()
+    local name
+    for i = 0, OPARG:getNumberOfChildren() - 1 do
+      name = OPARG:getChildName(i)
+      if name ~= "partition" and name ~= "bucket" then
+        gb:set(name, OPARG:getChildByIndex(i))
+      end
+    end
+    OPARG = gb:build()
+  end
 
   -- we make some global functions local as this will improve performances in
   -- heavy loops
   local tostring = tostring
   local stringformat = string.format
+  local unpack = unpack
+  local mathfloor = math.floor
+  local mathmin = math.min
 
   --[[ __________________________________________________________________________
     API
@@ -59,6 +87,356 @@ local function atroot()
     { ["token"] = "matrix", ["target"] = "xform.group0.matrix" },
   }
 
+  -- // Used by NameTemplate
+  -- tokens supported in the instance name template, key is the pattern to
+  -- find the token at the start of a string, value is the slot it refers to.
+  -- order is important ($id must be tested before anything else)
+  local name_tokens = {
+    { ["pattern"] = "^%$id%d*", ["slot"] = 1 },
+    { ["pattern"] = "^%$sourcename", ["slot"] = 2 },
+    { ["pattern"] = "^%$sourceindex", ["slot"] = 3 },
+  }
+
+  local NameTemplate = {}
+  function NameTemplate:new(template)
+    --[[
+    Instance name template compiled to a single string.format() pattern.
+    Must be created once per cook and shared between all the instances.
+
+    Args:
+      template(str): name template with tokens, ex: "inst_$id3_$sourcename"
+
+    Attributes:
+      template(str): original name template
+      pattern(str): string.format pattern build from the template
+      slots(table): ordered list of slot id to give to pattern, where
+        1=instance id, 2=source name, 3=source index
+      basenames(table): memoized basename for each instance source location
+      indexes(table): memoized string for each source index
+    ]]
+
+    -- safety check that $id is present
+    if not template:match("%$id") then
+      utils.logerror(
+          "[NameTemplate][new] Passed name template <",
+          template,
+          "> doesn't have the mandatory <$id> token."
+      )
+    end
+
+    -- extract the number of digit that must be used for the id
+    -- (the first $id token found gives the padding for all of them)
+    local digits = template:match("%$id(%d*)")
+    local id_pattern = utils.conkat("%0", digits, "d")
+
+    local attrs = {
+      ["template"] = template,
+      ["pattern"] = false,
+      ["slots"] = {},
+      ["basenames"] = {},
+      ["indexes"] = {},
+      ["__slotvalues"] = {},
+      ["__args"] = {},
+    }
+
+    -- split the template in static segments and token slots
+    local pattern = {}
+    local static = {}
+    local pos = 1
+    local found
+    local char
+
+    while pos <= #template do
+
+      found = false
+      char = template:sub(pos, pos)
+
+      if char == "$" then
+        for _, ntoken in ipairs(name_tokens) do
+          found = template:sub(pos):match(ntoken.pattern)
+          if found then
+            -- escape "%" in static segments as they are part of the pattern
+            pattern[#pattern + 1] = tostring(table.concat(static):gsub("%%", "%%%%"))
+            static = {}
+            if ntoken.slot == 1 then
+              pattern[#pattern + 1] = id_pattern
+            else
+              pattern[#pattern + 1] = "%s"
+            end
+            attrs.slots[#attrs.slots + 1] = ntoken.slot
+            pos = pos + #found
+            break
+          end
+        end
+      end
+
+      if not found then
+        static[#static + 1] = char
+        pos = pos + 1
+      end
+
+    end
+    pattern[#pattern + 1] = tostring(table.concat(static):gsub("%%", "%%%%"))
+    attrs.pattern = table.concat(pattern)
+
+    function attrs:get_basename(instance_source)
+      --[[
+      Args:
+        instance_source(str or false): scene graph location
+      Returns:
+        str: basename of the given location, memoized per location.
+      ]]
+      if not instance_source then
+        return ""
+      end
+      local basename = self.basenames[instance_source]
+      if not basename then
+        basename = tostring(instance_source:gsub(".+/", ""))
+        self.basenames[instance_source] = basename
+      end
+      return basename
+    end
+
+    function attrs:get_index(source_index)
+      --[[
+      Args:
+        source_index(str or number or false):
+      Returns:
+        str: source_index as string, memoized per index.
+      ]]
+      if not source_index then
+        return ""
+      end
+      local index = self.indexes[source_index]
+      if not index then
+        index = tostring(source_index)
+        self.indexes[source_index] = index
+      end
+      return index
+    end
+
+    function attrs:format(id, instance_source, source_index)
+      --[[
+      Compute the instance location name for the given values.
+
+      /!\ perfs
+
+      Args:
+        id(int): instance id
+        instance_source(str or false): instance source location used
+        source_index(str or number or false): index of the instance source
+      Returns:
+        str: final instance name
+      ]]
+      local values = self.__slotvalues
+      values[1] = id
+      values[2] = self:get_basename(instance_source)
+      values[3] = self:get_index(source_index)
+
+      local args = self.__args
+      local slots = self.slots
+      for i = 1, #slots do
+        args[i] = values[slots[i]]
+      end
+
+      return stringformat(self.pattern, unpack(args, 1, #slots))
+    end
+
+    return attrs
+
+  end
+
+  local InstancePlan = {}
+  function InstancePlan:new(point_data)
+    --[[
+    Everything needed to set the attributes of an instance that doesn't
+    depend on the point, resolved from the PointCloudData.
+    Must be created once per cook and shared between all the instances.
+
+    Args:
+      point_data(PointCloudData): PointCloudData instance that has been built.
+
+    Attributes:
+      sources(SourcesAttribute): the <sources> common attribute
+      hidden(table or false): values of the <hide> token at sample 0.0
+      hidden_tuple(number): tuple size of <hidden>, 0 if not per-point
+      entries(table):
+        ordered list of attributes to set on each instance, as tables with:
+        - path(str): attribute path on the instance GroupBuilder
+        - constant(DataAttribute or false): value shared by all the instances
+        - values(table): {time sample: flat table of values}
+        - samples(table): ascending list of the time samples to use
+        - tuple(number): tuple size
+        - class(DataAttribute table): class not instanced
+        - slices(table): one reused buffer per time sample
+        - point(table): reused {time sample: slice} table
+    ]]
+
+    local attrs = {
+      ["sources"] = point_data:get_common_by_name("sources"),
+      ["hidden"] = false,
+      ["hidden_tuple"] = 1,
+      ["entries"] = {},
+    }
+
+    function attrs:add_constant(attr_path, attr_value)
+      --[[
+      Args:
+        attr_path(str): path relative to the instance.
+        attr_value(DataAttribute or nil): nil is ignored.
+      ]]
+      if attr_value == nil then
+        return
+      end
+      self.entries[#self.entries + 1] = {
+        ["path"] = utils.conkat("childAttrs.", attr_path),
+        ["constant"] = attr_value
+      }
+    end
+
+    function attrs:add_attribute(attr_path, attribute)
+      --[[
+      Args:
+        attr_path(str): path relative to the instance.
+        attribute(BaseAttribute): attribute giving the values for each point.
+      ]]
+
+      if not attribute.perPoint then
+        self:add_constant(attr_path, attribute:get_data_at())
+        return
+      end
+
+      local values = attribute:get_value_at()
+      if not values then
+        return
+      end
+
+      local samples = {}
+      if attribute.static then
+        samples[1] = 0.0
+      else
+        for sample, _ in pairs(values) do
+          samples[#samples + 1] = sample
+        end
+        table.sort(samples)
+      end
+
+      local slices = {}
+      for i = 1, #samples do
+        slices[i] = {}
+      end
+
+      self.entries[#self.entries + 1] = {
+        ["path"] = utils.conkat("childAttrs.", attr_path),
+        ["constant"] = false,
+        ["values"] = values,
+        ["samples"] = samples,
+        ["tuple"] = attribute.tupleSize,
+        ["class"] = attribute.class,
+        ["slices"] = slices,
+        ["point"] = {}
+      }
+    end
+
+    function attrs:is_hidden(pid)
+      --[[
+      /!\ perfs
+
+      Args:
+        pid(int): point index, starts at 0
+      Returns:
+        bool: true if the point must not be created.
+      ]]
+      local hidden = self.hidden
+      if not hidden then
+        return false
+      end
+      return hidden[pid * self.hidden_tuple + 1] == 1
+    end
+
+    function attrs:set_attributes(gb, pid)
+      --[[
+      Set all the entries values for the given point.
+
+      /!\ perfs
+
+      Args:
+        gb(GroupBuilder): instance op-args
+        pid(int): point index, starts at 0
+      ]]
+      local entries = self.entries
+      local entry
+      local values
+      local samples
+      local slices
+      local point
+      local buf
+      local svalues
+      local tuple
+      local offset
+
+      for i = 1, #entries do
+        entry = entries[i]
+        if entry.constant then
+          gb:set(entry.path, entry.constant)
+        else
+          values = entry.values
+          samples = entry.samples
+          slices = entry.slices
+          point = entry.point
+          tuple = entry.tuple
+          offset = pid * tuple
+          for si = 1, #samples do
+            buf = slices[si]
+            svalues = values[samples[si]]
+            for grpi = 1, tuple do
+              buf[grpi] = svalues[offset + grpi]
+            end
+            point[samples[si]] = buf
+          end
+          gb:set(entry.path, entry.class(point, tuple))
+        end
+      end
+    end
+
+    -- hidden points
+    local buf = point_data:get_common_by_name("hide")
+    if buf then
+      attrs.hidden = buf:get_value_at(nil, 0.0) or false
+      -- not per-point: the first value is used for all the points
+      attrs.hidden_tuple = buf.perPoint and buf.tupleSize or 0
+    end
+
+    -- common attributes, in the order of token_target
+    for _, tt in ipairs(token_target) do
+      buf = point_data:get_common_by_name(tt["token"])
+      if buf then
+        attrs:add_attribute(tt["target"], buf)
+      end
+    end
+
+    -- arbitrary attributes, with their additional attributes first
+    for target, attr in pairs(point_data:get_arbitrary()) do
+      if attr.additional then
+        for addit_target, addit_value in pairs(attr.additional) do
+          if not Attribute.IsAttribute(addit_value) then
+            utils.logerror(
+                "[InstancePlan][new] Additional key <",
+                addit_target,
+                "> has a invalid value (not Attribute):",
+                addit_value
+            )
+          end
+          attrs:add_constant(addit_target, addit_value)
+        end
+      end
+      attrs:add_attribute(target, attr)
+    end
+
+    return attrs
+
+  end
+
   local InstanceHierarchical = {}
   function InstanceHierarchical:new(name, id)
     --[[
@@ -68,7 +446,7 @@ local function atroot()
     instanced thousands of times.
 
     Args:
-      name(str): name template to give to the instance (with tokens)
+      name(NameTemplate): compiled name template to give to the instance
       id(int):
         !! starts at 0 !!
         unique identifier for the instance, usually the loop current index
@@ -83,8 +461,8 @@ local function atroot()
       id(int):
         !! starts at 0 !!
         unique identifier for the instance, usually the loop current index
-      nametmp(str):
-        name template to give to the instance (so with tokens)
+      nametmp(NameTemplate):
+        compiled name template to give to the instance
     ]]
 
     local attrs = {
@@ -117,71 +495,36 @@ local function atroot()
       )
     end
 
-    function attrs:build_from_pdata(point_data)
+    function attrs:build_from_plan(plan)
       --[[
-      Convenient method to build the instance from a PointCloudData instance
-      at the current point index (id attribute).
+      Build the instance at the current point index (id attribute) from the
+      compiled InstancePlan.
+
+      Args:
+        plan(InstancePlan):
       ]]
 
-      if point_data:is_point_hidden(self.id) == true then
+      if plan:is_hidden(self.id) then
         self.__hidden = true
         return
       end
 
       -- 1. PROCESS INSTANCE SOURCE SETUP
-      -- had to be first for childAttrs to not override previously set
-      local src_attr = point_data:get_common_by_name("sources")
-      src_attr = src_attr:get_instance_source_data_at(self.id)
-      -- must really be first
-      -- this fucker makes things super slow later but can't do much about it
-      self.gb:set("childAttrs", src_attr[3])
+      local src_attr = plan.sources:get_instance_source_data_at(self.id)
+      -- the source attributes are the same GroupAttribute for every instance
+      -- using this source, so it's just a reference here and not a copy. They
+      -- are kept separated from childAttrs so they are never merged in it.
+      if src_attr[3] then
+        self.gb:set("sourceAttrs", src_attr[3])
+      end
       self:set_instance_source(
           src_attr[1],
           src_attr[2]
       )
 
-      local buf
-
-      -- 2. PROCESS COMMON ATTRIBUTES
-      for _, tt in ipairs(token_target) do
-        buf = point_data:get_common_by_name(tt["token"])
-        if buf then
-          -- add() handle nil value by himself
-          self:add(
-              tt["target"],
-              buf:get_data_at(self.id)
-          )
-        end
-      end
-
-      -- 3. PROCESS ARBITRARY ATTRIBUTES
-      for target, attr in pairs(point_data:get_arbitrary()) do
-        -- 1. first process the additional table
-        -- we only use arbtr_data for the <additional> key yet so we can do this
-        buf = attr.additional  -- type: table or NIL
-        if buf then
-          for addit_target, addit_value in pairs(buf) do
-
-            if not Attribute.IsAttribute(addit_value) then
-              utils.logerror(
-                  "[hierarchical][build] Additional key <",
-                  addit_target,
-                  "> has a invalid value (not Attribute):",
-                  addit_value
-              )
-            end
-
-            self:add(addit_target, addit_value)
-
-          end
-        end
-        -- 2. Add the arbitrary attribute value
-        -- add() handle nil value by himself
-        self:add(target, attr:get_data_at(self.id))
+      -- 2. PROCESS COMMON AND ARBITRARY ATTRIBUTES
+      plan:set_attributes(self.gb, self.id)
 
-      end
-
-      -- end function
     end
 
     function attrs:set_instance_source(instance_source, index)
@@ -193,8 +536,8 @@ local function atroot()
     ]]
       self.data.instance_source = instance_source
       self.data.source_index = index
-      self:add(
-          "geometry.instanceSource",
+      self.gb:set(
+          "childAttrs.geometry.instanceSource",
           StringAttribute(instance_source)
       )
     end
@@ -204,76 +547,194 @@ local function atroot()
       Compute the instance location name from the given template (self.nametmp)
        based on its attributes.
 
-      TODO some perfs might be gained here, see later.
-
       Returns:
         str: final instance name
       ]]
-      local out = self.nametmp
+      return self.nametmp:format(
+          self.id,
+          self.data.instance_source,
+          self.data.source_index
+      )
+    end
+
+    function attrs:finalize()
+      --[[
+      Last method to call once you finish building the Instance.
+      ]]
 
-      -- safety check that $id is present
-      if not out:match("%$id") then
+      -- check if this instance must be rendered first
+      if self.__hidden == true then
+        return
+      end
+
+      self:add("type", StringAttribute("instance"))
+
+      Interface.CreateChild(
+          self:get_name(),
+          Interface.GetOpType(),
+          self.gb:build()
+      )
+    end
+
+    return attrs
+
+  end
+
+
+  local InstanceBuckets = {}
+  function InstanceBuckets:new(mode, size, point_data)
+    --[[
+    Group the instances in intermediate "bucket" locations instead of creating
+    them all as children of the same location.
+
+    Bucket locations are created at root with only the points they contain
+    as op-arg : their instances are built when the bucket location itself is
+    cooked (see run_not_root), so expanding the parent location stays cheap.
+
+    Args:
+      mode(str):
+        - "count": consecutive points are grouped by <size>. Buckets are named
+          like "bucket_0001".
+        - "grid": points are grouped in cubic cells of <size> scene units,
+          using their translation. Buckets are named like "cell_0_n2_1"
+          where "n" stands for negative cell coordinates.
+      size(number): see mode
+      point_data(PointCloudData): PointCloudData instance that has been built.
+
+    Attributes:
+      buckets(table):
+        {bucket key: {"start": int, "end": int, "points": table}}, <start>
+        and <end> being the range of points of a "count" bucket, <points> the
+        ascending list of point index of a "grid" bucket.
+      keys(table): ordered list of bucket keys, in their creation order.
+    ]]
+
+    if mode ~= "count" and mode ~= "grid" then
+      utils.logerror(
+          "[InstanceBuckets][new] Unsupported bucket mode <", mode, ">."
+      )
+    end
+    if not size or size <= 0 then
+      utils.logerror(
+          "[InstanceBuckets][new] bucket size must be > 0, got <", size, ">."
+      )
+    end
+
+    local attrs = {
+      ["mode"] = mode,
+      ["size"] = size,
+      ["pdata"] = point_data,
+      ["buckets"] = {},
+      ["keys"] = {},
+      ["__position"] = false,
+      ["__position_offset"] = 0,
+      ["__name_pattern"] = false,
+    }
+
+    if mode == "count" then
+      -- the padding is deduced from the last bucket so they sort properly
+      local last = mathfloor((point_data.points.count - 1) / size)
+      attrs.size = mathfloor(size)
+      attrs.__name_pattern = utils.conkat("bucket_%0", #tostring(last), "d")
+
+    else
+      -- grid need a position for each point, from translation else matrix
+      local position = point_data:get_common_by_name("translation")
+      if not position then
+        position = point_data:get_common_by_name("matrix")
+        attrs.__position_offset = 12
+      end
+      if not position then
         utils.logerror(
-            "[InstanceHierarchical][get_name] Passed name template <",
-            out,
-            "> doesn't have the mandatory <$id> token."
+            "[InstanceBuckets][new] The <grid> bucket mode require the \z
+            $translation or $matrix token on <", point_data.location, ">."
         )
       end
+      attrs.__position = position
+    end
 
-      -- extract the number of digit that must be used for the id
-      local digits = out:match("%$id(%d*)")
-      if not digits then
-        digits = 0
+    local function cell_coordinate(value)
+      -- to string with negative values prefixed with "n" as "-" is not
+      -- safe in location names.
+      value = mathfloor(value / attrs.size)
+      if value < 0 then
+        return utils.conkat("n", -value)
       end
+      return tostring(value)
+    end
 
-      -- create the token values
-      local sourcename
-      local sourceindex
+    function attrs:get_bucket_name(pid)
+      --[[
+      /!\ perfs
 
-      if self.data.instance_source then
-        sourcename = tostring(self.data.instance_source:gsub(".+/", ""))
-      else
-        sourcename = ""
+      Args:
+        pid(int): point index !! starts at 0 !!
+      Returns:
+        str: name of the bucket location the given point belongs to
+      ]]
+      if self.mode == "count" then
+        return stringformat(self.__name_pattern, mathfloor(pid / self.size))
       end
 
-      if self.data.source_index then
-        sourceindex = tostring(self.data.source_index)
-      else
-        sourceindex = ""
-      end
+      local position = self.__position:get_value_at(pid, 0.0)
+      local offset = self.__position_offset
+      return stringformat(
+          "cell_%s_%s_%s",
+          cell_coordinate(position[offset + 1]),
+          cell_coordinate(position[offset + 2]),
+          cell_coordinate(position[offset + 3])
+      )
+    end
 
-      -- Assign the tokens to their value
-      -- key is a regex, value must be a string
-      local tokens = {
-        ["%$id%d*"] = stringformat(utils.conkat("%0", digits, "d"), self.id),
-        ["%$sourcename"] = sourcename,
-        ["%$sourceindex"] = sourceindex
-      }
+    function attrs:add(pid)
+      --[[
+      Add a point to its bucket. Points must be added in ascending order.
 
-      -- replace token on name template
-      for token, value in pairs(tokens) do
-        out = tostring(out:gsub(token, value))
+      Args:
+        pid(int): point index !! starts at 0 !!
+      ]]
+      local key = self:get_bucket_name(pid)
+      local bucket = self.buckets[key]
+      if not bucket then
+        bucket = { ["start"] = pid, ["end"] = pid + 1, ["points"] = {} }
+        self.buckets[key] = bucket
+        self.keys[#self.keys + 1] = key
       end
 
-      return out
-
+      if self.mode == "count" then
+        bucket["end"] = pid + 1
+      else
+        bucket.points[#bucket.points + 1] = pid
+      end
     end
 
-    function attrs:finalize()
+    function attrs:build()
       --[[
-      Last method to call once you finish building the Instance.
+      Create all the bucket locations, sorted by name.
       ]]
+      table.sort(self.keys)
+
+      local gb
+      local bucket
+
+      for _, key in ipairs(self.keys) do
+
+        bucket = self.buckets[key]
+        gb = GroupBuilder()
+        gb:update(OPARG)
+        if self.mode == "count" then
+          gb:set("bucket.start", IntAttribute(bucket["start"]))
+          gb:set("bucket.end", IntAttribute(bucket["end"]))
+        else
+          gb:set("bucket.points", IntAttribute(bucket.points, 1))
+        end
+
+        Interface.CreateChild(key, Interface.GetOpType(), gb:build())
 
-      -- check if this instance must be rendered first
-      if self.__hidden == true then
-        return
       end
 
-      self:add("type", StringAttribute("instance"))
-      Interface.CreateChild(
-          self:get_name(),
-          Interface.GetOpType(),
-          self.gb:build()
+      logger:debug(
+          "[InstanceBuckets][build] Created ", #self.keys, " buckets."
       )
     end
 
@@ -295,29 +756,105 @@ local function atroot()
 
     Attributes:
       pdata(PointCloudData): PointCloudData instance
-      name_tmp(str): name to give to the instances, with tokens.
+      name_tmp(NameTemplate): name to give to the instances, compiled from
+        the template with tokens.
+      buckets(InstanceBuckets or false):
+        if set, instances are grouped in intermediate bucket locations.
+      start(int): index of the first point to create, starts at 0.
+      stop(int or false): index of the point after the last one to create,
+        false for all the points.
+      points(table or false): ascending list of the point index to create,
+        used instead of <start> and <stop> if set.
 
     ]]
 
     local attrs = {
       pdata = point_data,
       name_tmp = false,
+      buckets = false,
+      start = 0,
+      stop = false,
+      points = false,
     }
 
     function attrs:build()
 
+      local stop = self.stop or self.pdata.points.count
+
+      -- only the bucket locations are created, their instances are built
+      -- when they are cooked.
+      local buckets = self.buckets
+      if buckets then
+        for pid = self.start, stop - 1 do
+          if not self.pdata:is_point_hidden(pid) then
+            buckets:add(pid)
+          end
+        end
+        buckets:build()
+        return
+      end
+
       local instance
+      local plan = InstancePlan:new(self.pdata)
+      local points = self.points
       -- /!\ perfs
-      for pid = 0, self.pdata.points.count - 1 do
+      if points then
+        for i = 1, #points do
+          instance = InstanceHierarchical:new(self.name_tmp, points[i])
+          instance:build_from_plan(plan)
+          instance:finalize()
+        end
+        return
+      end
+      for pid = self.start, stop - 1 do
         instance = InstanceHierarchical:new(self.name_tmp, pid)
-        instance:build_from_pdata(self.pdata)
+        instance:build_from_plan(plan)
         instance:finalize()
       end
 
     end
 
+    function attrs:set_buckets(mode, size)
+      --[[
+      Args:
+        mode(str): "none" to disable buckets, else see InstanceBuckets
+        size(number): see InstanceBuckets
+      ]]
+      if not mode or mode == "none" then
+        self["buckets"] = false
+        return
+      end
+      self["buckets"] = InstanceBuckets:new(mode, size, self.pdata)
+    end
+
+    function attrs:set_range(start, stop)
+      --[[
+      Only create the instances of the given points.
+
+      Args:
+        start(int): index of the first point, starts at 0.
+        stop(int): index of the point after the last one.
+      ]]
+      self["start"] = start
+      self["stop"] = mathmin(stop, self.pdata.points.count)
+    end
+
+    function attrs:set_points(points)
+      --[[
+      Only create the instances of the given points.
+
+      Args:
+        points(table): ascending list of point index, starts at 0.
+      ]]
+      self["points"] = points
+    end
+
     function attrs:set_name_template(name)
-      self["name_tmp"] = name
+      --[[
+      Args:
+        name(str): name template with tokens, compiled once here.
+      ]]
+      self["name_tmp"] = NameTemplate:new(name)
     end
 
     return attrs
@@ -326,6 +863,49 @@ local function atroot()
 
   -- processes ------------------------------------------------------------------
 
+  local function get_partitions_count(partitions, count)
+    --[[
+    Args:
+      partitions(int): number of partitions asked, 0 for automatic.
+      count(int): number of points
+    Returns:
+      int: number of partitions to create, 1 to not partition.
+    ]]
+    if partitions == 0 then
+      partitions = math.ceil(count / PARTITION_SIZE)
+      partitions = mathmin(partitions, PARTITION_MAX)
+    end
+    return math.max(mathmin(partitions, count), 1)
+  end
+
+  local function create_partitions(partitions, count)
+    --[[
+    Split the points in ranges of the same size and create a location for
+    each. The instances of a range are created when its location is cooked
+    (see run_not_root) so Katana can cook the partitions concurrently.
+
+    Args:
+      partitions(int): number of partitions, > 1
+      count(int): number of points
+    ]]
+    local pattern = utils.conkat("partition_%0", #tostring(partitions - 1), "d")
+    local gb
+
+    for i = 0, partitions - 1 do
+      gb = GroupBuilder()
+      gb:update(OPARG)
+      gb:set("partition.start", IntAttribute(mathfloor(count * i / partitions)))
+      gb:set("partition.end", IntAttribute(mathfloor(count * (i + 1) / partitions)))
+      Interface.CreateChild(
+          stringformat(pattern, i),
+          Interface.GetOpType(),
+          gb:build()
+      )
+    end
+
+    logger:debug("[create_partitions] Created ", partitions, " partitions.")
+  end
+
   local function create_instances()
     --[[
     When Interface at root
@@ -334,35 +914,160 @@ local function atroot()
     local time = Interface.GetCurrentTime() -- int
 
     local u_pointcloud_sg = utils.get_user_attr("pointcloud_sg", error)[1]
+    local u_cache_size = utils.get_user_attr("cache_size", { 512 })[1]
+    local u_stats = utils.get_user_attr("stats", { 0 })[1]
     local u_instance_name = utils.get_user_attr("instance_name", error)[1]
+    local u_bucket_mode = utils.get_user_attr("bucket_mode", { "none" })[1]
+    local u_bucket_size = utils.get_user_attr("bucket_size", { 0 })[1]
+    local u_partitions = utils.get_user_attr("partitions", { 1 })[1]
+
+    -- the partitions and buckets cook the same point-cloud again so it must
+    -- stay cached
+    local pin = u_partitions ~= 1 or u_bucket_mode ~= "none" or
+        partition ~= nil or bucket ~= nil
 
     -- process the source pointcloud
     logger:info("Started processing source <", u_pointcloud_sg, ">.")
+    local stats = false
+    if u_stats ~= 0 then
+      stats = Stats:new()
+    end
     local pointdata
-    pointdata = PointCloudData:new(u_pointcloud_sg, time)
-    pointdata:build()
+    local hit
+    if stats then
+      pointdata, hit = stats:measure(
+          "pointcloud",
+          cache.get_point_data,
+          u_pointcloud_sg,
+          u_cache_size,
+          stats,
+          pin
+      )
+      stats:set("pointcloud", "points", IntAttribute(pointdata.points.count))
+    else
+      pointdata, hit = cache.get_point_data(u_pointcloud_sg, u_cache_size, nil, pin)
+    end
+    if (partition or bucket) and not hit then
+      logger:warning(
+          "Partition or bucket <", Interface.GetOutputLocationPath(), "> had \z
+          to process the point-cloud <", u_pointcloud_sg, "> again as it was \z
+          not cached."
+      )
+    end
+    local cstats = cache.get_stats()
+    logger:info(
+        "Cache: ", cstats.hits, " hits, ", cstats.misses, " misses, ",
+        cstats.entries, " entries for ", cstats.size / 1048576, "MB."
+    )
     logger:info("Finished processing source <", u_pointcloud_sg, ">.",
         pointdata.points.count, " points found.")
 
     --logger:debug("pointdata = \n", pointdata, "\n")
     -- start instancing
+    local partitions = 1
+    if not partition and not bucket then
+      partitions = get_partitions_count(u_partitions, pointdata.points.count)
+    end
+    if partitions > 1 and u_cache_size <= 0 then
+      utils.logerror(
+          "[create_instances] <user.partitions> requires the cache, else every \z
+          partition processes the whole point-cloud <", u_pointcloud_sg,
+          "> again. Set <user.cache_size> > 0."
+      )
+    end
+    if not bucket and u_bucket_mode ~= "none" and u_cache_size <= 0 then
+      utils.logerror(
+          "[create_instances] <user.bucket_mode> requires the cache, else every \z
+          bucket processes the whole point-cloud <", u_pointcloud_sg,
+          "> again. Set <user.cache_size> > 0."
+      )
+    end
+
     local instance
-    instance = InstancingHierarchical:new(pointdata)
-    instance:set_name_template(u_instance_name)
-    instance:build()
+    if partitions > 1 then
+      create_partitions(partitions, pointdata.points.count)
+    else
+      instance = InstancingHierarchical:new(pointdata)
+      instance:set_name_template(u_instance_name)
+      if bucket then
+        local points = bucket:getChildByName("points")
+        if points then
+          instance:set_points(points:getNearestSample(0))
+        else
+          instance:set_range(
+              bucket:getChildByName("start"):getValue(),
+              bucket:getChildByName("end"):getValue()
+          )
+        end
+      else
+        instance:set_buckets(u_bucket_mode, u_bucket_size)
+      end
+      if partition then
+        instance:set_range(
+            partition:getChildByName("start"):getValue(),
+            partition:getChildByName("end"):getValue()
+        )
+      end
+      if stats then
+        stats:measure("instancing", instance.build, instance)
+      else
+        instance:build()
+      end
+    end
 
     stime = os.clock() - stime
+    if stats then
+      stats:set("total", "time", DoubleAttribute(stime))
+      stats:write()
+    end
     logger:info("Finished in ", stime, "s for pointcloud <", u_pointcloud_sg, ">.")
 
   end
 
-  print("\n")
+  -- buckets can be many and are not logged (see opscript)
+  if not bucket then
+    print("\n")
+  end
   create_instances()
 
   --end atroot()
 end
 -------------------------------------------------------------------------------
 
+local function set_attrs(group, prefix, inherited)
+  --[[
+  Set all the children of the given group on the current location.
+
+  Children that are a group also existing on <inherited> are set child by
+  child so they are merged with it instead of replacing it.
+
+  Args:
+    group(GroupAttribute): attributes to set
+    prefix(str): path of <group> relative to the location, empty or ending
+      with a dot.
+    inherited(GroupAttribute or nil): attributes already set at <prefix>
+  ]]
+
+  local name
+  local child
+  local existing
+
+  for i = 0, group:getNumberOfChildren() - 1 do
+
+    name = group:getChildName(i)
+    child = group:getChildByIndex(i)
+    existing = inherited and inherited:getChildByName(name)
+
+    if existing and Attribute.IsGroup(child) and Attribute.IsGroup(existing) then
+      set_attrs(child, utils.conkat(prefix, name, "."), existing)
+    else
+      Interface.SetAttr(utils.conkat(prefix, name), child)
+    end
+
+  end
+
+end
+
 local function finalize_instances()
   --[[
   When Interface is not at root.
@@ -372,22 +1077,46 @@ local function finalize_instances()
   the number of instances (so can be thousands !)
   ]]
 
-  -- attributes created for a single instance
+  -- attributes of the instance source, shared by all the instances using it
+  local sourceAttrs = Interface.GetOpArg("sourceAttrs")  -- type: GroupAttribute
+  -- attributes created for a single instance, override the source ones
   local childAttrs = Interface.GetOpArg("childAttrs")  -- type: GroupAttribute
 
-  for i = 0, childAttrs:getNumberOfChildren() - 1 do
+  if sourceAttrs then
+    for i = 0, sourceAttrs:getNumberOfChildren() - 1 do
+      Interface.SetAttr(
+          sourceAttrs:getChildName(i),
+          sourceAttrs:getChildByIndex(i)
+      )
+    end
+  end
 
-    Interface.SetAttr(
-        childAttrs:getChildName(i),
-        childAttrs:getChildByIndex(i)
-    )
+  set_attrs(childAttrs, "", sourceAttrs)
+
+end
+
+local function run_not_root()
+  --[[
+  When Interface is not at root, the location is either a bucket or an
+  instance.
+  ]]
 
+  local bucket = Interface.GetOpArg("bucket")
+  local partition = Interface.GetOpArg("partition")
+  if partition then
+    Interface.SetAttr("type", StringAttribute("group"))
+    atroot(partition)
+  elseif bucket then
+    Interface.SetAttr("type", StringAttribute("group"))
+    atroot(nil, bucket)
+  else
+    finalize_instances()
   end
 
 end
 
 -- TODO change name to run_at_root
 _M_.atroot = atroot
-_M_.run_not_root = finalize_instances
+_M_.run_not_root = run_not_root
 
 return _M_
\ No newline at end of file
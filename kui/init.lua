@@ -20,8 +20,11 @@ _M_._LICENSE = [[
 local _self = (...):gsub('%.init$', '')
 
 _M_.array = require(_self .. '.array')
+_M_.cache = require(_self .. '.cache')
 _M_.hierarchical = require(_self .. '.hierarchical')
+_M_.opscript = require(_self .. '.opscript')
 _M_.PointCloudData = require(_self .. '.PointCloudData')
+_M_.stats = require(_self .. '.stats')
 _M_.utils = require(_self .. '.utils')
 
 return _M_
\ No newline at end of file
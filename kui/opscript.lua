@@ -0,0 +1,66 @@
+--[[
+version=0.1.0
+
+[LICENSE]
+
+Copyright 2022 Liam Collod
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+   http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Body of the KuiInstancer OpScripts. The scripts stored in the nodes only call
+these functions so the body is not copied in every node and is versioned with
+kui.
+]]
+local _M_ = {}
+local logging = require("lllogger")
+local utils = require("kui.utils")
+
+
+local function set_log_level(name)
+  --[[
+  Args:
+    name(str): logger name, ex: "kui.array"
+  ]]
+  local log_level = utils.get_user_attr("log_level", { "INFO" })[1]
+  logging.getLogger(name):setLevel(logging.LEVELS[log_level])
+end
+
+function _M_.array()
+  --[[
+  Script of the array OpScript.
+  ]]
+  set_log_level("kui.array")
+  require("kui.array").run()
+end
+
+function _M_.hierarchical()
+  --[[
+  Script of the hierarchical OpScript.
+  ]]
+  -- don't print/log anything when not at root, repeated times number of points.
+  local hier = require("kui.hierarchical")
+
+  if Interface.AtRoot() then
+    set_log_level("kui.hierarchical")
+    hier.atroot()
+
+  else
+    -- partitions are few and log like the root
+    if Interface.GetOpArg("partition") then
+      set_log_level("kui.hierarchical")
+    end
+    hier.run_not_root()
+  end
+end
+
+return _M_
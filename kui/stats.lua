@@ -0,0 +1,151 @@
+--[[
+version=0.2.0
+
+[LICENSE]
+
+Copyright 2022 Liam Collod
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+   http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Opt-in instrumentation of a cook, written as the <kui.stats> attribute on the
+location created.
+]]
+local _M_ = {}
+local logging = require("lllogger")
+
+local logger = logging.getLogger(...)
+
+-- attribute path created on the instancing location
+local STATS_ATTR = "kui.stats"
+
+
+--[[ __________________________________________________________________________
+  API
+]]
+
+
+local Stats = {}
+function Stats:new()
+  --[[
+  Record the time and memory used by the different steps of a cook.
+
+  Only create one when the stats are asked : the code instrumented check if
+  it has a Stats instance before measuring anything, so there is no cost
+  when disabled.
+
+  Attributes:
+    order(table): list of step names in the order they were first recorded
+    steps(table):
+      {step name: {key: DataAttribute}}, keys are "time" (seconds),
+      "memory" (difference of Lua memory in KB, approximate as the garbage
+      collector can run during the step) and the ones given to <set()>.
+  ]]
+
+  local attrs = {
+    ["order"] = {},
+    ["steps"] = {}
+  }
+
+  function attrs:_get_step(name)
+    --[[
+    Args:
+      name(str): step name
+    Returns:
+      table: {key: DataAttribute}
+    ]]
+    local step = self.steps[name]
+    if not step then
+      step = {}
+      self.steps[name] = step
+      self.order[#self.order + 1] = name
+    end
+    return step
+  end
+
+  function attrs:measure(name, func, ...)
+    --[[
+    Call <func> with the given arguments and record its time and memory
+    under <name>.
+
+    Args:
+      name(str): step name
+      func(function):
+      ...: arguments for <func>
+    Returns:
+      the values returned by <func>
+    ]]
+    local memory = collectgarbage("count")
+    local stime = os.clock()
+
+    local out = { func(...) }
+
+    stime = os.clock() - stime
+    memory = collectgarbage("count") - memory
+
+    local step = self:_get_step(name)
+    step.time = DoubleAttribute(stime)
+    step.memory = DoubleAttribute(memory)
+
+    logger:debug("[Stats][measure] <", name, "> took ", stime, "s.")
+
+    return unpack(out)
+  end
+
+  function attrs:set(name, key, value)
+    --[[
+    Args:
+      name(str): step name
+      key(str): name of the value
+      value(DataAttribute):
+    ]]
+    self:_get_step(name)[key] = value
+  end
+
+  function attrs:to_attribute()
+    --[[
+    Returns:
+      GroupAttribute: one group per step with its values, in recording order.
+    ]]
+    local gb = GroupBuilder()
+    local step
+    for _, name in ipairs(self.order) do
+      step = self.steps[name]
+      -- always write time and memory first
+      for _, key in ipairs({ "time", "memory" }) do
+        if step[key] then
+          gb:set(name .. "." .. key, step[key])
+        end
+      end
+      for key, value in pairs(step) do
+        if key ~= "time" and key ~= "memory" then
+          gb:set(name .. "." .. key, value)
+        end
+      end
+    end
+    return gb:build()
+  end
+
+  function attrs:write()
+    --[[
+    Set the stats on the current location.
+    ]]
+    Interface.SetAttr(STATS_ATTR, self:to_attribute())
+  end
+
+  return attrs
+
+end
+
+_M_.Stats = Stats
+
+return _M_
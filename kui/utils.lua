@@ -1,5 +1,5 @@
 --[[
-version=6
+version=13
 
 [LICENSE]
 
@@ -34,6 +34,11 @@ local select = select
 local tableconcat = table.concat
 local mathpi = math.pi
 local mathabs = math.abs
+local mathfloor = math.floor
+local mathfrexp = math.frexp
+local mathldexp = math.ldexp
+local mathhuge = math.huge
+local tablesort = table.sort
 local type = type
 
 function _M_.conkat(...)
@@ -105,21 +110,71 @@ local function _get_attribute_class(kattribute)
   end
 end
 
-local function _get_attr_data(location, attr_path, static)
+local function _get_nearest_sample_truncated(lattr, sample, length)
   --[[
-  Get the given attribute on the location.
-  Return it as a lua table describing the DataAttribute structure it had.
+  Return the values at the given sample but only the <length> first ones.
+  The full decoded sample is discarded right away so only <length> values are
+  kept in memory.
+  ]]
+  local full = lattr:getNearestSample(sample)
+  local out = {}
+  for i = 1, length do
+    out[i] = full[i]
+  end
+  return out
+end
+
+local function _get_attr_values(lattr, static, length)
+  --[[
+  Decode the values of the given attribute for all its time samples.
+
+  Args:
+    lattr(DataAttribute):
+    static(bool or nil): if true only query time sample 0 (no motion blur)
+    length(number or nil): if specified only keep this number of values
+      per time sample.
+  Returns:
+    table: table of values with time samples
+  ]]
+
+  local values = {}
+
+  if static then
+    if length then
+      values[0.0] = _get_nearest_sample_truncated(lattr, 0, length)
+    else
+      values[0.0] = lattr:getNearestSample(0)
+    end
+  else
+    for smplindex = 0, lattr:getNumberOfTimeSamples() - 1 do
+      smplindex = lattr:getSampleTime(smplindex)
+      if length then
+        values[smplindex] = _get_nearest_sample_truncated(lattr, smplindex, length)
+      else
+        values[smplindex] = lattr:getNearestSample(smplindex)
+      end
+    end
+  end
+
+  return values
+
+end
+
+local function _get_attr_info(location, attr_path)
+  --[[
+  Get the given attribute on the location and describe it without decoding
+  its values.
 
   Args:
     location(str): scene graph location to extract teh attribute from
     attr_path(str): path of the attribute on the location
-    static(bool or nil): if false the attribute is multi-sampled
   Returns:
     table or nil:
+      table[attr] = DataAttribute instance
       table[class] = DataAttribute class not instanced
       table[tuple] = num, tuple size of the orignal DataAttribute
-      table[values] = table of values with time samples
-      table[length] = number of values in each values' key time-sample
+      table[length] = number of values in each time-sample
+      table[samples] = ascending list of the time samples
   ]]
 
   local lattr = Interface.GetAttr(attr_path, location)
@@ -127,22 +182,60 @@ local function _get_attr_data(location, attr_path, static)
     return nil
   end
 
+  local samples = {}
+  for smplindex = 0, lattr:getNumberOfTimeSamples() - 1 do
+    samples[smplindex + 1] = lattr:getSampleTime(smplindex)
+  end
+  table.sort(samples)
+
   local out = {}
-  local values = {}
+  out["attr"] = lattr
   out["class"] = _get_attribute_class(lattr)
   out["tuple"] = lattr:getTupleSize()
   out["length"] = lattr:getNumberOfValues()
+  out["samples"] = samples
+  return out
 
-  if static then
-    values[0.0] = lattr:getNearestSample(0)
-  else
-    for smplindex = 0, lattr:getNumberOfTimeSamples() - 1 do
-      smplindex = lattr:getSampleTime(smplindex)
-      values[smplindex] = lattr:getNearestSample(smplindex)
+end
+
+local function _get_attr_data(location, attr_path, static, pcount, tuple_size)
+  --[[
+  Get the given attribute on the location.
+  Return it as a lua table describing the DataAttribute structure it had.
+
+  Args:
+    location(str): scene graph location to extract teh attribute from
+    attr_path(str): path of the attribute on the location
+    static(bool or nil): if false the attribute is multi-sampled
+    pcount(number or nil): if specified, only read the values for this
+      number of tuples.
+    tuple_size(number or nil): tuple size used with <pcount>, default to the
+      one of the attribute.
+  Returns:
+    table or nil:
+      table[class] = DataAttribute class not instanced
+      table[tuple] = num, tuple size of the orignal DataAttribute
+      table[values] = table of values with time samples
+      table[length] = number of values in each values' key time-sample
+  ]]
+
+  local out = _get_attr_info(location, attr_path)
+  if not out then
+    return nil
+  end
+
+  local length
+  if pcount then
+    length = pcount * (tuple_size or out["tuple"])
+    if length < out["length"] then
+      out["length"] = length
+    else
+      length = nil
     end
   end
 
-  out["values"] = values
+  out["values"] = _get_attr_values(out["attr"], static, length)
+  out["attr"] = nil
 
   return out
 
@@ -152,7 +245,7 @@ end
 -- PUBLIC -----------------
 
 
-function _M_.get_attr_data(location, attr_path, default, static)
+function _M_.get_attr_data(location, attr_path, default, static, pcount, tuple_size)
   --[[
   Get the given attribute on the location.
   Return it as a lua table describing the DataAttribute structure it had.
@@ -165,6 +258,10 @@ function _M_.get_attr_data(location, attr_path, default, static)
     default(any or error): value to return if attr_path not found
       you can use the <error> builtin to raise an error instead
     static(bool or nil): if true only query time sample 0 (no motion blur)
+    pcount(number or nil): if specified, only the values of the <pcount>
+      first tuples are kept.
+    tuple_size(number or nil): tuple size to use with <pcount> if different
+      from the attribute's one.
   Returns:
     table or nil:
       table[class] = DataAttribute class not instanced
@@ -173,7 +270,7 @@ function _M_.get_attr_data(location, attr_path, default, static)
       table[length] = number of values in each values' key time-sample
   ]]
 
-  local out = _get_attr_data(location, attr_path, static)
+  local out = _get_attr_data(location, attr_path, static, pcount, tuple_size)
 
   if not out then
 
@@ -195,6 +292,65 @@ function _M_.get_attr_data(location, attr_path, default, static)
 
 end
 
+function _M_.get_attr_info(location, attr_path, default)
+  --[[
+  Get the given attribute on the location and describe it without decoding
+  its values. Use <get_attr_values()> to decode them later.
+
+  Only the attribute metadata is queried so it's cheap whatever the
+  attribute size : use it to count or validate before decoding anything.
+
+  Args:
+    location(str): scene graph location to extract teh attribute from
+    attr_path(str): path of the attribute on the location
+    default(any or error): value to return if attr_path not found
+      you can use the <error> builtin to raise an error instead
+  Returns:
+    table or nil:
+      table[attr] = DataAttribute instance
+      table[class] = DataAttribute class not instanced
+      table[tuple] = num, tuple size of the orignal DataAttribute
+      table[length] = number of values in each time-sample
+      table[samples] = ascending list of the time samples
+  ]]
+
+  local out = _get_attr_info(location, attr_path)
+
+  if not out then
+
+    if default == error then
+      _M_.logerror(
+          "[utils][get_attr_info] location <",
+          location,
+          "> doesn't have the attr_path <",
+          attr_path,
+          ">."
+      )
+    else
+      return default
+    end
+
+  end
+
+  return out
+
+end
+
+function _M_.get_attr_values(kattribute, static, length)
+  --[[
+  Decode the values of the given attribute.
+
+  Args:
+    kattribute(DataAttribute):
+    static(bool or nil): if true only query time sample 0 (no motion blur)
+    length(number or nil): if specified only keep this number of values
+      per time sample.
+  Returns:
+    table: table of values with time samples
+  ]]
+  return _get_attr_values(kattribute, static, length)
+end
+
 function _M_.get_attr_value(location, attr_path, default)
   --[[
   Get the given attribute value on the location.
@@ -281,6 +437,49 @@ function _M_.radian_to_degree(radian)
   return radian * (180.0 / mathpi)
 end
 
+function _M_.to_float32(value)
+  --[[
+  Round a number to the nearest single precision float, like when it is
+  stored in a FloatAttribute. Subnormal numbers and overflows are not handled.
+
+  Args:
+    value(num):
+  Returns:
+    num:
+  ]]
+  if value == 0 or value ~= value or value == mathhuge or value == -mathhuge then
+    return value
+  end
+  -- mantissa in [0.5, 1[ so 24 significant bits are 2^24 steps
+  local mantissa, exponent = mathfrexp(value)
+  mantissa = mathfloor(mantissa * 16777216 + 0.5) / 16777216
+  return mathldexp(mantissa, exponent)
+end
+
+function _M_.get_float32_error(samples)
+  --[[
+  /!\ perfs
+
+  Args:
+    samples(table): unordered table of time samples with their table of values
+  Returns:
+    num: biggest absolute difference between a value and its single
+      precision version.
+  ]]
+  local to_float32 = _M_.to_float32
+  local out = 0
+  local diff
+  for _, values in pairs(samples) do
+    for i = 1, #values do
+      diff = mathabs(values[i] - to_float32(values[i]))
+      if diff > out then
+        out = diff
+      end
+    end
+  end
+  return out
+end
+
 function _M_.get_katana_version()
   --[[
   Returns:
@@ -295,6 +494,29 @@ function _M_.get_katana_version()
 
 end
 
+function _M_.get_world_matrix(location)
+  --[[
+  Args:
+    location(str): scene graph location
+  Returns:
+    table or nil:
+      4x4 matrix as a flat table of 16 values at time sample 0, nil if the
+      location has an identity transform.
+  ]]
+  local xform = Interface.GetGlobalXFormGroup(location)
+  local matrix = XFormUtils.CalcTransformMatrixAtTime(xform, 0.0)
+  matrix = matrix:getNearestSample(0.0)
+
+  for i = 1, 16 do
+    -- identity have 1 at 1, 6, 11, 16
+    if matrix[i] ~= ((i % 5 == 1) and 1 or 0) then
+      return matrix
+    end
+  end
+
+  return nil
+end
+
 function _M_.get_nearest_from_samples(samples, nearest)
   --[[
   Source: https://stackoverflow.com/a/5464961/13806195
@@ -322,13 +544,58 @@ function _M_.get_nearest_from_samples(samples, nearest)
 
 end
 
+function _M_.get_nearest_from_sorted(samples_list, nearest)
+  --[[
+  Binary-search version of <get_nearest_from_samples>.
+  If <nearest> is exactly between 2 samples, the smallest one is returned.
+
+  Args:
+    samples_list(table): ascending list of time samples like {-0.25, 0.0, 0.25}
+      as returned by <get_samples_list_from>.
+    nearest(number): time samples as float to return the closest sample from
+
+  Returns:
+    number or nil: sample in <samples_list> closest to given <nearest>
+  ]]
+
+  local lo = 1
+  local hi = #samples_list
+
+  if hi == 0 then
+    return nil
+  end
+  if nearest <= samples_list[1] then
+    return samples_list[1]
+  end
+  if nearest >= samples_list[hi] then
+    return samples_list[hi]
+  end
+
+  -- find the 2 samples surrounding <nearest> : list[lo] < nearest <= list[hi]
+  local mid
+  while hi - lo > 1 do
+    mid = mathfloor((lo + hi) / 2)
+    if samples_list[mid] < nearest then
+      lo = mid
+    else
+      hi = mid
+    end
+  end
+
+  if (samples_list[hi] - nearest) < (nearest - samples_list[lo]) then
+    return samples_list[hi]
+  end
+  return samples_list[lo]
+
+end
+
 function _M_.get_samples_list_from(...)
   --[[
   Args:
     ...(table(s) or nil): multiple tables of time samples
 
   Returns:
-    table: ordered table of unordered time samples like {0.0, -0.25, 0.25}
+    table: ascending list of unique time samples like {-0.25, 0.0, 0.25}
   ]]
 
   local samples_list = {}  -- unordered table to avoid duplicate in <out>
@@ -352,10 +619,57 @@ function _M_.get_samples_list_from(...)
 
   end
 
+  tablesort(out)
   return out
 
 end
 
+function _M_.collapse_samples(values)
+  --[[
+  Reduce time samples that all hold the same values to a single 0.0 sample.
+
+  The comparison stops at the first value that differs so an attribute that
+  is really animated cost almost nothing to check.
+
+  Args:
+    values(table): unordered table of time samples with their table of values
+  Returns:
+    table, bool:
+      <values> unchanged and false if the samples differ, else a new table
+      with only the 0.0 sample and true.
+  ]]
+
+  local first
+  local length
+  local count = 0
+
+  for _, sample in pairs(values) do
+
+    count = count + 1
+    if not first then
+      first = sample
+      length = #sample
+    elseif sample ~= first then
+      if #sample ~= length then
+        return values, false
+      end
+      for i = 1, length do
+        if sample[i] ~= first[i] then
+          return values, false
+        end
+      end
+    end
+
+  end
+
+  if count < 2 then
+    return values, false
+  end
+
+  return { [0.0] = first }, true
+
+end
+
 function _M_.path_rel_to_abs(rel_path, source_path)
   --[[
   Args:
@@ -1,2 +1,32 @@
+import logging
+
+from Katana import NodegraphAPI
+
 from .kuiinstancer import KuiInstancerNode
 from .kuisetup import KuiSetupNode
+
+logger = logging.getLogger(__name__)
+
+
+def upgradeAllNodes():
+    """
+    Upgrade all the KUI nodes of the scene created with a previous version.
+
+    The scene is only walked once and each node finds its internal nodes from
+    its own children, so the cost grows linearly with the scene size.
+
+    Returns:
+        int: number of nodes upgraded
+    """
+    count = 0
+    for node in NodegraphAPI.GetAllNodes():
+        if not isinstance(node, (KuiInstancerNode, KuiSetupNode)):
+            continue
+        version = ".".join(str(number) for number in node.version)
+        if str(node.about.version) == version:
+            continue
+        node.upgrade()
+        count += 1
+
+    logger.info("[upgradeAllNodes] Upgraded {} nodes.".format(count))
+    return count
@@ -1,5 +1,5 @@
 --[[
-version=3
+version=4
 
 [LICENSE]
 
@@ -16,12 +16,7 @@ distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
-]]
-local array = require("kui.array")
-local utils = require("kui.utils")
-local logging = require("lllogger")
-
-local log_level = utils.get_user_attr("log_level", {"INFO"})[1]
-logging.getLogger("kui.array"):setLevel(logging.LEVELS[log_level])
 
-array.run()
+The script body is shared by all the nodes in kui/opscript.lua.
+]]
+require("kui.opscript").array()
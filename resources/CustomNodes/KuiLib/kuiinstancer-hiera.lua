@@ -1,5 +1,5 @@
 --[[
-version=3
+version=5
 
 [LICENSE]
 
@@ -16,19 +16,7 @@ distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
-]]
-local hier = require("kui.hierarchical")
--- don't print/log anything here, repeated times number of points.
-local utils = require("kui.utils")
-local logging = require("lllogger")
-
 
-if Interface.AtRoot() then
-  local log_level = utils.get_user_attr("log_level", {"INFO"})[1]
-  logging.getLogger("kui.hierarchical"):setLevel(logging.LEVELS[log_level])
-  hier.atroot()
-
-else
-  -- don't print/log anything here too, repeated times number of points.
-  hier.run_not_root()
-end
\ No newline at end of file
+The script body is shared by all the nodes in kui/opscript.lua.
+]]
+require("kui.opscript").hierarchical()
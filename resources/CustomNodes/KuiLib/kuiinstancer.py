@@ -1,27 +1,20 @@
-import os.path
-
 from Katana import DrawingModule, NodegraphAPI
 
 from katananodling.entities import BaseCustomNode
 
+from .nodeutils import getInternalNode
+from .nodeutils import getResource
 
-OPSCRIPT_ARRAY_CONTENT = os.path.join(
-    os.path.dirname(__file__), "kuiinstancer-array.lua"
-)
-with open(OPSCRIPT_ARRAY_CONTENT) as file:
-    OPSCRIPT_ARRAY_CONTENT = str(file.read())
 
-OPSCRIPT_HIERA_CONTENT = os.path.join(
-    os.path.dirname(__file__), "kuiinstancer-hiera.lua"
-)
-with open(OPSCRIPT_HIERA_CONTENT) as file:
-    OPSCRIPT_HIERA_CONTENT = str(file.read())
+# the OpScripts only call the shared body in kui/opscript.lua
+OPSCRIPT_ARRAY_FILE = "kuiinstancer-array.lua"
+OPSCRIPT_HIERA_FILE = "kuiinstancer-hiera.lua"
 
 
 class KuiInstancerNode(BaseCustomNode):
 
     name = "KuiInstancer"
-    version = (0, 2, 0)
+    version = (0, 8, 0)
     color = BaseCustomNode.Colors.yellow
     description = 'Part of KUI. This node hold the "instancing" part OpScript that requires the pointcloud source to be configured in a defined way.'
     author = "<Liam Collod monsieurlixm@gmail.com>"
@@ -62,6 +55,12 @@ class KuiInstancerNode(BaseCustomNode):
         hint = {"widget": "mapper", "options": {"array": 1.0, "hierarchical": 0.0}}
         p.setHintString(repr(hint))
 
+        self.buildBucketsInterface(userparam)
+        self.buildPartitionsInterface(userparam)
+        self.buildCacheInterface(userparam)
+        self.buildStatsInterface(userparam)
+        self.buildCompactInterface(userparam)
+
         p = userparam.createChildString("log_level", "INFO")
         hint = {
             "widget": "popup",
@@ -84,6 +83,200 @@ class KuiInstancerNode(BaseCustomNode):
 
         return
 
+    @staticmethod
+    def buildBucketsInterface(userparam):
+        """
+        Args:
+            userparam(NodegraphAPI.Parameter): group parameter to create the
+                bucket parameters in.
+        """
+        g = userparam.createChildGroup("buckets")
+        hint = {
+            "conditionalVisOps": {
+                "conditionalVisOp": "equalTo",
+                "conditionalVisPath": "../method",
+                "conditionalVisValue": 0,
+            },
+        }
+        g.setHintString(repr(hint))
+
+        p = g.createChildString("mode", "none")
+        hint = {
+            "widget": "popup",
+            "options": ["none", "count", "grid"],
+            "help": (
+                "<p>Group the hierarchical instances in intermediate locations "
+                "instead of creating all of them under <code>instance_location</code>."
+                "</p><ul>"
+                "<li><code>count</code>: consecutive points are grouped by "
+                "<code>size</code> (<code>bucket_0001</code>, ...)</li>"
+                "<li><code>grid</code>: points are grouped in cubic cells of "
+                "<code>size</code> scene units (<code>cell_0_n2_1</code>, ...)</li>"
+                "</ul><p>Instances are only created when their bucket location "
+                "is expanded.</p>"
+            ),
+        }
+        p.setHintString(repr(hint))
+
+        p = g.createChildNumber("size", 1000)
+        hint = {
+            "help": "Number of points per bucket, or size of a grid cell in scene units.",
+            "conditionalVisOps": {
+                "conditionalVisOp": "notEqualTo",
+                "conditionalVisPath": "../mode",
+                "conditionalVisValue": "none",
+            },
+        }
+        p.setHintString(repr(hint))
+        return
+
+    @staticmethod
+    def buildBucketsOpArgs(puser):
+        """
+        Args:
+            puser(NodegraphAPI.Parameter): user group parameter of the hierarchical
+                OpScript node.
+        """
+        p = puser.createChildString("bucket_mode", "")
+        p.setExpression("=^/user.buckets.mode")
+        p = puser.createChildNumber("bucket_size", 0)
+        p.setExpression("=^/user.buckets.size")
+        return
+
+    @staticmethod
+    def buildPartitionsInterface(userparam):
+        """
+        Args:
+            userparam(NodegraphAPI.Parameter): group parameter to create the
+                partitions parameter in.
+        """
+        p = userparam.createChildNumber("partitions", 1)
+        hint = {
+            "int": True,
+            "min": 0,
+            "help": (
+                "<p>Split the points in this number of ranges, each created "
+                "under its own location (<code>partition_0</code>, ...) so Katana "
+                "can cook them concurrently.</p>"
+                "<p><code>1</code> disables it and <code>0</code> picks the number "
+                "from the point count (one partition per 10000 points, 64 "
+                "maximum).</p>"
+            ),
+            "conditionalVisOps": {
+                "conditionalVisOp": "equalTo",
+                "conditionalVisPath": "../method",
+                "conditionalVisValue": 0,
+            },
+        }
+        p.setHintString(repr(hint))
+        return
+
+    @staticmethod
+    def buildPartitionsOpArgs(puser):
+        """
+        Args:
+            puser(NodegraphAPI.Parameter): user group parameter of the hierarchical
+                OpScript node.
+        """
+        p = puser.createChildNumber("partitions", 1)
+        p.setExpression("=^/user.partitions")
+        return
+
+    @staticmethod
+    def buildCacheInterface(userparam):
+        """
+        Args:
+            userparam(NodegraphAPI.Parameter): group parameter to create the
+                cache parameter in.
+        """
+        p = userparam.createChildNumber("cache_size", 512)
+        hint = {
+            "help": (
+                "<p>Maximum memory in MB used to keep the processed point-clouds "
+                "between cooks. An unchanged point-cloud is then not processed "
+                "again when scrubbing the timeline or re-cooking.</p>"
+                "<p><code>0</code> disables the cache.</p>"
+            ),
+            "min": 0,
+        }
+        p.setHintString(repr(hint))
+        return
+
+    @staticmethod
+    def buildCacheOpArgs(puser):
+        """
+        Args:
+            puser(NodegraphAPI.Parameter): user group parameter of an OpScript node.
+        """
+        p = puser.createChildNumber("cache_size", 0)
+        p.setExpression("=^/user.cache_size")
+        return
+
+    @staticmethod
+    def buildStatsInterface(userparam):
+        """
+        Args:
+            userparam(NodegraphAPI.Parameter): group parameter to create the
+                stats parameter in.
+        """
+        p = userparam.createChildNumber("stats", 0)
+        hint = {
+            "widget": "checkBox",
+            "help": (
+                "<p>Write the time and memory used by each processing step as "
+                "a <code>kui.stats</code> attribute on the instancing location."
+                "</p>"
+            ),
+        }
+        p.setHintString(repr(hint))
+        return
+
+    @staticmethod
+    def buildStatsOpArgs(puser):
+        """
+        Args:
+            puser(NodegraphAPI.Parameter): user group parameter of an OpScript node.
+        """
+        p = puser.createChildNumber("stats", 0)
+        p.setExpression("=^/user.stats")
+        return
+
+    @staticmethod
+    def buildCompactInterface(userparam):
+        """
+        Args:
+            userparam(NodegraphAPI.Parameter): group parameter to create the
+                compact parameter in.
+        """
+        p = userparam.createChildNumber("compact", 0)
+        hint = {
+            "widget": "checkBox",
+            "help": (
+                "<p>Remove the hidden points (<code>$skip</code>/<code>$hide</code>) "
+                "from all the attributes of the instance array instead of "
+                "listing them in <code>geometry.instanceSkipIndex</code>.</p>"
+                "<p>The renderer then only receives the visible points.</p>"
+            ),
+            "conditionalVisOps": {
+                "conditionalVisOp": "equalTo",
+                "conditionalVisPath": "../method",
+                "conditionalVisValue": 1,
+            },
+        }
+        p.setHintString(repr(hint))
+        return
+
+    @staticmethod
+    def buildCompactOpArgs(puser):
+        """
+        Args:
+            puser(NodegraphAPI.Parameter): user group parameter of the array
+                OpScript node.
+        """
+        p = puser.createChildNumber("compact", 0)
+        p.setExpression("=^/user.compact")
+        return
+
     def buildInternal(self):
 
         node_dot_top = NodegraphAPI.CreateNode("Dot", self)
@@ -94,7 +287,9 @@ class KuiInstancerNode(BaseCustomNode):
         node_ops_hiera.getParameter("location").setExpression(
             "=^/user.instance_location"
         )
-        node_ops_hiera.getParameter("script.lua").setValue(OPSCRIPT_HIERA_CONTENT, 0)
+        node_ops_hiera.getParameter("script.lua").setValue(
+            getResource(OPSCRIPT_HIERA_FILE), 0
+        )
         node_ops_hiera.getParameter("applyWhere").setValue("at specific location", 0)
 
         puser = node_ops_hiera.getParameters().createChildGroup(
@@ -106,11 +301,17 @@ class KuiInstancerNode(BaseCustomNode):
         p.setExpression("=^/user.instance_name")
         p = puser.createChildString("log_level", "")
         p.setExpression("=^/user.log_level")
+        self.buildBucketsOpArgs(puser)
+        self.buildPartitionsOpArgs(puser)
+        self.buildCacheOpArgs(puser)
+        self.buildStatsOpArgs(puser)
 
         node_ops_array = NodegraphAPI.CreateNode("OpScript", self)
         node_ops_array.setName("OpScript_array_kui0001")
         node_ops_array.getParameter("location").setExpression("=^/user.Data.array_name")
-        node_ops_array.getParameter("script.lua").setValue(OPSCRIPT_ARRAY_CONTENT, 0)
+        node_ops_array.getParameter("script.lua").setValue(
+            getResource(OPSCRIPT_ARRAY_FILE), 0
+        )
         node_ops_array.getParameter("applyWhere").setValue("at specific location", 0)
 
         puser = node_ops_array.getParameters().createChildGroup(
@@ -120,6 +321,9 @@ class KuiInstancerNode(BaseCustomNode):
         p.setExpression("=^/user.pointcloud")
         p = puser.createChildString("log_level", "")
         p.setExpression("=^/user.log_level")
+        self.buildCacheOpArgs(puser)
+        self.buildStatsOpArgs(puser)
+        self.buildCompactOpArgs(puser)
 
         node_switch = NodegraphAPI.CreateNode("Switch", self)
         node_switch.setName("SwitchMethod_kui0001")
@@ -154,29 +358,69 @@ class KuiInstancerNode(BaseCustomNode):
         return
 
     def upgrade(self):
+        def getOpScript(identifier="hiera"):
+            """
+            Args:
+                identifier(str): "hiera" or "array"
+            """
+            return getInternalNode(self, "OpScript", identifier)
+
         def updateOpScript(identifier="hiera"):
             """
             Args:
                 identifier(str): "hiera" or "array"
             """
-            node = None
-            attrset_nodes = NodegraphAPI.GetAllNodesByType("OpScript")
-            for attrset_node in attrset_nodes:
-                if attrset_node.getParent() != self:
-                    continue
-                if identifier in attrset_node.getName():
-                    node = attrset_node
-            assert node, 'Can\'t find OpScript node "{}" in {}'.format(identifier, self)
+            node = getOpScript(identifier)
             g = node.getParameter("script.lua")
             if identifier == "hiera":
-                g.setValue(OPSCRIPT_HIERA_CONTENT, 0)
+                g.setValue(getResource(OPSCRIPT_HIERA_FILE), 0)
             else:
-                g.setValue(OPSCRIPT_ARRAY_CONTENT, 0)
+                g.setValue(getResource(OPSCRIPT_ARRAY_FILE), 0)
             return
 
-        if str(self.about.version) == "0.1.0":
+        version = str(self.about.version)
+
+        if version == "0.1.0":
+            updateOpScript("hiera")
 
+        if version in ["0.1.0", "0.2.0"]:
+            self.buildBucketsInterface(self.user_param)
+            node = getOpScript("hiera")
+            self.buildBucketsOpArgs(node.getParameter("user"))
+
+        if version in ["0.1.0", "0.2.0", "0.3.0"]:
+            self.buildCacheInterface(self.user_param)
+            for identifier in ["hiera", "array"]:
+                node = getOpScript(identifier)
+                self.buildCacheOpArgs(node.getParameter("user"))
+
+        if version in ["0.1.0", "0.2.0", "0.3.0", "0.4.0"]:
+            self.buildStatsInterface(self.user_param)
+            for identifier in ["hiera", "array"]:
+                node = getOpScript(identifier)
+                self.buildStatsOpArgs(node.getParameter("user"))
+
+        if version in ["0.1.0", "0.2.0", "0.3.0", "0.4.0", "0.5.0"]:
+            self.buildCompactInterface(self.user_param)
+            node = getOpScript("array")
+            self.buildCompactOpArgs(node.getParameter("user"))
+
+        if version in ["0.1.0", "0.2.0", "0.3.0", "0.4.0", "0.5.0", "0.6.0"]:
+            self.buildPartitionsInterface(self.user_param)
+            node = getOpScript("hiera")
+            self.buildPartitionsOpArgs(node.getParameter("user"))
+
+        if version in [
+            "0.1.0",
+            "0.2.0",
+            "0.3.0",
+            "0.4.0",
+            "0.5.0",
+            "0.6.0",
+            "0.7.0",
+        ]:
             updateOpScript("hiera")
+            updateOpScript("array")
             self.about.__update__()
 
         return
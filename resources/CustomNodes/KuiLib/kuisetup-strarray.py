@@ -1,9 +1,15 @@
 """
-version=7
+version=9
 Python 2+
 
 This snippet is used on KUI Setup node ScriptButtons parameters.
 The script is modulated based on the name of the parameter.
+
+The buttons only store a call to KuiSetupNode.runScriptButton() which
+executes this file with the <node> and <parameter> globals.
+
+The import buttons use the KuiSetupNode API (importRows) so all the rows are
+set in one go and the interface is only refreshed once.
 """
 import logging
 
@@ -126,6 +132,14 @@ def run():
     elif op == "remove_row":
         param_array.resizeArray(array_size - tuple_size)
 
+    elif op in ["append_rows", "replace_rows"]:
+        path = node.getParameter("user.{}.import_file".format(context)).getValue(0)
+        if not path:
+            raise ValueError("No file to import rows from for {}.".format(context))
+        # node is the KuiSetupNode instance
+        count = node.importRows(context, path, append=op == "append_rows")
+        logger.info("[run] Imported {} rows from {}".format(count, path))
+
     # this is executed no matter what button the user clicked
     updateNodeInterface(node)
 
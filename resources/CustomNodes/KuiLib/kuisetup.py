@@ -1,17 +1,21 @@
-import os
+import ast
+import csv
+import json
 
 from Katana import NodegraphAPI
 
 from katananodling.entities import BaseCustomNode
 
+from .nodeutils import getInternalNode
+from .nodeutils import getResource
+from .nodeutils import getResourceCode
 
-SCRIPTBUTTON_CONTENT = os.path.join(os.path.dirname(__file__), "kuisetup-strarray.py")
-with open(SCRIPTBUTTON_CONTENT) as file:
-    SCRIPTBUTTON_CONTENT = str(file.read())
 
-OPSCRIPT_PWIDTH_CONTENT = os.path.join(os.path.dirname(__file__), "kuisetup-pwidth.lua")
-with open(OPSCRIPT_PWIDTH_CONTENT) as file:
-    OPSCRIPT_PWIDTH_CONTENT = str(file.read())
+SCRIPTBUTTON_FILE = "kuisetup-strarray.py"
+# the ScriptButtons only call the node, the script is run from the file
+SCRIPTBUTTON_CONTENT = "node.runScriptButton(parameter)\n"
+
+OPSCRIPT_PWIDTH_FILE = "kuisetup-pwidth.lua"
 
 
 def buildAttributeGroupParamContent(
@@ -44,6 +48,8 @@ def buildAttributeGroupParamContent(
     }
     _p.setHintString(repr(_hints))
 
+    buildImportRowsParamContent(param, category_name)
+
     _p = param.createChildString("array", "")
     _hints = {"widget": "teleparam", "help": tooltip or ""}
     _p.setExpression(
@@ -54,10 +60,79 @@ def buildAttributeGroupParamContent(
     return
 
 
+def buildImportRowsParamContent(param, category_name):
+    """
+    For group parameters named with the "#" prefix, parameters to import
+    multiple rows at once from a file.
+
+    .. warning:: Need to update ./kuisetup-strarray.py if modified
+
+    Args:
+        category_name(str): one of [arbitrary, common, sources]
+        param(NodegraphAPI.Parameter):
+    """
+    _p = param.createChildString("import_file", "")
+    _hints = {
+        "widget": "fileInput",
+        "help": (
+            "<p>.csv or .json file with the rows to import. One row per line "
+            "for csv, a list of rows (lists of strings) for json.</p>"
+        ),
+    }
+    _p.setHintString(repr(_hints))
+
+    _p = param.createChildString("append_rows_{}".format(category_name), "")
+    _hints = {
+        "widget": "scriptButton",
+        "buttonText": "Import Rows (Append)",
+        "scriptText": SCRIPTBUTTON_CONTENT,
+    }
+    _p.setHintString(repr(_hints))
+
+    _p = param.createChildString("replace_rows_{}".format(category_name), "")
+    _hints = {
+        "widget": "scriptButton",
+        "buttonText": "Import Rows (Replace)",
+        "scriptText": SCRIPTBUTTON_CONTENT,
+    }
+    _p.setHintString(repr(_hints))
+
+    return
+
+
+def readRows(path):
+    """
+    Args:
+        path(str): path to a .csv or .json file
+
+    Returns:
+        list[list[str]]: rows found in the file
+    """
+    with open(path) as file:
+        content = file.read()
+
+    if path.lower().endswith(".json"):
+        rows = json.loads(content)
+        if not isinstance(rows, list) or not all(
+            isinstance(row, list) for row in rows
+        ):
+            raise ValueError(
+                "[readRows] {} must contain a list of rows (lists).".format(path)
+            )
+    elif path.lower().endswith(".csv"):
+        rows = [row for row in csv.reader(content.splitlines()) if row]
+    else:
+        raise ValueError(
+            "[readRows] Unsupported file <{}>, expected .csv or .json".format(path)
+        )
+
+    return rows
+
+
 class KuiSetupNode(BaseCustomNode):
 
     name = "KuiSetup"
-    version = (0, 2, 0)
+    version = (0, 5, 0)
     color = None
     description = "Part of KUI setup. Configure attributes on the source (point-cloud) for the Instancer to pick-up."
     author = "<Liam Collod monsieurlixm@gmail.com>"
@@ -70,7 +145,7 @@ class KuiSetupNode(BaseCustomNode):
         node = NodegraphAPI.CreateNode("OpScript", self)
         node.setName("OpScript_kuis0001")
         node.getParameter("location").setExpression("=^/user.pointcloud")
-        node.getParameter("script.lua").setValue(OPSCRIPT_PWIDTH_CONTENT, 0)
+        node.getParameter("script.lua").setValue(getResource(OPSCRIPT_PWIDTH_FILE), 0)
         node.getParameter("applyWhere").setValue("at specific location", 0)
         g = node.getParameters().createChildGroup("user")
         p = g.createChildNumber("point_size", 1)
@@ -233,6 +308,160 @@ class KuiSetupNode(BaseCustomNode):
         g.resizeArray(1)
         self.wireInsertNodes([node], node_spacing)
 
+        self.buildPrecisionInternal(node_spacing)
+
+    def buildPrecisionInternal(self, node_spacing):
+        """
+        Create the AttributeSet nodes for the single precision settings.
+
+        Args:
+            node_spacing(int):
+        """
+        for name, setting in [
+            ("precision", "single_precision"),
+            ("precision_report", "precision_report"),
+        ]:
+            node = NodegraphAPI.CreateNode("AttributeSet", self)
+            node.setName("AttributeSet_settings_{}_kuis0001".format(name))
+            node.getParameter("multisample").setValue("No", 0)
+            node.getParameter("mode").setValue("paths", 0)
+            g = node.getParameter("paths")
+            g.insertArrayElement(0).setExpression("=^/user.pointcloud")
+            g.resizeArray(1)
+            node.getParameter("attributeName").setValue(
+                "instancing.settings.{}".format(setting), 0
+            )
+            node.getParameter("attributeType").setValue("integer", 0)
+            g = node.getParameter("numberValue")
+            g.insertArrayElement(0).setExpression(
+                "=^/user.settings.{}".format(setting)
+            )
+            g.resizeArray(1)
+            self.wireInsertNodes([node], node_spacing)
+        return
+
+    @staticmethod
+    def buildPrecisionInterface(settings_param):
+        """
+        Args:
+            settings_param(NodegraphAPI.Parameter): user.settings group parameter
+        """
+        p = settings_param.createChildNumber("single_precision", 0)
+        hints = {
+            "widget": "boolean",
+            "label": "Single Precision",
+            "help": "Array method only. Write the matrix, translation, rotation and scale of the instance array as floats instead of doubles, halving their memory.",
+        }
+        p.setHintString(repr(hints))
+        p = settings_param.createChildNumber("precision_report", 0)
+        hints = {
+            "widget": "boolean",
+            "label": "Precision Report",
+            "help": "Log the biggest error made by writing the transforms as floats. Need to read all the values, only enable it to check the result.",
+            "conditionalVisOps": {
+                "conditionalVisOp": "notEqualTo",
+                "conditionalVisPath": "../single_precision",
+                "conditionalVisValue": 0,
+            },
+        }
+        p.setHintString(repr(hints))
+        return
+
+    def getRowsParam(self, category):
+        """
+        Args:
+            category(str): one of [arbitrary, common, sources]
+
+        Returns:
+            NodegraphAPI.Parameter:
+                string array parameter of the AttributeSet node holding the rows.
+        """
+        teleparam = self.getParameter("user.{}.array".format(category))
+        # "nodeName.paramName", always pointing to an AttributeSet node
+        refnode, refparam = teleparam.getValue(0).split(".", 1)
+        return NodegraphAPI.GetNode(refnode).getParameter(refparam)
+
+    def getRows(self, category):
+        """
+        Args:
+            category(str): one of [arbitrary, common, sources]
+
+        Returns:
+            list[list[str]]: current rows of the table
+        """
+        param = self.getRowsParam(category)
+        tuple_size = param.getTupleSize()
+        values = [
+            param.getChildByIndex(index).getValue(0)
+            for index in range(param.getNumChildren())
+        ]
+        return [
+            values[index : index + tuple_size]
+            for index in range(0, len(values), tuple_size)
+        ]
+
+    def setRows(self, category, rows, append=False):
+        """
+        Replace (or extend) the rows of a table in a single resize of its
+        parameter, instead of one per row with the Add/Remove buttons.
+
+        The node interface is not refreshed, the ScriptButtons do it once
+        after this.
+
+        Args:
+            category(str): one of [arbitrary, common, sources]
+            rows(list[list]):
+                rows of values, converted to str. Rows shorter than the table
+                (ex: the optional 4th arbitrary column) are completed with "".
+            append(bool): True to add the rows after the existing ones.
+        """
+        param = self.getRowsParam(category)
+        tuple_size = param.getTupleSize()
+
+        values = []
+        for row in rows:
+            if len(row) > tuple_size:
+                raise ValueError(
+                    "[setRows] Row {} has more than {} values for {}.".format(
+                        row, tuple_size, category
+                    )
+                )
+            row = [str(value) for value in row]
+            values.extend(row + [""] * (tuple_size - len(row)))
+
+        start = param.getNumChildren() if append else 0
+        param.resizeArray(start + len(values))
+        for index, value in enumerate(values):
+            param.getChildByIndex(start + index).setValue(value, 0)
+
+        return
+
+    def runScriptButton(self, parameter):
+        """
+        Run the ScriptButtons script (kuisetup-strarray.py) for the given
+        button. The file is only read and compiled on the first click.
+
+        Args:
+            parameter(NodegraphAPI.Parameter): ScriptButton parameter clicked
+        """
+        namespace = {"node": self, "parameter": parameter}
+        exec(getResourceCode(SCRIPTBUTTON_FILE), namespace)
+        return
+
+    def importRows(self, category, path, append=False):
+        """
+        Args:
+            category(str): one of [arbitrary, common, sources]
+            path(str): .csv or .json file, see readRows()
+            append(bool): True to add the rows after the existing ones.
+
+        Returns:
+            int: number of rows imported
+        """
+        rows = readRows(path)
+        self.setRows(category, rows, append=append)
+        return len(rows)
+
     def buildTopInterface(self):
 
         userparam = self.user_param
@@ -271,6 +500,7 @@ class KuiSetupNode(BaseCustomNode):
             "help": 'Faster if off, but time samples are not processed which disable motion blur. ("Faster" is vague so test a before/after)',
         }
         p.setHintString(repr(hints))
+        self.buildPrecisionInterface(g)
 
         # POINTS
         g = userparam.createChildGroup("points")
@@ -400,23 +630,36 @@ Supported tokens:
 
     def upgrade(self):
 
-        if str(self.about.version) == "0.1.0":
-
-            node = None
-            attrset_nodes = NodegraphAPI.GetAllNodesByType("AttributeSet")
-            for attrset_node in attrset_nodes:
-                if attrset_node.getParent() != self:
-                    continue
-                if "points_count" in attrset_node.getName():
-                    node = attrset_node
-            assert node, 'Can\'t find AttributeSet node "points_count" in {}'.format(
-                self
-            )
+        version = str(self.about.version)
+
+        if version == "0.1.0":
+
+            node = getInternalNode(self, "AttributeSet", "points_count")
             g = node.getParameter("numberValue")
             g.setExpression("", False)
             g.insertArrayElement(0).setExpression("=^/user.points.count_manual")
             g.resizeArray(1)
 
+        if version in ["0.1.0", "0.2.0"]:
+            self.buildPrecisionInternal(50)
+            self.buildPrecisionInterface(self.user_param.getChild("settings"))
+
+        if version in ["0.1.0", "0.2.0", "0.3.0"]:
+            for category in ["sources", "common", "arbitrary"]:
+                g = self.user_param.getChild(category)
+                buildImportRowsParamContent(g, category)
+                # keep the teleparam last
+                g.reorderChild(g.getChild("array"), g.getNumChildren() - 1)
+
+        if version in ["0.1.0", "0.2.0", "0.3.0", "0.4.0"]:
+            # the buttons stored the whole script, replace it by the call
+            for category in ["sources", "common", "arbitrary"]:
+                g = self.user_param.getChild(category)
+                for name in ["add_row", "remove_row", "append_rows", "replace_rows"]:
+                    p = g.getChild("{}_{}".format(name, category))
+                    hints = ast.literal_eval(p.getHintString())
+                    hints["scriptText"] = SCRIPTBUTTON_CONTENT
+                    p.setHintString(repr(hints))
             self.about.__update__()
 
         return
@@ -0,0 +1,70 @@
+"""
+Helpers shared by the KUI custom nodes.
+"""
+import os
+
+# {file name: content}, files are only read when first needed
+_RESOURCES = {}
+# {file name: code object}
+_CODES = {}
+
+
+def getResource(name):
+    """
+    Read a file next to this module. The file is read the first time it is
+    asked and then kept, so nothing is read as long as no node needs it.
+
+    Args:
+        name(str): file name, ex: "kuiinstancer-hiera.lua"
+
+    Returns:
+        str: file content
+    """
+    content = _RESOURCES.get(name)
+    if content is None:
+        with open(os.path.join(os.path.dirname(__file__), name)) as file:
+            content = str(file.read())
+        _RESOURCES[name] = content
+    return content
+
+
+def getResourceCode(name):
+    """
+    Args:
+        name(str): python file name next to this module
+
+    Returns:
+        code: the file compiled, once.
+    """
+    code = _CODES.get(name)
+    if code is None:
+        code = compile(
+            getResource(name), os.path.join(os.path.dirname(__file__), name), "exec"
+        )
+        _CODES[name] = code
+    return code
+
+
+def getInternalNode(parent, node_type, identifier):
+    """
+    Find a node created by the custom node build using only the children of
+    the custom node, so the cost doesn't depend on the size of the scene.
+
+    Node names are unique in the scene so Katana can add a suffix to them
+    (ex: when duplicating the custom node), only the <identifier> part of the
+    name is reliable.
+
+    Args:
+        parent(NodegraphAPI.GroupNode): custom node
+        node_type(str): ex: "OpScript", "AttributeSet"
+        identifier(str): part of the internal node name, ex: "hiera"
+
+    Returns:
+        NodegraphAPI.Node:
+    """
+    node = None
+    for child in parent.getChildren():
+        if child.getType() == node_type and identifier in child.getName():
+            node = child
+    assert node, 'Can\'t find {} node "{}" in {}'.format(node_type, identifier, parent)
+    return node